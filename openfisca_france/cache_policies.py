@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""Memory policies for the results cached by simulations.
+
+Two policies bound the memory used by the arrays a simulation keeps in cache:
+
+* under `opt_out_cache`, the computed values of the intermediate variables are not cached. A variable is intermediate
+  when its formula results flow, for a single period, into a single other variable, which stays in cache: once this
+  variable has been computed, the intermediate results are not needed anymore. The intermediate variables are derived
+  from the dependency graph of the formulas (see `get_intermediate_variables`). The inputs of a scenario are always
+  cached, even for an intermediate variable. This is a static policy: the results are not evicted as soon as all their
+  consumers for a period have been computed, which would require to count the pending reads during the simulation.
+* a simulation created with `max_cache_bytes` keeps at most this number of bytes of computed arrays. Beyond, the least
+  recently used arrays are evicted from the cache, and computed again if they are needed later. Inputs are never
+  evicted, nor are the results of recursive variables (see `get_recursive_variables`), whose computation for a period
+  could otherwise go back in time again and again.
+* a simulation created with `max_cache_bytes` and a `spill_directory` writes the least recently used arrays, inputs
+  included, to memory-mapped files in this directory instead of evicting them: long multi-period simulations keep
+  all their results without holding them all in memory.
+"""
+
+import collections
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from openfisca_core import periods, simulations
+from openfisca_core.periods import ETERNITY
+
+from .dependencies import get_formula_source, iter_codes, iter_formula_functions
+from .sparse_inputs import is_constant_array
+
+
+def get_inputs_by_variable(tax_benefit_system):
+    """Return, for each variable with a formula, the names of the variables its formulas (may) read.
+
+    A variable reading itself (for another period) is included in its own inputs. The names are looked for in the
+    string constants of the formulas and of the country package functions they call.
+    """
+    column_by_name = tax_benefit_system.column_by_name
+    inputs_by_variable = {}
+    for variable_name, column in column_by_name.iteritems():
+        if not column.formula_class.dated_formulas_class:
+            continue
+        inputs_by_variable[variable_name] = inputs = set(
+            constant
+            for function in iter_formula_functions(column)
+            for code in iter_codes(function.func_code)
+            for constant in code.co_consts
+            if isinstance(constant, basestring) and constant in column_by_name
+            )
+        inputs.update((tax_benefit_system.zero_preserving_inputs_by_variable or {}).get(variable_name) or ())
+    return inputs_by_variable
+
+
+def get_consumers_by_variable(tax_benefit_system, inputs_by_variable = None):
+    """Return, for each variable, the names of the variables whose formulas (may) read it."""
+    if inputs_by_variable is None:
+        inputs_by_variable = get_inputs_by_variable(tax_benefit_system)
+    consumers_by_variable = collections.defaultdict(set)
+    for variable_name, inputs in inputs_by_variable.iteritems():
+        for input_name in inputs:
+            consumers_by_variable[input_name].add(variable_name)
+    return consumers_by_variable
+
+
+def get_recursive_variables(tax_benefit_system, inputs_by_variable = None):
+    """Return the names of the variables which (may) depend on themselves, for other periods.
+
+    These are the variables belonging to a cycle of the dependency graph, found with Tarjan's algorithm.
+    """
+    if inputs_by_variable is None:
+        inputs_by_variable = get_inputs_by_variable(tax_benefit_system)
+    index_by_variable = {}
+    low_link_by_variable = {}
+    stack = []
+    stacked_variables = set()
+    recursive_variables = set()
+    for root_name in inputs_by_variable:
+        if root_name in index_by_variable:
+            continue
+        # Depth-first search without recursion: each item holds a variable and an iterator on its inputs.
+        pending_items = [(root_name, iter(inputs_by_variable[root_name]))]
+        index_by_variable[root_name] = low_link_by_variable[root_name] = len(index_by_variable)
+        stack.append(root_name)
+        stacked_variables.add(root_name)
+        while pending_items:
+            variable_name, inputs = pending_items[-1]
+            for input_name in inputs:
+                if input_name not in index_by_variable:
+                    index_by_variable[input_name] = low_link_by_variable[input_name] = len(index_by_variable)
+                    stack.append(input_name)
+                    stacked_variables.add(input_name)
+                    pending_items.append((input_name, iter(inputs_by_variable.get(input_name, ()))))
+                    break
+                if input_name in stacked_variables:
+                    low_link_by_variable[variable_name] = min(low_link_by_variable[variable_name],
+                        index_by_variable[input_name])
+            else:
+                pending_items.pop()
+                if pending_items:
+                    caller_name = pending_items[-1][0]
+                    low_link_by_variable[caller_name] = min(low_link_by_variable[caller_name],
+                        low_link_by_variable[variable_name])
+                if low_link_by_variable[variable_name] == index_by_variable[variable_name]:
+                    component = []
+                    while True:
+                        component_name = stack.pop()
+                        stacked_variables.discard(component_name)
+                        component.append(component_name)
+                        if component_name == variable_name:
+                            break
+                    if len(component) > 1 or variable_name in inputs_by_variable.get(variable_name, ()):
+                        recursive_variables.update(component)
+    return recursive_variables
+
+
+# Period expressions and options with which a formula reads a variable for other periods than its own.
+multi_period_regex = re.compile(
+    r'\b(?:ADD|DIVIDE|calculate_add|calculate_divide|compute_add|compute_divide|last_3_months|last_month|last_year'
+    r'|n_2|offset|start|this_year)\b')
+
+
+def reads_several_periods(tax_benefit_system, consumer_name, input_name):
+    """Return True when the formulas of `consumer_name` (may) read `input_name` for several periods.
+
+    This is the case when a monthly formula reads a yearly input, or when the statement reading the input (the lines
+    around its name) shifts or extends the period. When the name of the input is not the first argument of a call
+    (e.g. an item of a list of resources), the whole source of the formulas is searched. Calculated for consecutive
+    periods, such a consumer would read the same values of the input again.
+    """
+    consumer_column = tax_benefit_system.get_column(consumer_name, check_existence = True)
+    input_column = tax_benefit_system.get_column(input_name, check_existence = True)
+    if consumer_column.definition_period == periods.MONTH and input_column.definition_period == periods.YEAR:
+        return True
+    formula_source = get_formula_source(consumer_column)
+    lines = formula_source.splitlines()
+    name_regex = re.compile(u'''['"]{}['"]'''.format(re.escape(input_name)))
+    call_regex = re.compile(u'''\\(\\s*['"]{}['"]'''.format(re.escape(input_name)))
+    for index, line in enumerate(lines):
+        if not name_regex.search(line):
+            continue
+        if call_regex.search(line) or index > 0 and lines[index - 1].rstrip().endswith('('):
+            statement = u'\n'.join(lines[max(index - 1, 0):index + 2])
+        else:
+            statement = formula_source
+        if multi_period_regex.search(statement):
+            return True
+    return False
+
+
+def get_intermediate_variables(tax_benefit_system, inputs_by_variable = None):
+    """Return the names of the variables computed by a formula whose results flow, for a single period, into a single
+    cached variable.
+
+    A variable is intermediate when no formula reads it for several periods (e.g. the resources of the last 3 months),
+    which would compute it again for each of these periods, and when it is read either by a single formula, or only by
+    intermediate variables flowing into the same cached variable (e.g. `aide_logement_charges`, read by several terms
+    of `aide_logement_montant_brut`). Once this cached variable has been computed, the intermediate results are not
+    needed anymore.
+
+    The variables of a cycle of the dependency graph (see `get_recursive_variables`) can be intermediate too: a cycle
+    goes through a variable read for another period, which is never intermediate and stays in cache.
+    """
+    if inputs_by_variable is None:
+        inputs_by_variable = get_inputs_by_variable(tax_benefit_system)
+    consumers_by_variable = get_consumers_by_variable(tax_benefit_system, inputs_by_variable)
+    candidates = set(
+        variable_name
+        for variable_name in inputs_by_variable
+        if consumers_by_variable.get(variable_name)
+        and not any(
+            reads_several_periods(tax_benefit_system, consumer_name, variable_name)
+            for consumer_name in consumers_by_variable[variable_name]
+            )
+        )
+    # The cached variable into which the results of each intermediate variable flow.
+    root_by_variable = {}
+    changed = True
+    while changed:
+        changed = False
+        for variable_name in candidates:
+            roots = set(
+                root_by_variable.get(consumer_name, consumer_name)
+                for consumer_name in consumers_by_variable[variable_name]
+                )
+            if len(consumers_by_variable[variable_name]) > 1 and (len(roots) > 1 or not all(
+                    consumer_name in root_by_variable for consumer_name in consumers_by_variable[variable_name])):
+                continue
+            root = roots.pop()
+            if root != variable_name and root_by_variable.get(variable_name) != root:
+                root_by_variable[variable_name] = root
+                changed = True
+    return set(root_by_variable)
+
+
+class CacheBudget(object):
+    """The arrays computed by a simulation, from the least to the most recently used, within `max_bytes`.
+
+    The arrays of `pinned_variables` are never evicted.
+    """
+    def __init__(self, max_bytes, pinned_variables = None):
+        self.max_bytes = max_bytes
+        self.pinned_variables = pinned_variables or set()
+        self.nbytes = 0
+        self.nbytes_by_key = collections.OrderedDict()
+
+    def add(self, holder, period, array):
+        key = (holder, period)
+        if holder.column.name in self.pinned_variables:
+            return
+        if key in self.nbytes_by_key:
+            self.touch(holder, period)
+            return
+        # A constant array only stores one cell.
+        nbytes = array.itemsize if is_constant_array(array) else array.nbytes
+        self.nbytes_by_key[key] = nbytes
+        self.nbytes += nbytes
+
+    def evict(self):
+        """Remove from memory the least recently used arrays beyond `max_bytes`."""
+        while self.nbytes > self.max_bytes and len(self.nbytes_by_key) > 1:
+            (holder, period), nbytes = self.nbytes_by_key.popitem(last = False)
+            self.nbytes -= nbytes
+            self.evict_array(holder, period)
+
+    def evict_array(self, holder, period):
+        array_by_period = holder._array_by_period
+        if array_by_period is not None:
+            array_by_period.pop(period, None)
+            if not array_by_period:
+                # Base functions looking for the last known value expect None when there is none.
+                holder._array_by_period = None
+
+    def touch(self, holder, period):
+        nbytes = self.nbytes_by_key.pop((holder, period), None)
+        if nbytes is not None:
+            self.nbytes_by_key[(holder, period)] = nbytes
+
+    def update(self, holder, period, cached_periods):
+        """Record the arrays cached by `holder` since it held `cached_periods`, and the use of `period`."""
+        for cached_period, array in (holder._array_by_period or {}).iteritems():
+            if cached_period not in cached_periods and isinstance(array, np.ndarray):
+                self.add(holder, cached_period, array)
+        self.touch(holder, period)
+        self.evict()
+
+
+class SpillingCacheBudget(CacheBudget):
+    """A cache budget writing the least recently used arrays to memory-mapped files instead of dropping them.
+
+    The arrays are written to `.npy` files in `directory` (the temporary directory by default), and replaced in the
+    cache by a copy-on-write memory map of the file: the operating system pages them back when they are read. The
+    files are unlinked as soon as they are mapped, so their disk space is released with the arrays. Inputs can be
+    spilled too (see `add_inputs`), and as nothing needs to be computed again, recursive variables are not pinned.
+    """
+    def __init__(self, max_bytes, directory = None):
+        CacheBudget.__init__(self, max_bytes)
+        self.directory = directory
+
+    def add_inputs(self, simulation):
+        """Record the arrays already in the cache of `simulation`, so that they can be spilled too."""
+        for entity in simulation.entities.itervalues():
+            for holder in entity._holders.itervalues():
+                if holder.column.definition_period == ETERNITY:
+                    continue
+                for period, array in (holder._array_by_period or {}).iteritems():
+                    if isinstance(array, np.ndarray):
+                        self.add(holder, period, array)
+        self.evict()
+
+    def evict_array(self, holder, period):
+        array = (holder._array_by_period or {}).get(period)
+        if not isinstance(array, np.ndarray) or is_constant_array(array) or array.dtype.hasobject:
+            return
+        file_descriptor, file_path = tempfile.mkstemp(dir = self.directory, prefix = 'openfisca-france-',
+            suffix = '.npy')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as npy_file:
+                np.save(npy_file, array)
+            holder._array_by_period[period] = np.load(file_path, mmap_mode = 'c').view(np.ndarray)
+        finally:
+            os.remove(file_path)
+
+
+class Simulation(simulations.Simulation):
+    cache_budget = None
+
+    def compute(self, column_name, period, **parameters):
+        return self.compute_within_budget(simulations.Simulation.compute, column_name, period, **parameters)
+
+    def compute_add(self, column_name, period, **parameters):
+        return self.compute_within_budget(simulations.Simulation.compute_add, column_name, period, **parameters)
+
+    def compute_divide(self, column_name, period, **parameters):
+        return self.compute_within_budget(simulations.Simulation.compute_divide, column_name, period, **parameters)
+
+    def compute_within_budget(self, compute, column_name, period, **parameters):
+        cache_budget = self.cache_budget
+        if cache_budget is None or parameters.get('extra_params'):
+            return compute(self, column_name, period, **parameters)
+        holder = self.get_variable_entity(column_name).get_holder(column_name)
+        if holder.column.definition_period == ETERNITY:
+            return compute(self, column_name, period, **parameters)
+        if period is not None and not isinstance(period, periods.Period):
+            period = periods.period(period)
+        cached_periods = set(holder._array_by_period or ())
+        result = compute(self, column_name, period, **parameters)
+        cache_budget.update(holder, period, cached_periods)
+        return result
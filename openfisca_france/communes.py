@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+"""Vectorized lookups on INSEE commune codes (depcom).
+
+A population has far fewer distinct communes than ménages. The depcom column is dictionary-encoded once with
+`numpy.unique`: the tables indexed by commune (zone APL, versement transport...) are looked up once per distinct
+commune, and the results are broadcast back to the whole population with the inverse index.
+"""
+
+import numpy as np
+
+
+def map_by_depcom(function, depcom, dtype):
+    """Return the array of `function(code)` for each code of `depcom`, calling `function` once per distinct code."""
+    codes, inverse = np.unique(depcom, return_inverse = True)
+    return np.fromiter((function(code) for code in codes), dtype = dtype, count = len(codes))[inverse]
+
+
+def get_departement_number(code):
+    """Return the number of the département of the commune `code`, or 0 when it is unknown.
+
+    The communes of overseas départements (971 to 976) have a 3-digit département. Both Corsican départements (2A and
+    2B) are numbered 20.
+    """
+    if code[:2] == '97':
+        return int(code[:3]) if code[:3].isdigit() else 0
+    if code[:2] in ('2A', '2B', '2a', '2b'):
+        return 20
+    return int(code[:2]) if code[:2].isdigit() else 0
+
+
+def get_departements(depcom):
+    """Return the integer département numbers of the communes of `depcom`."""
+    return map_by_depcom(get_departement_number, depcom, np.int16)
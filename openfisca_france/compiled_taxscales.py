@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""Flat-array evaluation of marginal rate tax scales.
+
+`MarginalRateTaxScale.calc` builds several (population × brackets) matrices at each call. A compiled scale stores its
+thresholds, rates and the tax due at each threshold as flat arrays, and evaluates the tax with a single binary search
+per entity. Compiled scales are shared by all the simulations using the same brackets, so that the income tax barème
+of a fiscal year is compiled only once. Only the `COMPILED_TAX_SCALES_CACHE_SIZE` most recently used compiled scales
+are kept, so that sweeping the brackets of a reform does not grow the cache forever.
+
+Only the barème is compiled: the plafonnement du quotient familial and the décote read scalar parameters, and are left
+to their own formulas.
+"""
+
+import collections
+
+import numpy as np
+
+
+COMPILED_TAX_SCALES_CACHE_SIZE = 256
+
+
+class CompiledMarginalRateTaxScale(object):
+    def __init__(self, thresholds, rates):
+        self.thresholds = np.array(thresholds, dtype = float)
+        self.rates = np.array(rates, dtype = float)
+        # Tax due for a base equal to each threshold
+        self.base_amounts = np.concatenate(([0.], np.cumsum(np.diff(self.thresholds) * self.rates[:-1])))
+
+    def calc(self, base):
+        """Same as `MarginalRateTaxScale.calc(base)`."""
+        base = np.asarray(base, dtype = float)
+        if not len(self.thresholds):
+            return np.zeros_like(base)
+        bracket = np.searchsorted(self.thresholds, base, side = 'right') - 1
+        below_first_threshold = bracket < 0
+        bracket = np.maximum(bracket, 0)
+        amount = self.base_amounts[bracket] + self.rates[bracket] * (base - self.thresholds[bracket])
+        amount[below_first_threshold] = 0
+        return amount
+
+
+compiled_tax_scale_by_brackets = collections.OrderedDict()
+
+
+def compile_marginal_rate_tax_scale(tax_scale):
+    """Return the compiled version of `tax_scale`, compiling it on first use.
+
+    Compiled scales are indexed by their brackets, not by the scale object: reforms modifying the barème get their own
+    compiled scale, and the parameters of every simulation of the same year share one.
+    """
+    brackets = (tuple(tax_scale.thresholds), tuple(tax_scale.rates))
+    compiled_tax_scale = compiled_tax_scale_by_brackets.pop(brackets, None)
+    if compiled_tax_scale is None:
+        compiled_tax_scale = CompiledMarginalRateTaxScale(*brackets)
+    compiled_tax_scale_by_brackets[brackets] = compiled_tax_scale
+    while len(compiled_tax_scale_by_brackets) > COMPILED_TAX_SCALES_CACHE_SIZE:
+        compiled_tax_scale_by_brackets.popitem(last = False)
+    return compiled_tax_scale
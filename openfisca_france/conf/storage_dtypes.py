@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+# Storage dtype of the variables whose values fit in a narrower type than the dtype of their column (int32 for
+# IntCol). The results of their formulas and their inputs are cast to this dtype before being cached.
+# Enumerations with less than 128 items are stored as int8 without being listed here (see storage_dtypes.py).
+# Numpy does not widen the result of an operation between two int8 arrays: please add a variable here only if all the
+# values it may take fit in the dtype, including the sums and products formulas compute with it.
+# Counts declared as FloatCol (nbF, nbH...) are divided by 2 in modules without true division: they are kept as they
+# are.
+
+storage_dtype_by_variable = {
+    # Âges et dates
+    'af_age_aine': 'int16',
+    'age': 'int16',
+    'age_en_mois': 'int16',
+    'caseH': 'int16',
+    'duree_possession_titre_sejour': 'int16',
+    'f7vo': 'int16',
+
+    # Territoire
+    'departement': 'int16',
+
+    # Nombres de personnes
+    'af_allocation_forfaitaire_nb_enfants': 'int8',
+    'af_nbenf': 'int8',
+    'af_nbenf_fonc': 'int8',
+    'al_nb_personnes_a_charge': 'int8',
+    'asi_aspa_nb_alloc': 'int8',
+    'cmu_nb_pac': 'int8',
+    'cmu_nbp_foyer': 'int8',
+    'f6ev': 'int8',
+    'f7dl': 'int8',
+    'f7ea': 'int8',
+    'f7eb': 'int8',
+    'f7ec': 'int8',
+    'f7ed': 'int8',
+    'f7ef': 'int8',
+    'f7eg': 'int8',
+    'nbJ': 'int8',
+    'nbN': 'int8',
+    'nbR': 'int8',
+    'nb_parents': 'int8',
+    'nombre_enfants_majeurs_celibataires_sans_enfant': 'int8',
+    'rsa_nb_enfants': 'int8',
+
+    # Catégories et échelons
+    'aeeh_niveau_handicap': 'int8',
+    'bourse_college_echelon': 'int8',
+    'bourse_lycee_echelon': 'int8',
+    'echelon_bourse': 'int8',
+    'type_menage': 'int8',
+    }
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+# Monthly variables whose value is the same for every month of a calendar year, but whose year invariance cannot be
+# inferred from the code of their formulas (see openfisca_france/year_invariance.py). They are computed for January
+# only, and their value of January is used for the other months of the year.
+# Most year-invariant variables (those only reading data of year N-2, like
+# prestations_familiales_base_ressources_individu) are found automatically and do not need to be listed here: please
+# add a variable here only if none of its dated formulas depends on the month, including through the parameters.
+
+declared_year_invariant_variables = set([
+    ])
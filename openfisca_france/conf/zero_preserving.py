@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+# Variables which are zero whenever all the listed inputs are zero, whatever the other inputs of their formulas.
+# When all the inputs of such a variable are zero for the simulated population, its formula is not evaluated.
+# A salaried-only population thus does not pay for the taxation of capital and wealth.
+# The property is checked for every variable of this file by tests/test_zero_propagation.py: please add a variable
+# here only if its formula really returns zero in that case, for all its dated formulas.
+# Inputs are evaluated in the listed order, so that the cheapest ones can discard the shortcut first.
+
+zero_preserving_inputs_by_variable = {
+    # Impôt sur le revenu
+    'cont_rev_loc': ['f4bl'],
+    'deficit_rcm': ['f2aa', 'f2al', 'f2am', 'f2an', 'f2aq', 'f2ar'],
+    'plus_values': ['f3vg', 'f3vh', 'f3vl', 'f3vm', 'f3vt', 'f3sa', 'f3vd', 'f3vi', 'f3vf', 'rpns_pvce'],
+    'rev_cat_pv': ['f3vg', 'f3vh'],
+    'rev_cat_rvcm': ['f2ch', 'f2dc', 'f2ts', 'f2ca', 'f2fu', 'f2go', 'f2gr', 'f2tr', 'f2da', 'f2ee', 'deficit_rcm'],
+    'rpns_pvce': [
+        'frag_pvce', 'arag_pvce', 'mbic_pvce', 'abic_pvce', 'macc_pvce', 'aacc_pvce', 'mbnc_pvce', 'abnc_pvce',
+        'mncn_pvce', 'cncn_pvce',
+        ],
+
+    # Prélèvements sociaux sur les plus-values
+    'csg_pv_immo': ['f3vz'],
+    'csg_pv_mo': ['f3vg'],
+    'crds_pv_immo': ['f3vz'],
+    'crds_pv_mo': ['f3vg'],
+    'prelsoc_pv_immo': ['f3vz'],
+    'prelsoc_pv_mo': ['f3vg'],
+
+    # Impôt de solidarité sur la fortune
+    'ass_isf': ['b1cg', 'b2gh', 'isf_imm_bati', 'isf_imm_non_bati', 'isf_droits_sociaux'],
+    'decote_isf': ['ass_isf'],
+    'isf_actions_sal': ['b1cl'],
+    'isf_apres_plaf': ['isf_avant_plaf'],
+    'isf_avant_plaf': ['isf_avant_reduction'],
+    'isf_avant_reduction': ['isf_iai', 'decote_isf'],
+    'isf_droits_sociaux': ['b1cb', 'b1cd', 'b1ce', 'b1cf', 'b1cg', 'isf_actions_sal'],
+    'isf_iai': ['ass_isf'],
+    'isf_imm_bati': ['b1ab', 'b1ac'],
+    'isf_imm_non_bati': ['b1bc', 'b1be', 'b1bh', 'b1bk'],
+    'isf_inv_pme': ['b2mt', 'b2ne', 'b2mv', 'b2nf', 'b2mx', 'b2na'],
+    'isf_org_int_gen': ['b2nc'],
+    'isf_tot': ['b4rs', 'isf_avant_plaf', 'isf_apres_plaf'],
+    }
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Decompositions compiled into flat evaluation plans.
+
+`openfisca_core.decompositions` parses and validates the XML file of a decomposition each time it is requested, then
+calculates its nodes one by one, including the variables appearing several times. A `DecompositionPlan` is built
+once per tax-benefit system and decomposition file: it lists the nodes children first, computes each distinct
+variable once per simulation and sums the children of every other node.
+"""
+
+import copy
+import os
+import weakref
+
+from openfisca_core import decompositions, parameters
+
+
+decompositions_directory = os.path.dirname(os.path.abspath(__file__))
+fiche_de_paie_decomposition_file_path = os.path.join(decompositions_directory, 'fiche_de_paie_decomposition.xml')
+
+decomposition_plan_by_xml_file_path_by_tax_benefit_system = weakref.WeakKeyDictionary()
+
+
+class DecompositionPlan(object):
+    def __init__(self, decomposition_json):
+        self.decomposition_json = decomposition_json
+        # Nodes, children first
+        self.nodes = list(decompositions.iter_decomposition_nodes(decomposition_json, children_first = True))
+        index_by_node_id = dict((id(node), index) for index, node in enumerate(self.nodes))
+        # For each node, the indexes of its children in self.nodes, or None for the nodes to calculate
+        self.children_indexes = [
+            [index_by_node_id[id(child)] for child in node['children']] if node.get('children') else None
+            for node in self.nodes
+            ]
+        self.codes = []  # Distinct codes of the variables to calculate
+        for node, children_indexes in zip(self.nodes, self.children_indexes):
+            if children_indexes is None and node['code'] not in self.codes:
+                self.codes.append(node['code'])
+
+    def calculate(self, simulations):
+        """Same as `openfisca_core.decompositions.calculate(simulations, decomposition_json)`."""
+        response_json = copy.deepcopy(self.decomposition_json)  # Use decomposition as a skeleton for response.
+        response_nodes = decompositions.iter_decomposition_nodes(response_json, children_first = True)
+        for node, values in zip(response_nodes, self.calculate_values(simulations)):
+            node['values'] = values
+        return response_json
+
+    def calculate_values(self, simulations):
+        """Return the values of every node of the plan, in the order of `self.nodes`.
+
+        The values of a node are the sums of its variable over each test case of each simulation.
+        """
+        values_by_code = dict(
+            (code, calculate_variable_values(simulations, code))
+            for code in self.codes
+            )
+        values_by_node = []
+        for node, children_indexes in zip(self.nodes, self.children_indexes):
+            if children_indexes is None:
+                values_by_node.append(values_by_code[node['code']])
+            else:
+                values_by_node.append(map(lambda *l: sum(l), *(
+                    values_by_node[child_index]
+                    for child_index in children_indexes
+                    )))
+        return values_by_node
+
+    def calculate_arrays(self, simulation):
+        """Return the arrays of every node of the plan for `simulation`, in the order of `self.nodes`.
+
+        Unlike `calculate_values`, the arrays are not summed by test case: all the variables of the decomposition must
+        belong to entities of the same size, e.g. when every person is alone in their groups.
+        """
+        array_by_code = dict(
+            (code, simulation.calculate_output(code, simulation.period).astype(float))
+            for code in self.codes
+            )
+        array_by_node = []
+        for node, children_indexes in zip(self.nodes, self.children_indexes):
+            if children_indexes is None:
+                array_by_node.append(array_by_code[node['code']])
+            else:
+                array_by_node.append(sum(
+                    array_by_node[child_index]
+                    for child_index in children_indexes
+                    ))
+        return array_by_node
+
+
+def calculate_variable_values(simulations, code):
+    values = []
+    for simulation_index, simulation in enumerate(simulations):
+        try:
+            array = simulation.calculate_output(code, simulation.period)
+        except parameters.ParameterNotFound as exc:
+            exc.simulation_index = simulation_index
+            raise
+        column = simulation.tax_benefit_system.get_column(code)
+        entity_step_size = simulation.entities[column.entity.key].step_size
+        values.extend(
+            column.transform_value_to_json(value)
+            for value in array.reshape([simulation.steps_count, entity_step_size]).sum(1).tolist()
+            )
+    return values
+
+
+def get_decomposition_plan(tax_benefit_system, xml_file_path = None):
+    """Return the evaluation plan of a decomposition file, parsing and validating the file only on first use."""
+    if xml_file_path is None:
+        xml_file_path = tax_benefit_system.decomposition_file_path
+    decomposition_plan_by_xml_file_path = decomposition_plan_by_xml_file_path_by_tax_benefit_system.setdefault(
+        tax_benefit_system, {})
+    decomposition_plan = decomposition_plan_by_xml_file_path.get(xml_file_path)
+    if decomposition_plan is None:
+        decomposition_plan = decomposition_plan_by_xml_file_path[xml_file_path] = DecompositionPlan(
+            decompositions.get_decomposition_json(tax_benefit_system, xml_file_path))
+    return decomposition_plan
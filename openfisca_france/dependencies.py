@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""Dependencies between variables, and between variables and parameters.
+
+Two sources of dependencies are used:
+
+* the dependencies between variables traced by a simulation run with `trace = True`, which are exact for this
+  simulation;
+* the source code of the formulas (and of the helper functions of the country package they call), in which the
+  parameters read by a formula are looked for. This search is conservative: a formula is considered to read a
+  parameter as soon as any of the names in the path of this parameter appears in its source code.
+"""
+
+import collections
+import inspect
+import os
+import re
+import types
+
+from openfisca_core.parameters import ParameterNode, Scale
+
+
+COUNTRY_DIR = os.path.dirname(os.path.abspath(__file__))
+
+formula_source_by_formula_class = {}
+
+
+def iter_formula_functions(column):
+    """Yield the functions of the formulas of `column`, and the country package functions they call."""
+    formula_class = column.formula_class
+    pending_functions = [
+        dated_formula_class['formula_class'].formula
+        for dated_formula_class in formula_class.dated_formulas_class or []
+        ]
+    visited_codes = set()
+    while pending_functions:
+        function = pending_functions.pop()
+        function = getattr(function, 'im_func', function)
+        if not isinstance(function, types.FunctionType) or function.func_code in visited_codes:
+            continue
+        visited_codes.add(function.func_code)
+        yield function
+        for code in iter_codes(function.func_code):
+            for name in code.co_names:
+                value = function.func_globals.get(name)
+                if isinstance(value, types.FunctionType) and value.func_code.co_filename.startswith(COUNTRY_DIR):
+                    pending_functions.append(value)
+
+
+def iter_codes(code):
+    """Yield `code` and the code objects of the functions (lambdas, nested functions...) it defines."""
+    yield code
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            for sub_code in iter_codes(constant):
+                yield sub_code
+
+
+def get_formula_source(column):
+    """Return the source code of the formulas of `column` and of the country package functions they call."""
+    formula_source = formula_source_by_formula_class.get(column.formula_class)
+    if formula_source is None:
+        formula_source = formula_source_by_formula_class[column.formula_class] = build_formula_source(column)
+    return formula_source
+
+
+def build_formula_source(column):
+    sources = []
+    for function in iter_formula_functions(column):
+        try:
+            sources.append(inspect.getsource(function))
+        except (IOError, TypeError):
+            # Source unavailable: the name of every global the formula uses is still meaningful.
+            sources.append(u' '.join(u'.{}'.format(name) for code in iter_codes(function.func_code)
+                for name in code.co_names))
+    return u'\n'.join(source.decode('utf-8') if isinstance(source, str) else source for source in sources)
+
+
+def iter_changed_parameter_names(baseline_parameter, reform_parameter, name = None):
+    """Yield the names of the parameters which differ between two parameter trees.
+
+    When a node or a scale differs as a whole (missing child, different number of brackets...), its name is yielded
+    instead of the names of its descendants.
+    """
+    if baseline_parameter is reform_parameter:
+        return
+    if type(baseline_parameter) is not type(reform_parameter):
+        yield name
+    elif isinstance(baseline_parameter, ParameterNode):
+        for child_name in sorted(set(baseline_parameter.children) | set(reform_parameter.children)):
+            child_full_name = child_name if name is None else u'{}.{}'.format(name, child_name)
+            if child_name not in baseline_parameter.children or child_name not in reform_parameter.children:
+                yield child_full_name
+                continue
+            for changed_name in iter_changed_parameter_names(baseline_parameter.children[child_name],
+                    reform_parameter.children[child_name], child_full_name):
+                yield changed_name
+    elif isinstance(baseline_parameter, Scale):
+        if get_scale_values(baseline_parameter) != get_scale_values(reform_parameter):
+            yield name
+    elif get_values(baseline_parameter) != get_values(reform_parameter):
+        yield name
+
+
+def get_values(parameter):
+    values_history = getattr(parameter, 'values_history', parameter)
+    values_list = getattr(values_history, 'values_list', None)
+    if values_list is None:
+        return parameter
+    return [(value_at_instant.instant_str, value_at_instant.value) for value_at_instant in values_list]
+
+
+def get_scale_values(scale):
+    return [
+        dict(
+            (key, get_values(getattr(bracket, key)))
+            for key in sorted(bracket.allowed_keys)
+            if getattr(bracket, key, None) is not None
+            )
+        for bracket in scale.brackets
+        ]
+
+
+def get_variables_reading_parameters(tax_benefit_system, parameter_names):
+    """Return the names of the variables whose formulas may read one of the parameters named `parameter_names`."""
+    names = set(
+        name
+        for parameter_name in parameter_names
+        for name in re.split(r'[.[\]]', parameter_name)
+        if name and not name.isdigit()
+        )
+    if not names:
+        return set()
+    name_regex = re.compile(u'''(?:\\.|['"])(?:{})\\b'''.format(u'|'.join(re.escape(name) for name in sorted(names))))
+    return set(
+        variable_name
+        for variable_name, column in tax_benefit_system.column_by_name.iteritems()
+        if column.formula_class.dated_formulas_class and name_regex.search(get_formula_source(column))
+        )
+
+
+def get_changed_variables(reform):
+    """Return the names of the variables which may be calculated differently by `reform` and by its baseline.
+
+    These are the variables added, removed or updated by the reform, and the variables whose formulas read a
+    parameter modified by the reform. The variables depending on them are not included.
+    """
+    baseline = reform.baseline
+    changed_variables = set(
+        variable_name
+        for variable_name in set(baseline.column_by_name) | set(reform.column_by_name)
+        if baseline.column_by_name.get(variable_name) is not reform.column_by_name.get(variable_name)
+        )
+    if reform.parameters is not baseline.parameters:
+        changed_variables.update(get_variables_reading_parameters(
+            reform, list(iter_changed_parameter_names(baseline.parameters, reform.parameters))))
+    return changed_variables
+
+
+def get_dependents_by_variable(simulation):
+    """Return, for each variable, the names of the variables whose calculation used it, according to the trace of
+    `simulation`."""
+    dependents_by_variable = collections.defaultdict(set)
+    for (variable_name, _), step in simulation.traceback.iteritems():
+        for input_variable_name, _ in step.get('input_variables_infos', ()):
+            dependents_by_variable[input_variable_name].add(variable_name)
+    return dependents_by_variable
+
+
+def get_downstream_variables(dependents_by_variable, variable_names):
+    """Return `variable_names` and the names of all the variables depending on them, directly or not."""
+    downstream_variables = set(variable_names)
+    pending_variables = list(downstream_variables)
+    while pending_variables:
+        for dependent_name in dependents_by_variable.get(pending_variables.pop(), ()):
+            if dependent_name not in downstream_variables:
+                downstream_variables.add(dependent_name)
+                pending_variables.append(dependent_name)
+    return downstream_variables
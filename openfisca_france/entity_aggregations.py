@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+"""Aggregate the values of the members of group entities with index arrays computed once per simulation.
+
+`famille.sum(array, role = Famille.PARENT)` rebuilds the role mask of the persons (an element-wise comparison of role
+objects) at each call, and `famille.max(...)` or `famille.all(...)` loop over the positions of the members, computing
+a mask and a count for each of them. The methods installed by `use_cached_aggregations` compute, once per simulation,
+entity and role, the members having the role, sorted by entity, and the offsets of the entities in this order:
+
+* sums (and `any`, `nb_persons`) are a `np.bincount` of the values of these members,
+* `max`, `min` and `all` are a segmented reduction (`reduceat`) of their values.
+
+The results are exactly those of OpenFisca-Core, with the same dtypes.
+
+`members_rank` and `ranked_member_value` rank the members of the entities (e.g. the children of a famille by
+decreasing age) with the same segments, without splitting the persons by legacy role.
+"""
+
+import weakref
+
+import numpy as np
+
+from openfisca_core.entities import GroupEntity
+
+
+segments_by_key_by_simulation = weakref.WeakKeyDictionary()
+
+
+def get_segments(entity, role):
+    """Return the members of `entity` having `role` and their entity ids, sorted by entity, and the segments starts.
+
+    The members are None when `role` is None and the persons are already sorted by entity. The segments starts
+    are those of the entities having at least one member with `role`, whose indexes are also returned.
+    """
+    segments_by_key = segments_by_key_by_simulation.get(entity.simulation)
+    if segments_by_key is None:
+        segments_by_key = segments_by_key_by_simulation[entity.simulation] = {}
+    key = (entity.key, role.key if role is not None else None)
+    segments = segments_by_key.get(key)
+    if segments is None:
+        members_entity_id = entity.members_entity_id
+        if role is None:
+            members = None
+        else:
+            members = np.flatnonzero(entity.members.has_role(role))
+            members_entity_id = members_entity_id[members]
+        if members_entity_id.size > 1 and (np.diff(members_entity_id) < 0).any():
+            # Stable sort: the members of each entity keep their order, as in the loops of OpenFisca-Core.
+            order = np.argsort(members_entity_id, kind = 'mergesort')
+            members = order if members is None else members[order]
+            members_entity_id = members_entity_id[order]
+        counts = np.bincount(members_entity_id, minlength = entity.count)
+        filled_entities = np.flatnonzero(counts)
+        starts = (np.cumsum(counts) - counts)[filled_entities]
+        segments = segments_by_key[key] = (members, members_entity_id, counts, filled_entities, starts)
+    return segments
+
+
+def get_members_values(array, members):
+    return array if members is None else array.take(members)
+
+
+def cached_sum(entity, array, role = None):
+    entity.check_role_validity(role)
+    entity.simulation.persons.check_array_compatible_with_entity(array)
+    members, members_entity_id, _, _, _ = get_segments(entity, role)
+    return np.bincount(members_entity_id, weights = get_members_values(array, members), minlength = entity.count)
+
+
+def cached_reduce(entity, array, reducer, neutral_element, role = None):
+    if not isinstance(reducer, np.ufunc):
+        return GroupEntity.reduce(entity, array, reducer, neutral_element, role = role)
+    entity.simulation.persons.check_array_compatible_with_entity(array)
+    entity.check_role_validity(role)
+    members, _, _, filled_entities, starts = get_segments(entity, role)
+    result = entity.filled_array(neutral_element)  # Neutral value of the entities without member having the role
+    if starts.size:
+        result[filled_entities] = reducer.reduceat(get_members_values(array, members), starts)
+    return result
+
+
+def cached_nb_persons(entity, role = None):
+    if role:
+        entity.check_role_validity(role)
+    counts = get_segments(entity, role or None)[2]
+    # As in OpenFisca-Core, the persons having a role are counted by a sum of weights.
+    return counts.astype(np.float64) if role else counts.copy()
+
+
+def members_rank(entity, key, role = None):
+    """Return the rank of each person in its `entity` by decreasing `key`, among the members having `role`.
+
+    The first member has rank 0, and members with equal keys are ranked in the order of the persons. The persons
+    without `role` have rank -1.
+    """
+    members, members_entity_id, counts, _, _ = get_segments(entity, role)
+    values = get_members_values(key, members).astype(np.float64)
+    # `members_entity_id` is sorted, and the sort is stable.
+    order = np.lexsort((-values, members_entity_id))
+    rank = np.full(entity.simulation.persons.count, -1, dtype = np.int64)
+    rank[order if members is None else members[order]] = \
+        np.arange(members_entity_id.size) - (np.cumsum(counts) - counts)[members_entity_id]
+    return rank
+
+
+def ranked_member_value(entity, array, key, rank, role = None, default = 0):
+    """Return the value of `array` for the member of rank `rank` of each `entity` (see `members_rank`).
+
+    For instance, `ranked_member_value(famille, age, age, 1, role = Famille.ENFANT)` is the age of the second
+    eldest child of each famille. The entities having no member of this rank get `default`.
+    """
+    entity.simulation.persons.check_array_compatible_with_entity(array)
+    selected = members_rank(entity, key, role = role) == rank
+    result = entity.filled_array(default, dtype = array.dtype)
+    result[entity.members_entity_id[selected]] = array[selected]
+    return result
+
+
+def use_cached_aggregations(tax_benefit_system):
+    """Use cached aggregations for the group entities of `tax_benefit_system`."""
+    for entity_class in tax_benefit_system.entities:
+        if entity_class.is_person:
+            continue
+        entity_class.sum = cached_sum
+        entity_class.reduce = cached_reduce
+        entity_class.nb_persons = cached_nb_persons
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""Project values between entities with a single gather, whose indexes are computed once per simulation.
+
+A formula reading `famille.demandeur.menage('zone_apl', period)` projects the values of the ménages on their persons,
+then picks the value of the demandeur of each famille: each step of the chain allocates an intermediate array and
+rebuilds its role masks. The projectors installed by `use_cached_projections` compose the steps of a chain into the
+index of the source entity of each target entity (and the mask of the target entities having one), which is cached
+in the simulation for this chain: a projection is then a single `take`.
+
+The results are exactly those of the projectors of OpenFisca-Core, including their dtypes (a projection on persons
+converts booleans to integers) and their default values (0 for the entities without the projected role).
+"""
+
+import weakref
+
+import numpy as np
+
+
+projection_by_path_by_simulation = weakref.WeakKeyDictionary()
+
+
+def get_step(entity, shortcut):
+    """Return the projection step named `shortcut` from `entity`, as in `openfisca_core.entities`, or None.
+
+    A step is an `('entity', entity_key)` pair for the group of a person, a `('role', role_key)` pair for the person
+    holding a unique role in a group, or `('first_person', None)` for the first person of a group.
+    """
+    if entity.is_person:
+        if shortcut in entity.simulation.entities:
+            return 'entity', shortcut
+        return None
+    if shortcut == 'first_person':
+        return 'first_person', None
+    if any(role.max == 1 and role.key == shortcut for role in entity.flattened_roles):
+        return 'role', shortcut
+    return None
+
+
+def get_step_reference_entity(entity, step):
+    """Return the entity whose values are read by `step` from `entity`."""
+    kind, key = step
+    if kind == 'entity':
+        return entity.simulation.entities[key]
+    return entity.members
+
+
+def get_step_index(entity, step):
+    """Return the index in the reference entity of `step` of each member of `entity`, and the mask of valid indexes.
+
+    The mask is None when every member of `entity` has a value.
+    """
+    kind, key = step
+    if kind == 'entity':
+        return entity.simulation.entities[key].members_entity_id, None
+    if kind == 'first_person':
+        return np.flatnonzero(entity.members_position == 0), None
+    role = next(role for role in entity.flattened_roles if role.key == key)
+    role_filter = entity.members.has_role(role)
+    entity_filter = entity.any(role_filter)
+    index = np.zeros(entity.count, dtype = np.int64)
+    # Same assignment as `GroupEntity.value_from_person`
+    index[entity_filter] = np.flatnonzero(role_filter)
+    return index, None if entity_filter.all() else entity_filter
+
+
+def get_projection(entity, path):
+    """Return the index, the validity mask and the kinds of the steps of the chain `path` starting from `entity`."""
+    projection_by_path = projection_by_path_by_simulation.get(entity.simulation)
+    if projection_by_path is None:
+        projection_by_path = projection_by_path_by_simulation[entity.simulation] = {}
+    path_key = (entity.key, path)
+    projection = projection_by_path.get(path_key)
+    if projection is None:
+        index = None
+        valid = None
+        step_entity = entity
+        for step in path:
+            step_index, step_valid = get_step_index(step_entity, step)
+            if index is None:
+                index, valid = step_index, step_valid
+            else:
+                if step_valid is not None:
+                    step_valid = step_valid[index]
+                    valid = step_valid if valid is None else valid & step_valid
+                index = step_index[index]
+            step_entity = get_step_reference_entity(step_entity, step)
+        projection = projection_by_path[path_key] = (index, valid, tuple(kind for kind, _ in path))
+    return projection
+
+
+def project(entity, path, array):
+    """Project `array`, given for the reference entity of the chain `path`, on `entity`."""
+    index, valid, kinds = get_projection(entity, path)
+    dtype = array.dtype
+    if 'entity' in kinds:
+        # `GroupEntity.project` uses `np.where(role_condition, array, 0)`.
+        dtype = np.result_type(dtype, 0)
+    result = array.take(index)
+    if result.dtype != dtype:
+        result = result.astype(dtype)
+    if valid is not None:
+        result[~valid] = 0
+    return result
+
+
+class CachedProjector(object):
+    """Projector of a chain of shortcuts (e.g. `famille.demandeur.menage`), computing its indexes once."""
+
+    def __init__(self, target_entity, path):
+        self.target_entity = target_entity
+        self.path = path
+        reference_entity = target_entity
+        for step in path:
+            reference_entity = get_step_reference_entity(reference_entity, step)
+        self.reference_entity = reference_entity
+
+    def __getattr__(self, attribute):
+        step = get_step(self.reference_entity, attribute)
+        if step is None:
+            return getattr(self.reference_entity, attribute)
+        return CachedProjector(self.target_entity, self.path + (step,))
+
+    def __call__(self, *args, **kwargs):
+        return project(self.target_entity, self.path, self.reference_entity(*args, **kwargs))
+
+
+def get_cached_projector(entity, attribute):
+    # Only called by Python when `attribute` is not found by the usual lookup.
+    step = get_step(entity, attribute)
+    if step is None:
+        raise Exception("Entity {} has no attribute {}".format(entity.key, attribute))
+    return CachedProjector(entity, (step,))
+
+
+def use_cached_projections(tax_benefit_system):
+    """Use cached projections for the shortcuts of the entities of `tax_benefit_system`."""
+    for entity_class in tax_benefit_system.entities:
+        entity_class.__getattr__ = get_cached_projector
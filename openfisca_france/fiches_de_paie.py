@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""Batch generation of payslips (fiches de paie).
+
+The payslips of a whole payroll are computed by a single simulation, in which every employee is alone in their foyer
+fiscal, famille and ménage. The payroll chain is thus evaluated once, vectorized over the employees, and each
+payslip gets the lines of `decompositions/fiche_de_paie_decomposition.xml`, with the same amounts as a simulation
+computing this employee alone.
+"""
+
+import collections
+
+from openfisca_core import decompositions, periods
+
+from .decompositions import fiche_de_paie_decomposition_file_path, get_decomposition_plan
+
+
+def new_fiches_de_paie_simulation(tax_benefit_system, period, input_variables):
+    """Return a simulation of the employees described by `input_variables`, during the month `period`.
+
+    `input_variables` maps the name of each individual input variable to an array with a cell per employee, or to a
+    dict of such arrays by period. A yearly variable given as a single array is set for the year of `period`.
+
+    Raise a `ValueError` when a variable is unknown, or when the arrays do not all have the same length.
+    """
+    period = periods.period(period)
+    array_by_period_by_variable_name = {}
+    employees_count = None
+    for variable_name, value in sorted(input_variables.iteritems()):
+        column = tax_benefit_system.column_by_name.get(variable_name)
+        if column is None:
+            raise ValueError(u"Unknown input variable: {}".format(variable_name).encode('utf-8'))
+        if not isinstance(value, dict):
+            value = {period.this_year if column.definition_period == periods.YEAR else period: value}
+        array_by_period = {}
+        for variable_period, array in value.iteritems():
+            variable_period = periods.period(variable_period)
+            if employees_count is None:
+                employees_count = len(array)
+            elif len(array) != employees_count:
+                raise ValueError(u"Input variable {} has {} values for {}, instead of one per employee ({})".format(
+                    variable_name, len(array), variable_period, employees_count).encode('utf-8'))
+            array_by_period[variable_period] = array
+        array_by_period_by_variable_name[variable_name] = array_by_period
+    scenario = tax_benefit_system.new_scenario().init_from_attributes(period = period)
+    scenario.input_variables = array_by_period_by_variable_name
+    return scenario.new_simulation()
+
+
+def iter_fiches_de_paie(tax_benefit_system, period, input_variables,
+        xml_file_path = fiche_de_paie_decomposition_file_path):
+    """Compute the payslips of the employees described by `input_variables` and yield them one by one.
+
+    Each payslip is an OrderedDict giving the amount of every line of the decomposition, by code, in the order of the
+    decomposition file.
+    """
+    decomposition_plan = get_decomposition_plan(tax_benefit_system, xml_file_path)
+    simulation = new_fiches_de_paie_simulation(tax_benefit_system, period, input_variables)
+    array_by_node_id = dict(
+        (id(node), array)
+        for node, array in zip(decomposition_plan.nodes, decomposition_plan.calculate_arrays(simulation))
+        )
+    values_by_code = collections.OrderedDict(
+        (node['code'], array_by_node_id[id(node)])
+        for node in decompositions.iter_decomposition_nodes(decomposition_plan.decomposition_json)
+        )
+    for employee_values in zip(*(values.tolist() for values in values_by_code.itervalues())):
+        yield collections.OrderedDict(zip(values_by_code.iterkeys(), employee_values))
@@ -6,10 +6,13 @@ import glob
 from openfisca_core.taxbenefitsystems import TaxBenefitSystem
 
 from .entities import entities
-from . import decompositions, scenarios
+from . import (cache_policies, decompositions, entity_aggregations, entity_projections, reform_overlays, scenarios,
+    sparse_inputs, storage_dtypes, year_invariance, zero_propagation)
 
 from .model.prelevements_obligatoires.prelevements_sociaux.cotisations_sociales import preprocessing
-from .conf.cache_blacklist import cache_blacklist as conf_cache_blacklist
+from .conf.storage_dtypes import storage_dtype_by_variable as conf_storage_dtype_by_variable
+from .conf.year_invariant import declared_year_invariant_variables as conf_declared_year_invariant_variables
+from .conf.zero_preserving import zero_preserving_inputs_by_variable as conf_zero_preserving_inputs_by_variable
 
 
 COUNTRY_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -24,6 +27,7 @@ class FranceTaxBenefitSystem(TaxBenefitSystem):
     preprocess_parameters = staticmethod(preprocessing.preprocess_parameters)
 
     REFORMS_DIR = os.path.join(COUNTRY_DIR, 'reformes')
+    REFORM_CACHE_SIZE = 16
     REV_TYP = None  # utils.REV_TYP  # Not defined for France
     REVENUES_CATEGORIES = {
     'brut': ['salaire_brut', 'chomage_brut', 'retraite_brute', 'pensions_alimentaires_percues', 'pensions_alimentaires_versees', 'rev_cap_brut', 'fon'],
@@ -34,13 +38,36 @@ class FranceTaxBenefitSystem(TaxBenefitSystem):
 
     def __init__(self):
         TaxBenefitSystem.__init__(self, entities)
+        entity_projections.use_cached_projections(self)
+        entity_aggregations.use_cached_aggregations(self)
         self.Scenario = scenarios.Scenario
 
         param_dir = os.path.join(COUNTRY_DIR, 'parameters')
         self.load_parameters(param_dir)
 
         self.add_variables_from_directory(os.path.join(COUNTRY_DIR, 'model'))
-        self.cache_blacklist = conf_cache_blacklist
+        self.storage_dtype_by_variable = conf_storage_dtype_by_variable
+        storage_dtypes.use_storage_dtypes(self)
+        sparse_inputs.use_constant_declaration_boxes(self)
+        self.declared_year_invariant_variables = conf_declared_year_invariant_variables
+        year_invariance.use_year_invariance(self)
+        self.zero_preserving_inputs_by_variable = conf_zero_preserving_inputs_by_variable
+        zero_propagation.use_zero_propagation(self)
+        inputs_by_variable = cache_policies.get_inputs_by_variable(self)
+        self.recursive_variables = cache_policies.get_recursive_variables(self, inputs_by_variable)
+        self.cache_blacklist = cache_policies.get_intermediate_variables(self, inputs_by_variable)
+        self.reform_cache = reform_overlays.ReformCache(self, self.REFORM_CACHE_SIZE)
+
+    def apply_reform(self, reform_path):
+        return self.apply_reforms([reform_path])
+
+    def apply_reforms(self, reform_paths):
+        """Return this tax-benefit system with the reforms of `reform_paths` applied in sequence.
+
+        The most recently used combinations of reforms are kept in `self.reform_cache`, and the same reform is returned
+        to every caller: it must not be modified.
+        """
+        return self.reform_cache.get_reform(reform_paths)
 
     def prefill_cache(self):
         # Compute one "zone APL" variable, to pre-load CSV of "code INSEE commune" to "Zone APL".
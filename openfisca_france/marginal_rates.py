@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""Marginal effective tax rates of real households, by finite differences.
+
+A `MarginalRateSimulation` pairs a baseline simulation of a scenario with a simulation in which an earnings input
+(`salaire_de_base` by default) of every person is increased by `delta` over the period, all at once. The baseline is
+run with `trace = True`: only the variables depending on the earnings input in this trace are calculated again in the
+perturbed simulation, the baseline results of every other variable being shared (see `paired_simulations`).
+
+The marginal rate of an entity of the target variable (e.g. a ménage for `revenu_disponible`) is
+`1 - Δtarget / (delta * number of perturbed members)`. When several members of an entity are perturbed, their rates
+are those of the entity: use a `mask` to perturb a single member of each entity (e.g. the personne de référence) when
+individual rates are needed.
+"""
+
+from __future__ import division
+
+import collections
+
+import numpy as np
+
+from openfisca_core import periods
+
+from .dependencies import get_dependents_by_variable, get_downstream_variables
+from .model.base import CHEF, PREF, VOUS
+from .paired_simulations import share_results
+
+
+# The terms of the formula of revenu_disponible.
+REVENU_DISPONIBLE_COMPONENTS = [
+    'revenus_du_travail',
+    'pensions',
+    'revenus_du_capital',
+    'prestations_sociales',
+    'ppe',
+    'impots_directs',
+    ]
+
+# The roles of the persons receiving the values of the group entities, as in the formula of revenu_disponible (e.g.
+# the prestations sociales of a famille are counted on its chef).
+PROJECTION_ROLE_BY_ENTITY = dict(
+    famille = CHEF,
+    foyer_fiscal = VOUS,
+    menage = PREF,
+    )
+
+
+class MarginalRateSimulation(object):
+    def __init__(self, scenario, varying_variable = 'salaire_de_base', delta = 10, period = None, mask = None,
+            debug = False, opt_out_cache = False):
+        """Create the baseline and perturbed simulations of `scenario`.
+
+        `varying_variable` is increased by `delta` over `period` (the period of the scenario by default) for the
+        persons of `mask` (every person by default), spread evenly over the months or years of the period.
+        """
+        self.baseline_simulation = scenario.new_simulation(debug = debug, opt_out_cache = opt_out_cache,
+            trace = True)
+        self.perturbed_simulation = scenario.new_simulation(debug = debug, opt_out_cache = opt_out_cache)
+        self.varying_variable = varying_variable
+        self.delta = delta
+        if period is None:
+            period = self.baseline_simulation.period
+        elif not isinstance(period, periods.Period):
+            period = periods.period(period)
+        self.period = period
+        persons = self.baseline_simulation.persons
+        self.mask = np.ones(persons.count, dtype = bool) if mask is None else np.asarray(mask, dtype = bool)
+        persons.check_array_compatible_with_entity(self.mask)
+        # The variables affected by the perturbation, for the trace of the baseline when it had `traced_count` steps.
+        self.affected_variables = None
+        self.traced_count = None
+        self.perturb()
+
+    def perturb(self):
+        """Put the increased values of the varying variable in the cache of the perturbed simulation."""
+        column = self.baseline_simulation.tax_benefit_system.get_column(self.varying_variable, check_existence = True)
+        assert column.entity.is_person, u"The varying variable must be a variable of persons"
+        assert column.definition_period in (periods.MONTH, periods.YEAR), \
+            u"The varying variable must be defined by month or by year"
+        sub_periods = []
+        after_instant = self.period.start.offset(self.period.size, self.period.unit)
+        sub_period = self.period.start.period(column.definition_period)
+        while sub_period.start < after_instant:
+            sub_periods.append(sub_period)
+            sub_period = sub_period.offset(1)
+        holder = self.perturbed_simulation.persons.get_holder(self.varying_variable)
+        increment = self.delta / len(sub_periods) * self.mask
+        for sub_period in sub_periods:
+            baseline_array = self.baseline_simulation.calculate(self.varying_variable, sub_period)
+            holder.put_in_cache((baseline_array + increment).astype(baseline_array.dtype), sub_period)
+
+    def calculate(self, variable_name):
+        """Return the values of `variable_name` over the period, for the baseline and perturbed simulations."""
+        baseline_array = self.baseline_simulation.calculate_add(variable_name, self.period)
+        if self.traced_count != len(self.baseline_simulation.traceback):
+            # The baseline has calculated new results.
+            share_results(self.baseline_simulation, self.perturbed_simulation, self.get_affected_variables())
+        return baseline_array, self.perturbed_simulation.calculate_add(variable_name, self.period)
+
+    def get_affected_variables(self):
+        """Return the names of the variables which may differ between the two simulations.
+
+        They are found from the trace of the baseline again only when it has grown.
+        """
+        traced_count = len(self.baseline_simulation.traceback)
+        if self.traced_count != traced_count:
+            self.affected_variables = get_downstream_variables(get_dependents_by_variable(self.baseline_simulation),
+                [self.varying_variable])
+            self.traced_count = traced_count
+        return self.affected_variables
+
+    def get_entity_difference(self, variable_name, entity):
+        """Return the difference of `variable_name` between the two simulations, summed over the members of `entity`.
+
+        The values of a group entity other than `entity` are counted on its member of the role of
+        `PROJECTION_ROLE_BY_ENTITY`.
+        """
+        baseline_array, perturbed_array = self.calculate(variable_name)
+        difference = perturbed_array.astype(np.float64) - baseline_array
+        variable_entity = self.baseline_simulation.get_variable_entity(variable_name)
+        if variable_entity.key == entity.key:
+            return difference
+        if not variable_entity.is_person:
+            difference = np.where(
+                variable_entity.members_legacy_role == PROJECTION_ROLE_BY_ENTITY[variable_entity.key],
+                difference[variable_entity.members_entity_id],
+                0,
+                )
+        return difference if entity.is_person else entity.sum(difference)
+
+    def get_entity_increment(self, entity):
+        """Return the increase of the varying variable of the members of `entity`."""
+        increment = self.delta * self.mask
+        return increment if entity.is_person else entity.sum(increment)
+
+    def get_marginal_rates(self, target_variable = 'revenu_disponible'):
+        """Return the marginal rates of `target_variable` by person.
+
+        The rate of a person is the one of their entity of `target_variable`, and is NaN when no member of this entity
+        is perturbed.
+        """
+        entity = self.baseline_simulation.get_variable_entity(target_variable)
+        difference = self.get_entity_difference(target_variable, entity)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            rates = 1 - difference / self.get_entity_increment(entity)
+        return rates if entity.is_person else entity.project(rates)
+
+    def get_rates_decomposition(self, target_variable = 'revenu_disponible', component_names = None):
+        """Return the contributions of the components of `target_variable` to its marginal rates, by person.
+
+        The contribution of a component is `- Δcomponent / increment`: when the components add up to the target
+        variable (e.g. `REVENU_DISPONIBLE_COMPONENTS`, the default for `revenu_disponible`), the marginal rate is
+        `1 +` the sum of the contributions. The earnings component (`revenus_du_travail`) contributes about `-1` plus
+        the rate of the social contributions.
+        """
+        if component_names is None:
+            assert target_variable == 'revenu_disponible', u"The components of {} must be given".format(
+                target_variable).encode('utf-8')
+            component_names = REVENU_DISPONIBLE_COMPONENTS
+        entity = self.baseline_simulation.get_variable_entity(target_variable)
+        increment = self.get_entity_increment(entity)
+        contribution_by_component = collections.OrderedDict()
+        for component_name in component_names:
+            difference = self.get_entity_difference(component_name, entity)
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                contribution = - difference / increment
+            contribution_by_component[component_name] = contribution if entity.is_person else entity.project(
+                contribution)
+        return contribution_by_component
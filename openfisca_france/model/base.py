@@ -2,6 +2,8 @@
 
 from openfisca_core.model_api import *
 from openfisca_france.entities import Famille, FoyerFiscal, Individu, Menage
+from openfisca_france.entity_aggregations import members_rank, ranked_member_value  # noqa analysis:ignore
+from openfisca_france.reform_overlays import Reform  # noqa analysis:ignore
 
 CATEGORIE_SALARIE = Enum([
     'prive_non_cadre',
@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from numpy.core.defchararray import startswith
-
-
+from openfisca_france.communes import get_departements
 from openfisca_france.model.base import *  # noqa analysis:ignore
 
 class coloc(Variable):
@@ -34,6 +32,17 @@ class depcom(Variable):
     definition_period = MONTH
     set_input = set_input_dispatch_by_period
 
+
+class departement(Variable):
+    column = IntCol
+    entity = Menage
+    label = u"Numéro du département du lieu de résidence (971 à 976 pour les DOM, 20 pour la Corse)"
+    definition_period = MONTH
+
+    def formula(menage, period):
+        return get_departements(menage('depcom', period))
+
+
 class charges_locatives(Variable):
     column = FloatCol
     entity = Menage
@@ -95,9 +104,8 @@ class residence_guadeloupe(Variable):
     entity = Menage
     definition_period = MONTH
 
-    def formula(self, simulation, period):
-        depcom = simulation.calculate('depcom', period)
-        return startswith(depcom, '971')
+    def formula(menage, period):
+        return menage('departement', period) == 971
 
 
 class residence_martinique(Variable):
@@ -105,9 +113,8 @@ class residence_martinique(Variable):
     entity = Menage
     definition_period = MONTH
 
-    def formula(self, simulation, period):
-        depcom = simulation.calculate('depcom', period)
-        return startswith(depcom, '972')
+    def formula(menage, period):
+        return menage('departement', period) == 972
 
 
 class residence_guyane(Variable):
@@ -115,9 +122,8 @@ class residence_guyane(Variable):
     entity = Menage
     definition_period = MONTH
 
-    def formula(self, simulation, period):
-        depcom = simulation.calculate('depcom', period)
-        return startswith(depcom, '973')
+    def formula(menage, period):
+        return menage('departement', period) == 973
 
 
 class residence_reunion(Variable):
@@ -125,9 +131,8 @@ class residence_reunion(Variable):
     entity = Menage
     definition_period = MONTH
 
-    def formula(self, simulation, period):
-        depcom = simulation.calculate('depcom', period)
-        return startswith(depcom, '974')
+    def formula(menage, period):
+        return menage('departement', period) == 974
 
 
 class residence_mayotte(Variable):
@@ -135,6 +140,5 @@ class residence_mayotte(Variable):
     entity = Menage
     definition_period = MONTH
 
-    def formula(self, simulation, period):
-        depcom = simulation.calculate('depcom', period)
-        return startswith(depcom, '976')
+    def formula(menage, period):
+        return menage('departement', period) == 976
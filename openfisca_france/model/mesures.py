@@ -13,23 +13,17 @@ class uc(Variable):
     label = u"Unités de consommation"
     definition_period = YEAR
 
-    def formula(self, simulation, period):
+    def formula(menage, period):
         '''
         Calcule le nombre d'unités de consommation du ménage avec l'échelle de l'INSEE
         '''
-        age_en_mois_holder = simulation.compute('age_en_mois', period)
-
-        age_en_mois = self.split_by_roles(age_en_mois_holder)
+        age = floor(menage.members('age_en_mois', period.first_month) / 12)
 
         uc_adt = 0.5
         uc_enf = 0.3
-        uc = 0.5
-        for agm in age_en_mois.itervalues():
-            age = floor(agm / 12)
-            adt = (15 <= age) & (age <= 150)
-            enf = (0 <= age) & (age <= 14)
-            uc += adt * uc_adt + enf * uc_enf
-        return uc
+        adt = (15 <= age) & (age <= 150)
+        enf = (0 <= age) & (age <= 14)
+        return 0.5 + menage.sum(adt * uc_adt + enf * uc_enf)
 
 
 class type_menage(Variable):
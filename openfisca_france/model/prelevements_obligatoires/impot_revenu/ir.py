@@ -8,6 +8,7 @@ import logging
 from numpy import datetime64, logical_and as and_, logical_or as or_, logical_xor as xor_, round as round_
 
 from openfisca_core import periods
+from openfisca_france.compiled_taxscales import compile_marginal_rate_tax_scale
 from openfisca_france.model.base import *  # noqa analysis:ignore
 
 
@@ -992,7 +993,7 @@ class ir_brut(Variable):
         nbptr = foyer_fiscal('nbptr', period)
         taux_effectif = foyer_fiscal('taux_effectif', period)
         rni = foyer_fiscal('rni', period)
-        bareme = parameters(period).impot_revenu.bareme
+        bareme = compile_marginal_rate_tax_scale(parameters(period).impot_revenu.bareme)
 
         return (taux_effectif == 0) * nbptr * bareme.calc(rni / nbptr) + taux_effectif * rni
 
@@ -1009,7 +1010,7 @@ class ir_ss_qf(Variable):
         '''
         rni = foyer_fiscal('rni', period)
         nb_adult = foyer_fiscal('nb_adult', period)
-        bareme = parameters(period).impot_revenu.bareme
+        bareme = compile_marginal_rate_tax_scale(parameters(period).impot_revenu.bareme)
 
         A = bareme.calc(rni / nb_adult)
         return nb_adult * A
@@ -2537,7 +2538,7 @@ class taux_effectif(Variable):
         microentreprise = foyer_fiscal('microentreprise', period)
         abnc_proc_i = foyer_fiscal.members('abnc_proc', period)
         nbnc_proc_i = foyer_fiscal.members('nbnc_proc', period)
-        bareme = parameters(period).impot_revenu.bareme
+        bareme = compile_marginal_rate_tax_scale(parameters(period).impot_revenu.bareme)
         cga = parameters(period).impot_revenu.rpns.cga_taux2
         abnc_proc = foyer_fiscal.sum(abnc_proc_i)
         nbnc_proc = foyer_fiscal.sum(nbnc_proc_i)
@@ -3,8 +3,9 @@
 import json
 
 
-from numpy import logical_or as or_, fromiter
+from numpy import logical_or as or_
 
+from openfisca_france.communes import map_by_depcom
 from openfisca_france.model.base import *  # noqa analysis:ignore
 from openfisca_france.france_taxbenefitsystem import COUNTRY_DIR
 
@@ -23,12 +24,10 @@ class taux_versement_transport(Variable):
 
         preload_taux_versement_transport()
         public = (categorie_salarie >= 2)
-        taux_versement_transport = fromiter(
-            (
-                get_taux_versement_transport(code_commune, period)
-                for code_commune in depcom_entreprise
-                ),
-            dtype = 'float',
+        taux_versement_transport = map_by_depcom(
+            lambda code_commune: get_taux_versement_transport(code_commune, period),
+            depcom_entreprise,
+            'float',
             )
         # "L'entreprise emploie-t-elle plus de 9 ou 10 salariés dans le périmètre de l'Autorité organisatrice de transport
         # (AOT) suivante ou syndicat mixte de transport (SMT)"
@@ -7,10 +7,11 @@ import json
 import logging
 import pkg_resources
 
-from numpy import ceil, fromiter, int16, logical_or as or_, logical_and as and_, take
+from numpy import ceil, int16, logical_or as or_, logical_and as and_, take
 
 import openfisca_france
 from openfisca_core.periods import Instant
+from openfisca_france.communes import map_by_depcom
 
 from openfisca_france.model.base import *  # noqa  analysis:ignore
 from openfisca_france.model.prestations.prestations_familiales.base_ressource import nb_enf
@@ -834,13 +835,7 @@ class zone_apl(Variable):
 
         preload_zone_apl()
         default_value = 2
-        return fromiter(
-            (
-                zone_apl_by_depcom.get(depcom_cell, default_value)
-                for depcom_cell in depcom
-                ),
-            dtype = int16,
-            )
+        return map_by_depcom(lambda code: zone_apl_by_depcom.get(code, default_value), depcom, int16)
 
 
 def preload_zone_apl():
@@ -15,9 +15,7 @@ class eligibilite_anah(Variable):
     definition_period = YEAR
 
     def formula(menage, period):
-        # depcom est le code INSEE de la localité, les deux premiers chiffres sont le département
-        # le reste de la division entière par 1000 donne ces deux chiffres sans manipulation de chaînes
-        departement = menage('depcom', period.first_month).astype(int) / 1000
+        departement = menage('departement', period.first_month)
 
         departements_idf = [75, 77, 78, 91, 92, 93, 94, 95]
         in_idf = sum([departement == departement_idf for departement_idf in departements_idf])
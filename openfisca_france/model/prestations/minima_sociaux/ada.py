@@ -19,7 +19,7 @@ class ada(Variable):
         nb_pers = af_nbenf + nb_parents
         ada_par_jour = (ada.montant_journalier_pour_une_personne +
             (nb_pers - 1) * ada.majoration_pers_supp +
-            ada.supplement_non_hebergement * (not place_hebergement)
+            ada.supplement_non_hebergement * np.logical_not(place_hebergement)
             )
 
         montant_ada = period.days * ada_par_jour * asile_demandeur
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""Simulations of a reform paired with its baseline, computing only once what the reform cannot change.
+
+The baseline simulation is run first, with `trace = True`, which records the variables used by each formula. The
+variables which may differ between the reform and the baseline are those changed by the reform (see
+`dependencies.get_changed_variables`) and all the variables depending on them in the trace. Before each reform
+calculation, the baseline results of every other variable are shared with the reform simulation, so that only the
+part of the computation graph downstream of the reform is evaluated again.
+"""
+
+from openfisca_core import periods
+
+from .dependencies import get_changed_variables, get_dependents_by_variable, get_downstream_variables
+
+
+class PairedSimulation(object):
+    def __init__(self, scenario, debug = False, opt_out_cache = False):
+        """Create the baseline and reform simulations of `scenario`, which must be a scenario of a reform."""
+        reform = scenario.tax_benefit_system
+        assert reform.baseline is not None, u"A paired simulation needs the scenario of a reform"
+        self.baseline_simulation = scenario.new_simulation(debug = debug, opt_out_cache = opt_out_cache,
+            trace = True, use_baseline = True)
+        self.reform_simulation = scenario.new_simulation(debug = debug, opt_out_cache = opt_out_cache)
+        self.changed_variables = get_changed_variables(reform)
+
+    def calculate(self, variable_name, period = None):
+        """Return the values of `variable_name` for the baseline and for the reform, as a pair of arrays."""
+        if period is not None and not isinstance(period, periods.Period):
+            period = periods.period(period)
+        baseline_array = self.baseline_simulation.calculate(variable_name, period)
+        self.share_unchanged_results()
+        return baseline_array, self.reform_simulation.calculate(variable_name, period)
+
+    def calculate_add(self, variable_name, period = None):
+        if period is not None and not isinstance(period, periods.Period):
+            period = periods.period(period)
+        baseline_array = self.baseline_simulation.calculate_add(variable_name, period)
+        self.share_unchanged_results()
+        return baseline_array, self.reform_simulation.calculate_add(variable_name, period)
+
+    def get_affected_variables(self):
+        """Return the names of the variables which may differ between the reform and the baseline."""
+        return get_downstream_variables(get_dependents_by_variable(self.baseline_simulation), self.changed_variables)
+
+    def share_unchanged_results(self):
+        """Copy the baseline results of the variables not affected by the reform to the reform simulation."""
+        share_results(self.baseline_simulation, self.reform_simulation, self.get_affected_variables())
+
+
+def share_results(source_simulation, target_simulation, excluded_variables):
+    """Copy to `target_simulation` the results of `source_simulation`, except those of `excluded_variables`.
+
+    Results already present in `target_simulation` are kept. Arrays are shared, not copied.
+    """
+    for entity_key, source_entity in source_simulation.entities.iteritems():
+        target_entity = target_simulation.entities[entity_key]
+        for variable_name, source_holder in source_entity._holders.iteritems():
+            if variable_name in excluded_variables:
+                continue
+            target_holder = target_entity.get_holder(variable_name)
+            if source_holder._array is not None and target_holder._array is None:
+                target_holder._array = source_holder._array
+            if source_holder._array_by_period:
+                if target_holder._array_by_period is None:
+                    target_holder._array_by_period = {}
+                for period, value in source_holder._array_by_period.iteritems():
+                    if period not in target_holder._array_by_period:
+                        target_holder._array_by_period[period] = value.copy() if isinstance(value, dict) else value
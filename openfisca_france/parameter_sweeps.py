@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Evaluation of a variable for a range of values of a parameter.
+
+A reform of the tax-benefit system, with its own copy of the swept parameter, is built once for the whole sweep, and
+the parameter is modified in place in this copy for each candidate value. A reference simulation, computed with the
+unmodified system and traced, provides the results of every variable which does not depend on the parameter: they are
+shared with the simulation of each candidate, which only evaluates the part of the computation graph downstream of the
+parameter.
+"""
+
+import re
+
+import numpy as np
+
+from openfisca_core import periods
+from openfisca_core.parameters import ParameterNode, Scale
+from .dependencies import get_dependents_by_variable, get_downstream_variables, get_variables_reading_parameters
+from .paired_simulations import share_results
+from .reform_overlays import Reform
+
+
+parameter_name_item_re = re.compile(r'(?P<name>[^.[\]]+)(\[(?P<index>\d+)\])?$')
+
+
+class parameter_sweep(Reform):
+    name = u"Balayage d'un paramètre"
+
+    def apply(self):
+        # The parameters are modified by `ParameterSweep`, which knows the swept parameter.
+        pass
+
+
+def get_parameter(parameters, parameter_name):
+    """Return the parameter named `parameter_name` (e.g. `impot_revenu.decote.seuil_celib`).
+
+    The brackets of a scale are designated by their index, e.g. `impot_revenu.bareme[2].rate`.
+    """
+    parameter = parameters
+    for item in parameter_name.split('.'):
+        match = parameter_name_item_re.match(item)
+        assert match is not None, u"Invalid parameter name: {}".format(parameter_name).encode('utf-8')
+        if isinstance(parameter, ParameterNode):
+            parameter = parameter.children[match.group('name')]
+        else:
+            parameter = getattr(parameter, match.group('name'))
+        if match.group('index') is not None:
+            assert isinstance(parameter, Scale), u"{} is not a scale".format(item).encode('utf-8')
+            parameter = parameter.brackets[int(match.group('index'))]
+    return parameter
+
+
+class ParameterSweep(object):
+    def __init__(self, tax_benefit_system, parameter_name, values):
+        """Prepare the sweep of the parameter named `parameter_name` over `values`."""
+        self.reform = parameter_sweep(tax_benefit_system)
+        self.parameter_name = parameter_name
+        parameters_by_name = {}
+
+        def modify_parameters(parameters):
+            # Going through the parameter copies it from the baseline: it can then be modified in place.
+            parameters_by_name[parameter_name] = get_parameter(parameters, parameter_name)
+            return parameters
+
+        self.reform.modify_parameters(modifier_function = modify_parameters)
+        parameter = parameters_by_name[parameter_name]
+        self.values_history = getattr(parameter, 'values_history', parameter)
+        self.values = values
+        self.changed_variables = get_variables_reading_parameters(self.reform, [parameter_name])
+
+    def new_scenario(self):
+        return self.reform.new_scenario()
+
+    def calculate(self, scenario, variable_name, period = None):
+        """Return the values of `variable_name` for every value of the parameter.
+
+        `scenario` must be a scenario created by `self.new_scenario()`. The parameter takes each value from the start
+        of `period`. The result is a 2-D array, with a row per entity and a column per value of the parameter.
+        """
+        if period is None:
+            period = scenario.period
+        elif not isinstance(period, periods.Period):
+            period = periods.period(period)
+        reference_simulation = scenario.new_simulation(trace = True, use_baseline = True)
+        reference_simulation.calculate(variable_name, period)
+        affected_variables = get_downstream_variables(get_dependents_by_variable(reference_simulation),
+            self.changed_variables)
+        values_list = self.values_history.values_list
+        arrays = []
+        try:
+            for value in self.values:
+                self.values_history.values_list = values_list
+                self.values_history.update(start = period.start, value = value)
+                self.reform._parameters_at_instant_cache = {}
+                simulation = scenario.new_simulation()
+                share_results(reference_simulation, simulation, affected_variables)
+                arrays.append(simulation.calculate(variable_name, period))
+        finally:
+            self.values_history.values_list = values_list
+            self.reform._parameters_at_instant_cache = {}
+        return np.column_stack(arrays)
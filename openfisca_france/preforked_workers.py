@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+"""Worker processes forked from a warmed-up tax-benefit system.
+
+Several structures of the tax-benefit system are only built when first needed: the tables of the zones APL and of
+the rates of versement transport (loaded by `FranceTaxBenefitSystem.prefill_cache`), the parameters at each instant,
+the compiled tax scales, the year-invariant variables... Built in each worker, they make the first requests slower,
+and each worker keeps a private copy of them.
+
+`warm_up` builds them in the master process, by calling `prefill_cache` and by running a simulation of a typical
+household for the period to serve. `collect_garbage` then runs a full garbage collection, so that the workers do not
+inherit the garbage of the warm-up. The workers forked afterwards (`fork_workers`, or the processes of a
+`WorkerPool`) inherit the warmed-up tax-benefit system, and serve their first requests as fast as the next ones.
+
+The warmed-up structures are not read-only: the workers start sharing their memory pages with the master process,
+but the reference counts and the garbage collections of Python 2 write to the objects they read, so that these pages
+are gradually copied in each worker. The gain is the time of the warm-up, not the memory.
+"""
+
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+
+from openfisca_core import periods
+
+
+log = logging.getLogger(__name__)
+
+WARM_UP_VARIABLES = [
+    'revenu_disponible',
+    'niveau_de_vie',
+    'aide_logement',
+    'rsa',
+    'ppa',
+    'af',
+    'irpp',
+    ]
+
+# Set by the master process before forking the workers of a pool, which inherit it.
+shared_tax_benefit_system = None
+
+
+def new_warm_up_scenario(tax_benefit_system, period):
+    """Return the scenario of a couple of employees with a child, renting their home."""
+    return tax_benefit_system.new_scenario().init_single_entity(
+        period = period,
+        parent1 = dict(age = 40, salaire_de_base = 24000),
+        parent2 = dict(age = 38, salaire_de_base = 12000),
+        enfants = [dict(age = 9)],
+        menage = dict(depcom = '69381', loyer = 600, statut_occupation_logement = 4),
+        )
+
+
+def warm_up(tax_benefit_system, period = None, variable_names = None):
+    """Build the structures of `tax_benefit_system` otherwise built by the first requests.
+
+    When a `period` is given, `variable_names` (by default `WARM_UP_VARIABLES`) are calculated for a typical household
+    during this period.
+    """
+    tax_benefit_system.prefill_cache()
+    if period is None:
+        return
+    period = periods.period(period)
+    simulation = new_warm_up_scenario(tax_benefit_system, period).new_simulation()
+    for variable_name in (WARM_UP_VARIABLES if variable_names is None else variable_names):
+        column = tax_benefit_system.get_column(variable_name, check_existence = True)
+        if column.definition_period == periods.MONTH:
+            simulation.calculate_add(variable_name, period)
+        else:
+            simulation.calculate(variable_name, period)
+
+
+def collect_garbage():
+    """Run a full garbage collection, before forking the workers."""
+    gc.collect()
+
+
+def fork_workers(processes, target):
+    """Fork `processes` workers running `target()`, and return their ids.
+
+    The workers exit when `target` returns.
+    """
+    pids = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                target()
+            except Exception:
+                log.exception(u'Worker {} failed'.format(os.getpid()))
+                exit_code = 1
+            except BaseException:
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        pids.append(pid)
+    return pids
+
+
+def stop_workers(pids):
+    """Terminate the workers `pids`, and wait for them."""
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    for pid in pids:
+        try:
+            os.waitpid(pid, 0)
+        except OSError:
+            pass
+
+
+def call_with_tax_benefit_system(function_and_arguments):
+    function, arguments = function_and_arguments
+    return function(shared_tax_benefit_system, *arguments)
+
+
+class WorkerPool(object):
+    def __init__(self, tax_benefit_system, processes = None, period = None):
+        """Warm up `tax_benefit_system` for `period` and fork `processes` workers (by default, as many as CPUs).
+
+        The workers find the tax-benefit system in a global of this module: only one pool can be active at a time.
+        """
+        global shared_tax_benefit_system
+        if shared_tax_benefit_system is not None:
+            raise ValueError(u"Another worker pool is active: close it before creating a new one")
+        warm_up(tax_benefit_system, period)
+        shared_tax_benefit_system = tax_benefit_system
+        collect_garbage()
+        self.pool = multiprocessing.Pool(processes)
+
+    def apply(self, function, *arguments):
+        """Return `function(tax_benefit_system, *arguments)`, called in a worker.
+
+        `function` must be picklable, e.g. a function defined at the top level of a module.
+        """
+        return self.pool.apply(call_with_tax_benefit_system, ((function, arguments),))
+
+    def imap_unordered(self, function, arguments_list):
+        """Iterate on `function(tax_benefit_system, *arguments)` for each item of `arguments_list`, in the order the
+        workers complete them."""
+        return self.pool.imap_unordered(call_with_tax_benefit_system,
+            ((function, tuple(arguments)) for arguments in arguments_list))
+
+    def map(self, function, arguments_list):
+        return self.pool.map(call_with_tax_benefit_system,
+            [(function, tuple(arguments)) for arguments in arguments_list])
+
+    def close(self):
+        global shared_tax_benefit_system
+        self.pool.close()
+        self.pool.join()
+        shared_tax_benefit_system = None
+
+    def terminate(self):
+        global shared_tax_benefit_system
+        self.pool.terminate()
+        self.pool.join()
+        shared_tax_benefit_system = None
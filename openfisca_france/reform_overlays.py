@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""Reforms sharing the parameters of their baseline, and a cache of built reforms.
+
+`openfisca_core.reforms.Reform.modify_parameters` copies the whole parameter tree of the baseline before modifying it,
+which takes most of the time needed to build a reform. The `Reform` class of this module gives the modifier function
+a copy-on-access view of the baseline parameters instead: the nodes the modifier goes through are copied when it
+accesses them, and all the other nodes are shared with the baseline.
+"""
+
+import collections
+import copy
+
+from openfisca_core import reforms
+from openfisca_core.parameters import ParameterNode
+from openfisca_core.taxbenefitsystems import TaxBenefitSystem
+
+
+class CopyOnAccessParameterNode(ParameterNode):
+    """A parameter node whose children are copied the first time they are accessed.
+
+    Only used while a reform modifies its parameters: the copied nodes are turned back into mere `ParameterNode`s
+    afterwards.
+    """
+    def __getattribute__(self, name):
+        attributes = object.__getattribute__(self, '__dict__')
+        if name == 'children':
+            for child_name in list(attributes['children']):
+                copy_child(self, child_name)
+        elif name in attributes['children']:
+            copy_child(self, name)
+        return object.__getattribute__(self, name)
+
+
+def copy_child(node, child_name):
+    attributes = object.__getattribute__(node, '__dict__')
+    copied_children = attributes['_copied_children']
+    if child_name in copied_children:
+        return
+    child = attributes['children'][child_name]
+    if isinstance(child, ParameterNode):
+        child = new_copy_on_access_node(child, attributes['_copied_nodes'])
+    else:
+        child = copy.deepcopy(child)
+    attributes['children'][child_name] = attributes[child_name] = child
+    copied_children.add(child_name)
+
+
+def new_copy_on_access_node(node, copied_nodes):
+    new_node = object.__new__(CopyOnAccessParameterNode)
+    attributes = object.__getattribute__(new_node, '__dict__')
+    attributes.update(node.__dict__)
+    attributes['children'] = node.children.copy()
+    attributes['_copied_children'] = set()
+    attributes['_copied_nodes'] = copied_nodes
+    copied_nodes.append(new_node)
+    return new_node
+
+
+def modify_parameters_copy_on_access(parameters, modifier_function):
+    """Return `modifier_function(parameters)`, copying only the nodes of `parameters` that it accesses."""
+    copied_nodes = []
+    modified_parameters = modifier_function(new_copy_on_access_node(parameters, copied_nodes))
+    for node in copied_nodes:
+        attributes = object.__getattribute__(node, '__dict__')
+        del attributes['_copied_children']
+        del attributes['_copied_nodes']
+        node.__class__ = ParameterNode
+    return modified_parameters
+
+
+class Reform(reforms.Reform):
+    def modify_parameters(self, modifier_function):
+        """Same as `openfisca_core.reforms.Reform.modify_parameters`, without copying the unmodified parameters."""
+        reform_parameters = modify_parameters_copy_on_access(self.baseline.parameters, modifier_function)
+        if not isinstance(reform_parameters, ParameterNode):
+            raise ValueError(
+                'modifier_function {} in module {} must return a ParameterNode'
+                .format(modifier_function.__name__, modifier_function.__module__,)
+                )
+        self.parameters = reform_parameters
+        self._parameters_at_instant_cache = {}
+
+    def apply_reform(self, reform_path):
+        return self.apply_reforms([reform_path])
+
+    def apply_reforms(self, reform_paths):
+        """Return this reform with the reforms of `reform_paths` applied in sequence.
+
+        Without this method, `openfisca_core.reforms.Reform.__getattr__` would apply them to the baseline, discarding
+        this reform. The most recently used combinations are kept in the own `ReformCache` of this reform.
+        """
+        # `self.reform_cache` would be the cache of the baseline, found by `__getattr__`.
+        reform_cache = self.__dict__.get('reform_cache')
+        if reform_cache is None:
+            reform_cache = self.reform_cache = ReformCache(self, getattr(self, 'REFORM_CACHE_SIZE', 16))
+        return reform_cache.get_reform(reform_paths)
+
+
+class ReformCache(object):
+    """The least recently used reforms of a tax-benefit system, by sequence of reforms applied.
+
+    The same reform object is returned to every caller asking for the same sequence of reforms: it must be treated as
+    read-only. A caller needing to modify a reform (e.g. its parameters, like `parameter_sweeps.ParameterSweep`) must
+    build its own instance, by calling the reform class on the tax-benefit system, instead of using this cache.
+    """
+    def __init__(self, baseline, size):
+        self.baseline = baseline
+        self.size = size
+        self.reform_by_reform_paths = collections.OrderedDict()
+
+    def get_reform(self, reform_paths):
+        """Return the baseline with the reforms of `reform_paths` applied in sequence, building it only if needed.
+
+        Each reform path looks like `openfisca_france.reforms.plf2016.plf2016`. The reforms built for the first paths
+        of the sequence are cached too, so that they are shared by the sequences starting with the same reforms.
+        """
+        reform = self.baseline
+        for index, reform_path in enumerate(reform_paths):
+            key = tuple(reform_paths[:index + 1])
+            cached_reform = self.reform_by_reform_paths.pop(key, None)
+            if cached_reform is None:
+                cached_reform = TaxBenefitSystem.apply_reform(reform, reform_path)
+            self.reform_by_reform_paths[key] = reform = cached_reform
+            while len(self.reform_by_reform_paths) > self.size:
+                self.reform_by_reform_paths.popitem(last = False)
+        return reform
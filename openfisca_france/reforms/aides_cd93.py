@@ -2,8 +2,8 @@
 
 from __future__ import division
 
-from openfisca_core.reforms import Reform
-from numpy import vectorize, logical_or as or_, absolute as abs_
+from openfisca_france.reform_overlays import Reform
+from numpy import logical_or as or_, absolute as abs_
 
 from ..model.base import *
 
@@ -20,18 +20,9 @@ class resident_93(Variable):
 
     def formula(self, simulation, period):
         period = period.first_month
-        depcom = simulation.calculate('depcom', period)
+        departement = simulation.calculate('departement', period)
 
-        def is_resident_93(code_insee):
-            prefix = code_insee[0:2]
-            result = (prefix == "93")
-            return result
-
-        is_resident_93_vec = vectorize(is_resident_93)
-
-        result = is_resident_93_vec(depcom)
-
-        return result
+        return departement == 93
 
 class adpa_eligibilite(Variable):
     column = BoolCol
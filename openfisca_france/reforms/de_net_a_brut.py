@@ -3,7 +3,7 @@
 from __future__ import division
 
 from openfisca_core import columns
-from openfisca_core.reforms import Reform
+from openfisca_france.reform_overlays import Reform
 from scipy.optimize import fsolve
 
 from .. import entities
@@ -5,7 +5,7 @@ from __future__ import division
 
 from openfisca_france.model.base import *  # noqa analysis:ignore
 
-from openfisca_core.reforms import Reform
+from openfisca_france.reform_overlays import Reform
 from openfisca_core.taxscales import MarginalRateTaxScale
 
 
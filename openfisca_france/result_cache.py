@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+"""Cache of the results of repeated requests, keyed by a fingerprint of the situation.
+
+Many requests to the web API are identical or nearly so: the same default situations of the simulators, the same
+household templates, retries... A `ResultCache` keeps the arrays calculated for a request, under a fingerprint of
+its scenario (normalised by `Scenario.post_process_test_case` when it was initialised, then serialised with sorted
+keys), of the key of its tax-benefit system (the version of the country package and the values of the parameters of
+the baseline, the full key of a reform and the values of the parameters it changes), and of the requested variables
+and periods.
+
+The cache holds at most `max_size` requests, evicting the least recently used ones, and forgets a request after `ttl`
+seconds. With a `directory`, the results are also written to a file per fingerprint, so that they survive the process
+and are shared between the workers of a server on the same host. The directory holds at most `max_size` files too:
+after each write, the expired files and the oldest written ones are removed. The cached arrays are read-only.
+
+The files are pickles: whoever can write to the directory can make the processes reading it execute arbitrary code.
+The directory must therefore belong to the user running the cache, and must not be writable by its group or by others,
+which `ResultCache` checks.
+"""
+
+import collections
+import cPickle as pickle
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+import weakref
+
+import numpy as np
+import pkg_resources
+
+from openfisca_core import periods
+from openfisca_core.parameters import ParameterNode, Scale
+
+from .dependencies import get_scale_values, get_values, iter_changed_parameter_names
+
+
+try:
+    country_package_version = pkg_resources.get_distribution('OpenFisca-France').version
+except pkg_resources.DistributionNotFound:
+    country_package_version = None
+
+baseline_key_by_tax_benefit_system = weakref.WeakKeyDictionary()
+
+
+def get_parameter_values(parameter):
+    if isinstance(parameter, ParameterNode):
+        return dict((child_name, get_parameter_values(child)) for child_name, child in parameter.children.iteritems())
+    if isinstance(parameter, Scale):
+        return get_scale_values(parameter)
+    return get_values(parameter)
+
+
+def get_baseline_key(tax_benefit_system):
+    """Return the name of the class of a tax-benefit system which is not a reform, followed by the version of the
+    country package and a digest of the values of its parameters.
+
+    Without them, the results cached on disk by a previous version of the model would still be served after an
+    upgrade. The key is computed once per tax-benefit system.
+    """
+    baseline_key = baseline_key_by_tax_benefit_system.get(tax_benefit_system)
+    if baseline_key is None:
+        baseline_key = baseline_key_by_tax_benefit_system[tax_benefit_system] = u'{}-{}@{}'.format(
+            tax_benefit_system.__class__.__name__,
+            country_package_version,
+            hashlib.sha1(json.dumps(get_parameter_values(tax_benefit_system.parameters), default = unicode,
+                sort_keys = True)).hexdigest(),
+            )
+    return baseline_key
+
+
+def get_tax_benefit_system_key(tax_benefit_system):
+    """Return the key of a tax-benefit system which is not a reform (see `get_baseline_key`), or the key of a reform.
+
+    The key of a reform is the key of its first baseline, followed by its full key and by a digest of the values of the
+    parameters it changes: the same reform class may be built with different parameters, and the parameters of a
+    reform may be modified in place (e.g. by `parameter_sweeps.ParameterSweep`).
+    """
+    baseline = tax_benefit_system
+    while getattr(baseline, 'baseline', None) is not None:
+        baseline = baseline.baseline
+    baseline_key = get_baseline_key(baseline)
+    if baseline is tax_benefit_system:
+        return baseline_key
+    reform_parameters = tax_benefit_system.parameters
+    changed_values = []
+    # Only the nodes copied by the reform are compared (see `reform_overlays`): the shared ones are skipped.
+    for parameter_name in iter_changed_parameter_names(baseline.parameters, reform_parameters):
+        parameter = reform_parameters
+        for child_name in ([] if parameter_name is None else parameter_name.split('.')):
+            parameter = parameter.children[child_name]
+        changed_values.append((parameter_name, get_parameter_values(parameter)))
+    reform_key = u'{}/{}'.format(baseline_key, tax_benefit_system.full_key)
+    if not changed_values:
+        return reform_key
+    return u'{}@{}'.format(reform_key, hashlib.sha1(json.dumps(changed_values, default = unicode,
+        sort_keys = True)).hexdigest())
+
+
+def check_directory(directory):
+    """Raise an error if `directory` does not belong to the current user or is writable by others than them."""
+    directory_stat = os.stat(directory)
+    if not stat.S_ISDIR(directory_stat.st_mode):
+        raise ValueError(u"{} is not a directory".format(directory))
+    if directory_stat.st_uid != os.getuid():
+        raise ValueError(u"The cache directory {} must belong to the current user".format(directory))
+    if directory_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise ValueError(u"The cache directory {} must not be writable by its group or by others".format(directory))
+
+
+def get_fingerprint(scenario, variable_names, periods_str = None):
+    """Return the fingerprint of the request of `variable_names` for `periods_str` (the period of `scenario` by
+    default)."""
+    if periods_str is None:
+        periods_str = [str(scenario.period)]
+    fingerprint = hashlib.sha1()
+    fingerprint.update(json.dumps(
+        dict(
+            periods = [str(periods.period(period_str)) for period_str in periods_str],
+            scenario = scenario.to_json(),
+            tax_benefit_system = get_tax_benefit_system_key(scenario.tax_benefit_system),
+            variables = list(variable_names),
+            ),
+        default = unicode,
+        sort_keys = True,
+        ))
+    input_variables = getattr(scenario, 'input_variables', None) or {}
+    for variable_name in sorted(input_variables):
+        for period, array in sorted(input_variables[variable_name].iteritems()):
+            fingerprint.update('{}@{}:'.format(variable_name, period))
+            fingerprint.update(np.ascontiguousarray(array).tostring())
+    return fingerprint.hexdigest()
+
+
+class ResultCache(object):
+    def __init__(self, max_size = 1000, ttl = None, directory = None):
+        """Keep the results of at most `max_size` requests, for `ttl` seconds (forever when None).
+
+        With a `directory`, the results are also kept in at most `max_size` files of this directory, which must belong
+        to the current user and be writable by them only.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        if directory is not None:
+            check_directory(directory)
+        self.directory = directory
+        self.entry_by_fingerprint = collections.OrderedDict()  # fingerprint -> (expiry time, results)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def calculate(self, scenario, variable_names, periods_str = None):
+        """Return the values of `variable_names` for `periods_str` (the period of `scenario` by default), as a dict of
+        dicts of arrays by period string by variable, calculating them only when the request is not in cache."""
+        if periods_str is None:
+            periods_str = [str(scenario.period)]
+        fingerprint = get_fingerprint(scenario, variable_names, periods_str)
+        results = self.get(fingerprint)
+        if results is None:
+            simulation = scenario.new_simulation()
+            results = dict(
+                (variable_name, dict(
+                    (period_str, simulation.calculate(variable_name, period_str))
+                    for period_str in periods_str
+                    ))
+                for variable_name in variable_names
+                )
+            self.set(fingerprint, results)
+        return results
+
+    def get(self, fingerprint):
+        """Return the results cached for `fingerprint`, or None."""
+        now = time.time()
+        with self.lock:
+            entry = self.entry_by_fingerprint.pop(fingerprint, None)
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                self.entry_by_fingerprint[fingerprint] = entry
+                self.hits += 1
+                return entry[1]
+        entry = self.read_file(fingerprint, now)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.store(fingerprint, entry)
+        return entry[1]
+
+    def set(self, fingerprint, results):
+        for array_by_period in results.itervalues():
+            for array in array_by_period.itervalues():
+                array.flags.writeable = False
+        entry = (None if self.ttl is None else time.time() + self.ttl, results)
+        with self.lock:
+            self.store(fingerprint, entry)
+        self.write_file(fingerprint, entry)
+
+    def store(self, fingerprint, entry):
+        self.entry_by_fingerprint.pop(fingerprint, None)
+        self.entry_by_fingerprint[fingerprint] = entry
+        while len(self.entry_by_fingerprint) > self.max_size:
+            self.entry_by_fingerprint.popitem(last = False)
+
+    def clear(self):
+        with self.lock:
+            self.entry_by_fingerprint.clear()
+
+    def get_file_path(self, fingerprint):
+        return os.path.join(self.directory, '{}.pickle'.format(fingerprint))
+
+    def read_file(self, fingerprint, now):
+        if self.directory is None:
+            return None
+        file_path = self.get_file_path(fingerprint)
+        try:
+            with open(file_path, 'rb') as pickle_file:
+                entry = pickle.load(pickle_file)
+        except (IOError, EOFError, pickle.UnpicklingError):
+            return None
+        if entry[0] is not None and entry[0] <= now:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            return None
+        for array_by_period in entry[1].itervalues():
+            for array in array_by_period.itervalues():
+                array.flags.writeable = False
+        return entry
+
+    def write_file(self, fingerprint, entry):
+        if self.directory is None:
+            return
+        # The file is renamed once written, so that other processes never read it partially written.
+        file_descriptor, temporary_path = tempfile.mkstemp(dir = self.directory, suffix = '.tmp')
+        with os.fdopen(file_descriptor, 'wb') as pickle_file:
+            pickle.dump(entry, pickle_file, pickle.HIGHEST_PROTOCOL)
+        os.rename(temporary_path, self.get_file_path(fingerprint))
+        self.sweep_files(time.time())
+
+    def sweep_files(self, now):
+        """Remove the files written more than `ttl` seconds ago, then the oldest written files beyond `max_size`."""
+        modification_time_by_file_path = {}
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith('.pickle'):
+                continue
+            file_path = os.path.join(self.directory, file_name)
+            try:
+                modification_time_by_file_path[file_path] = os.path.getmtime(file_path)
+            except OSError:
+                # Removed by another process.
+                continue
+        file_paths = sorted(modification_time_by_file_path, key = modification_time_by_file_path.get)
+        removed_count = max(len(file_paths) - self.max_size, 0)
+        if self.ttl is not None:
+            removed_count = max(removed_count, sum(
+                1
+                for modification_time in modification_time_by_file_path.itervalues()
+                if modification_time + self.ttl <= now
+                ))
+        for file_path in file_paths[:removed_count]:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
@@ -8,6 +8,7 @@ import re
 import uuid
 
 from openfisca_core import conv, scenarios
+from cache_policies import CacheBudget, Simulation, SpillingCacheBudget
 from entities import Individu, Famille, FoyerFiscal, Menage
 
 
@@ -21,6 +22,38 @@ year_or_month_or_day_re = re.compile(ur'(18|19|20)\d{2}(-(0[1-9]|1[0-2])(-([0-2]
 
 class Scenario(scenarios.AbstractScenario):
 
+    def new_simulation(self, debug = False, debug_all = False, use_baseline = False, trace = False,
+            opt_out_cache = False, max_cache_bytes = None, spill_directory = None):
+        """Same as `AbstractScenario.new_simulation`.
+
+        When `max_cache_bytes` is given, the simulation keeps at most this number of bytes of computed arrays in
+        cache, evicting the least recently used ones (see `cache_policies`). With a `spill_directory`, the evicted
+        arrays (inputs included) are written to memory-mapped files in this directory instead.
+        """
+        tax_benefit_system = self.tax_benefit_system
+        if use_baseline:
+            while tax_benefit_system.baseline is not None:
+                tax_benefit_system = tax_benefit_system.baseline
+        simulation = Simulation(
+            debug = debug,
+            debug_all = debug_all,
+            period = self.period,
+            tax_benefit_system = tax_benefit_system,
+            trace = trace,
+            opt_out_cache = opt_out_cache,
+            )
+        if max_cache_bytes is not None:
+            simulation.cache_budget = CacheBudget(max_cache_bytes, tax_benefit_system.recursive_variables) \
+                if spill_directory is None else SpillingCacheBudget(max_cache_bytes, spill_directory)
+        # The inputs are cached even for the variables of the cache blacklist: opt_out_cache only applies to the
+        # computed values.
+        simulation.opt_out_cache = False
+        self.fill_simulation(simulation)
+        simulation.opt_out_cache = opt_out_cache
+        if spill_directory is not None and max_cache_bytes is not None:
+            simulation.cache_budget.add_inputs(simulation)
+        return simulation
+
     def init_single_entity(self, axes = None, enfants = None, famille = None, foyer_fiscal = None, menage = None, parent1 = None, parent2 = None, period = None):
         if enfants is None:
             enfants = []
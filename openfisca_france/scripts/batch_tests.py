@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+"""Evaluate YAML tests by batches, each batch being computed in a single simulation.
+
+Most YAML tests describe a single household, and running each of them in its own simulation of size 1 spends most of
+the time in Python overhead. Compatible tests are stacked into one simulation of several households: their entities
+are concatenated (with ids prefixed by the index of the test), their outputs are calculated once for the whole batch,
+and the values of each test are compared to its expected values with its own error margins.
+
+Tests are compatible when they use the same tax-benefit system and period, have no axes, give the same variables
+computed by formulas, and give their common input variables for the same periods: stacking them is then equivalent to
+running them one by one, as the variables not given by a test get their default values in both cases (see
+`are_compatible`). A test failing in a batch is run again alone, so that the reported failures are exactly those of
+the one by one evaluation.
+
+A test passing in a batch is not run again, which leaves a risk: formulas whose result for a household depends on the
+other households of the simulation (population-wide branches, such as the short-circuits of the zero propagation or
+the `any()` tests of some formulas) may make a test pass in a batch and fail alone. With `options['verify']`, a share
+of the passing tests is run again alone to detect this, and `get_batch_outcomes` allows to compare the outcomes of both
+evaluations.
+"""
+
+
+import collections
+import copy
+import traceback
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_core.tools.test_runner import _run_test
+
+from openfisca_france.cache_policies import Simulation
+
+
+def get_periods_by_variable(scenario):
+    """Return the periods for which `scenario` gives each variable."""
+    if scenario.test_case is None:
+        return dict(
+            (variable_name, frozenset(array_by_period))
+            for variable_name, array_by_period in (scenario.input_variables or {}).iteritems()
+            )
+    column_by_name = scenario.tax_benefit_system.column_by_name
+    periods_by_variable = collections.defaultdict(set)
+    for entity_members in scenario.test_case.itervalues():
+        for entity_member in entity_members:
+            for variable_name, cell in entity_member.iteritems():
+                if variable_name not in column_by_name:
+                    continue
+                if isinstance(cell, dict):
+                    periods_by_variable[variable_name].update(
+                        period for period, value in cell.iteritems() if value is not None)
+                elif cell is not None:
+                    periods_by_variable[variable_name].add(scenario.period)
+    return dict(
+        (variable_name, frozenset(periods))
+        for variable_name, periods in periods_by_variable.iteritems()
+        )
+
+
+def are_compatible(periods_by_variable, other_periods_by_variable, column_by_name):
+    """Tell whether test cases giving these variables for these periods can be stacked in the same simulation.
+
+    A variable computed by a formula must be given by both test cases or by none of them. An input variable given by a
+    single test case gets its default value in the other one, as when it is not given.
+    """
+    for variable_name in set(periods_by_variable).union(other_periods_by_variable):
+        periods = periods_by_variable.get(variable_name)
+        other_periods = other_periods_by_variable.get(variable_name)
+        if periods == other_periods:
+            continue
+        if periods is not None and other_periods is not None \
+                or column_by_name[variable_name].formula_class.dated_formulas_class:
+            return False
+    return True
+
+
+def iter_batches(cases):
+    """Group `cases` into batches of compatible tests, and iterate on the lists of cases of each batch.
+
+    `cases` are (title, period_str, test) triples, and keep their order in their batch. The suggestions of the
+    scenarios (e.g. the birth dates of the persons without age) are applied first, as they add inputs.
+    """
+    batches = []
+    for case in cases:
+        scenario = case[2]['scenario']
+        if scenario.axes is not None:
+            yield [case]
+            continue
+        scenario.suggest()
+        column_by_name = scenario.tax_benefit_system.column_by_name
+        periods_by_variable = get_periods_by_variable(scenario)
+        for batch_scenario, batch_periods_by_variable, batch_cases in batches:
+            if batch_scenario.tax_benefit_system is scenario.tax_benefit_system \
+                    and batch_scenario.period == scenario.period \
+                    and (batch_scenario.test_case is None) == (scenario.test_case is None) \
+                    and are_compatible(batch_periods_by_variable, periods_by_variable, column_by_name):
+                batch_periods_by_variable.update(periods_by_variable)
+                batch_cases.append(case)
+                break
+        else:
+            batches.append((scenario, periods_by_variable, [case]))
+    for _, _, batch_cases in batches:
+        yield batch_cases
+
+
+def get_persons_count(scenario):
+    """Return the number of persons of a scenario given by input variables, each of them alone in their entities."""
+    for array_by_period in (scenario.input_variables or {}).itervalues():
+        for array in array_by_period.itervalues():
+            return len(array)
+    return 1
+
+
+def merge_input_variables(scenarios):
+    """Return a scenario concatenating the input variables of `scenarios`, and the slice of each scenario."""
+    column_by_name = scenarios[0].tax_benefit_system.column_by_name
+    persons_counts = [get_persons_count(scenario) for scenario in scenarios]
+    periods_by_variable = collections.defaultdict(set)
+    for scenario in scenarios:
+        for variable_name, array_by_period in (scenario.input_variables or {}).iteritems():
+            periods_by_variable[variable_name].update(array_by_period)
+    input_variables = {}
+    for variable_name, variable_periods in periods_by_variable.iteritems():
+        column = column_by_name[variable_name]
+        input_variables[variable_name] = dict(
+            (period, np.concatenate([
+                (scenario.input_variables or {}).get(variable_name, {}).get(period,
+                    np.full(persons_count, column.default, dtype = column.dtype))
+                for scenario, persons_count in zip(scenarios, persons_counts)
+                ]))
+            for period in variable_periods
+            )
+    stops = np.cumsum(persons_counts)
+    slices_by_scenario = [
+        dict((entity.key, slice(stop - persons_count, stop)) for entity in scenarios[0].tax_benefit_system.entities)
+        for persons_count, stop in zip(persons_counts, stops)
+        ]
+    merged_scenario = copy.copy(scenarios[0])
+    merged_scenario.input_variables = input_variables
+    return merged_scenario, slices_by_scenario
+
+
+def merge_test_cases(scenarios):
+    """Return a scenario stacking the test cases of `scenarios`, and the slice of each scenario in each entity."""
+    tax_benefit_system = scenarios[0].tax_benefit_system
+    test_case = dict((entity.plural, []) for entity in tax_benefit_system.entities)
+    slices_by_scenario = []
+    for scenario_index, scenario in enumerate(scenarios):
+        slice_by_entity = {}
+        for entity in tax_benefit_system.entities:
+            entity_members = test_case[entity.plural]
+            start = len(entity_members)
+            for entity_member in scenario.test_case.get(entity.plural, ()):
+                entity_member = entity_member.copy()
+                entity_member['id'] = u'{}-{}'.format(scenario_index, entity_member['id'])
+                if not entity.is_person:
+                    for role in entity.roles:
+                        role_name = role.plural or role.key
+                        members_id = entity_member.get(role_name)
+                        if isinstance(members_id, list):
+                            entity_member[role_name] = [
+                                u'{}-{}'.format(scenario_index, member_id)
+                                for member_id in members_id
+                                ]
+                        elif members_id is not None:
+                            entity_member[role_name] = u'{}-{}'.format(scenario_index, members_id)
+                entity_members.append(entity_member)
+            slice_by_entity[entity.key] = slice(start, len(entity_members))
+        slices_by_scenario.append(slice_by_entity)
+    merged_scenario = copy.copy(scenarios[0])
+    merged_scenario.test_case = test_case
+    return merged_scenario, slices_by_scenario
+
+
+def merge_scenarios(scenarios):
+    """Return a scenario stacking `scenarios`, and the slice of each scenario in each entity."""
+    if scenarios[0].test_case is None:
+        return merge_input_variables(scenarios)
+    return merge_test_cases(scenarios)
+
+
+def new_simulation(merged_scenario, slices_by_scenario):
+    """Return the simulation of a scenario returned by `merge_scenarios`."""
+    if merged_scenario.test_case is not None:
+        return merged_scenario.new_simulation()
+    # Without test case, an entity takes the size of the first input variable given for it, or of a single person: the
+    # entities of a batch where some of them have no input are sized explicitly.
+    simulation = Simulation(period = merged_scenario.period, tax_benefit_system = merged_scenario.tax_benefit_system)
+    for entity in simulation.entities.itervalues():
+        entity.count = slices_by_scenario[-1][entity.key].stop
+        entity.ids = range(entity.count)
+    merged_scenario.fill_simulation(simulation)
+    return simulation
+
+
+def check_case(simulation, slice_by_entity, period_str, test):
+    """Compare the values of the test in the batch simulation to its expected values, like `_run_test`."""
+    absolute_error_margin = test.get('absolute_error_margin')
+    relative_error_margin = test.get('relative_error_margin')
+    for variable_name, expected_value in (test.get(u'output_variables') or {}).iteritems():
+        entity_slice = slice_by_entity[simulation.get_variable_entity(variable_name).key]
+        if isinstance(expected_value, dict):
+            expected_value_by_period = expected_value.iteritems()
+        else:
+            expected_value_by_period = [(None, expected_value)]
+        for requested_period, expected_value_at_period in expected_value_by_period:
+            assert_near(
+                simulation.calculate(variable_name, requested_period)[entity_slice],
+                expected_value_at_period,
+                absolute_error_margin = absolute_error_margin,
+                message = u'{}@{}: '.format(variable_name, requested_period or period_str),
+                relative_error_margin = relative_error_margin,
+                )
+
+
+def run_case(title, period_str, test, options):
+    """Run a test alone and return its failure as a (title, message) pair, or None when it passes."""
+    try:
+        _run_test(period_str, test, options.get('verbose'), options)
+    except AssertionError as error:
+        return title, unicode(error)
+    except Exception:
+        return title, traceback.format_exc().decode('utf-8')
+    return None
+
+
+def get_batch_outcomes(cases):
+    """Return, for each (title, period_str, test) case of a batch, True when it passes in the batch simulation.
+
+    Return None when the cases cannot be evaluated together.
+    """
+    try:
+        merged_scenario, slices_by_scenario = merge_scenarios([test['scenario'] for _, _, test in cases])
+        simulation = new_simulation(merged_scenario, slices_by_scenario)
+    except Exception:
+        return None
+    outcomes = []
+    for (title, period_str, test), slice_by_entity in zip(cases, slices_by_scenario):
+        try:
+            check_case(simulation, slice_by_entity, period_str, test)
+        except Exception:
+            outcomes.append(False)
+        else:
+            outcomes.append(True)
+    return outcomes
+
+
+def is_verified(index, verify):
+    """Tell whether the passing test of rank `index` is run again alone, when a share `verify` of them is."""
+    return int(index * verify) != int((index + 1) * verify)
+
+
+def run_batch(cases, options):
+    """Run the (title, period_str, test) `cases` of a batch, and return the list of their failures.
+
+    The failing tests are run again alone, and so is a share `options['verify']` (from 0, the default, to 1) of the
+    passing ones.
+    """
+    outcomes = get_batch_outcomes(cases) if len(cases) > 1 else None
+    if outcomes is None:
+        return filter(None, [run_case(title, period_str, test, options) for title, period_str, test in cases])
+    verify = options.get('verify') or 0
+    failures = []
+    for index, ((title, period_str, test), passed) in enumerate(zip(cases, outcomes)):
+        if passed and not is_verified(index, verify):
+            continue
+        failure = run_case(title, period_str, test, options)
+        if failure is not None:
+            failures.append(failure)
+    return failures
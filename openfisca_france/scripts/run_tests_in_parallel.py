@@ -0,0 +1,175 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Run YAML tests in a pool of processes sharing a single tax-benefit system.
+
+The tax-benefit system is loaded once, then the processes are forked and inherit it. The test files are distributed
+to the processes from the longest to the shortest, according to their durations during the previous runs, which are
+stored in a JSON file: the last files to be run are the shortest ones, so that the processes finish together.
+With `--batch`, the compatible tests of each file are evaluated together in a single simulation (see `batch_tests`),
+and `--verify` runs again alone a share of the tests passing in a batch.
+
+Example:
+    python openfisca_france/scripts/run_tests_in_parallel.py tests --processes 4
+"""
+
+
+import argparse
+import glob
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+from openfisca_core.tools.test_runner import _parse_test_file
+
+from openfisca_france.scripts import batch_tests
+
+
+app_name = os.path.splitext(os.path.basename(__file__))[0]
+log = logging.getLogger(app_name)
+
+DEFAULT_DURATIONS_PATH = '.yaml_tests_durations.json'
+
+# Set by the parent process before forking the workers, which inherit it.
+shared_state = None
+
+
+def iter_test_files(paths):
+    """Iterate on the YAML files of `paths`, exploring directories recursively."""
+    for path in paths:
+        if os.path.isdir(path):
+            for yaml_path in sorted(glob.glob(os.path.join(path, '*.yaml'))):
+                yield yaml_path
+            for subdirectory in sorted(glob.glob(os.path.join(path, '*/'))):
+                for yaml_path in iter_test_files([subdirectory]):
+                    yield yaml_path
+        else:
+            yield path
+
+
+def sort_by_duration(yaml_paths, duration_by_path):
+    """Sort `yaml_paths` from the longest to the shortest. Files without known duration come first."""
+    return sorted(yaml_paths, key = lambda yaml_path: -duration_by_path.get(yaml_path, float('inf')))
+
+
+def run_test_file(yaml_path):
+    """Run the tests of a YAML file and return its path, its duration, its tests count and its failures.
+
+    Each failure is a pair of the title of the failed test and of its error message.
+    """
+    tax_benefit_system, options = shared_state
+    name_filter = options.get('name_filter')
+    filename = os.path.splitext(os.path.basename(yaml_path))[0]
+    start_time = time.time()
+    try:
+        tests = list(_parse_test_file(tax_benefit_system, yaml_path))
+    except Exception:
+        return yaml_path, time.time() - start_time, 1, [(yaml_path, traceback.format_exc())]
+    cases = []
+    for _, name, period_str, test in tests:
+        keywords = test.get('keywords', [])
+        if name_filter is not None and name_filter not in filename and name_filter not in name \
+                and name_filter not in keywords:
+            continue
+        title = u'{}: {}{} - {}'.format(
+            os.path.basename(yaml_path),
+            u'[{}] '.format(u', '.join(keywords)) if keywords else u'',
+            name,
+            period_str,
+            )
+        cases.append((title, period_str, test))
+    failures = []
+    if options.get('batch'):
+        for batch_cases in batch_tests.iter_batches(cases):
+            failures.extend(batch_tests.run_batch(batch_cases, options))
+    else:
+        for title, period_str, test in cases:
+            failure = batch_tests.run_case(title, period_str, test, options)
+            if failure is not None:
+                failures.append(failure)
+    return yaml_path, time.time() - start_time, len(cases), failures
+
+
+def run_test_files(tax_benefit_system, paths, processes = None, duration_by_path = None, options = None):
+    """Run the YAML tests of `paths` in `processes` processes (by default, as many as CPUs).
+
+    Iterate on the results of `run_test_file`, in the order the files are completed. `duration_by_path` gives the
+    durations of the previous runs.
+    """
+    global shared_state
+    yaml_paths = sort_by_duration(iter_test_files(paths), duration_by_path or {})
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    shared_state = (tax_benefit_system, options or {})
+    try:
+        if processes == 1:
+            for result in itertools.imap(run_test_file, yaml_paths):
+                yield result
+        else:
+            pool = multiprocessing.Pool(processes)
+            try:
+                for result in pool.imap_unordered(run_test_file, yaml_paths, chunksize = 1):
+                    yield result
+            finally:
+                pool.terminate()
+    finally:
+        shared_state = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help = "paths (files or directories) of tests to execute", nargs = '+')
+    parser.add_argument('-b', '--batch', action = 'store_true', default = False,
+        help = "evaluate the compatible tests of each file together, in a single simulation")
+    parser.add_argument('-d', '--durations', default = DEFAULT_DURATIONS_PATH,
+        help = "JSON file storing the durations of the test files, read and updated by each run")
+    parser.add_argument('-n', '--name_filter', default = None, help = "partial name of tests to execute. Only tests "
+        "with the given name_filter in their name, file name, or keywords will be run.")
+    parser.add_argument('-p', '--processes', default = None, help = "number of processes (default: number of CPUs)",
+        type = int)
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    parser.add_argument('-V', '--verify', default = 0, help = "with --batch, share of the tests passing in a batch "
+        "which are run again alone, from 0 to 1", type = float)
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
+
+    from openfisca_france import FranceTaxBenefitSystem
+    tax_benefit_system = FranceTaxBenefitSystem()
+
+    duration_by_path = {}
+    if os.path.exists(args.durations):
+        with open(args.durations) as durations_file:
+            duration_by_path = json.load(durations_file)
+    options = {
+        'batch': args.batch,
+        'name_filter': args.name_filter.decode('utf-8') if args.name_filter is not None else None,
+        'verbose': args.verbose,
+        'verify': args.verify,
+        }
+
+    start_time = time.time()
+    failures_count = 0
+    tests_count = 0
+    for yaml_path, duration, file_tests_count, failures in run_test_files(tax_benefit_system, args.path,
+            processes = args.processes, duration_by_path = duration_by_path, options = options):
+        duration_by_path[yaml_path] = duration
+        tests_count += file_tests_count
+        failures_count += len(failures)
+        for title, message in failures:
+            print(u'FAIL: {}\n{}\n'.format(title, message).encode('utf-8'))
+        sys.stdout.write('F' if failures else '.')
+        sys.stdout.flush()
+
+    with open(args.durations, 'w') as durations_file:
+        json.dump(duration_by_path, durations_file, indent = 2, separators = (',', ': '), sort_keys = True)
+    print(u'\nRan {} tests in {:.1f}s: {} failed'.format(tests_count, time.time() - start_time, failures_count))
+    return 1 if failures_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Serve calculations in preforked workers sharing a warmed-up tax-benefit system.
+
+The master process loads the tax-benefit system, warms it up for the given period (see `preforked_workers`), opens
+the listening socket, then forks the workers, which accept the connections of this socket.
+
+`POST /calculate` takes a JSON object with a list of `scenarios` (as returned by `Scenario.to_json`) and a list of
+`variables`, and returns a JSON object whose `values` are, for each scenario, the values of the variables for the
+period of the scenario. The results are kept in a `ResultCache` of each worker, optionally backed by a directory
+shared by the workers.
+
+Example:
+    python openfisca_france/scripts/serve_preforked.py --period 2017 --processes 4 --port 2000
+"""
+
+
+import argparse
+import BaseHTTPServer
+import json
+import logging
+import os
+import signal
+import sys
+
+from openfisca_france.preforked_workers import collect_garbage, fork_workers, stop_workers, warm_up
+from openfisca_france.result_cache import ResultCache
+
+
+app_name = os.path.splitext(os.path.basename(__file__))[0]
+log = logging.getLogger(app_name)
+
+
+class CalculateRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # Set on the server: tax_benefit_system, result_cache.
+
+    def do_POST(self):
+        if self.path != '/calculate':
+            self.send_json(404, dict(error = u"Unknown path: {}".format(self.path)))
+            return
+        try:
+            data = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            variable_names = data['variables']
+            tax_benefit_system = self.server.tax_benefit_system
+            json_to_scenario = tax_benefit_system.Scenario.make_json_to_instance(
+                tax_benefit_system = tax_benefit_system)
+            scenarios = []
+            for scenario_json in data['scenarios']:
+                scenario, error = json_to_scenario(scenario_json)
+                if error is not None:
+                    self.send_json(400, dict(error = error))
+                    return
+                scenarios.append(scenario)
+        except (KeyError, TypeError, ValueError) as exc:
+            self.send_json(400, dict(error = unicode(exc)))
+            return
+        if not isinstance(variable_names, list) or not all(
+                isinstance(variable_name, basestring) and variable_name in tax_benefit_system.column_by_name
+                for variable_name in variable_names):
+            self.send_json(400, dict(error = u"variables must be a list of names of variables, not {}".format(
+                json.dumps(variable_names))))
+            return
+        try:
+            values = []
+            for scenario in scenarios:
+                results = self.server.result_cache.calculate(scenario, variable_names)
+                values.append(dict(
+                    (variable_name, results[variable_name][str(scenario.period)].tolist())
+                    for variable_name in variable_names
+                    ))
+        except Exception as exc:
+            log.exception(u'Calculation of {} failed'.format(u', '.join(variable_names)))
+            self.send_json(500, dict(error = u"Calculation failed: {}".format(exc)))
+            return
+        self.send_json(200, dict(values = values))
+
+    def log_message(self, format, *args):
+        log.debug(u'{} - {}'.format(self.address_string(), format % args))
+
+    def send_json(self, status, data):
+        body = json.dumps(data)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def new_server(tax_benefit_system, host = '127.0.0.1', port = 2000, max_size = 1000, cache_directory = None):
+    server = BaseHTTPServer.HTTPServer((host, port), CalculateRequestHandler)
+    server.tax_benefit_system = tax_benefit_system
+    server.result_cache = ResultCache(max_size = max_size, directory = cache_directory)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-c', '--cache_directory', default = None,
+        help = "directory of the results cached on disk, shared by the workers")
+    parser.add_argument('-H', '--host', default = '127.0.0.1', help = "address to listen on")
+    parser.add_argument('-n', '--processes', default = None, help = "number of workers (by default, as many as CPUs)",
+        type = int)
+    parser.add_argument('-p', '--period', default = None,
+        help = "period of the simulation run to warm up the tax-benefit system (none when not given)")
+    parser.add_argument('-P', '--port', default = 2000, help = "port to listen on", type = int)
+    parser.add_argument('-s', '--cache_size', default = 1000, help = "number of requests cached by each worker",
+        type = int)
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.INFO, stream = sys.stdout)
+
+    import multiprocessing
+    from openfisca_france import FranceTaxBenefitSystem
+    tax_benefit_system = FranceTaxBenefitSystem()
+    warm_up(tax_benefit_system, args.period)
+    server = new_server(tax_benefit_system, args.host, args.port, args.cache_size, args.cache_directory)
+    collect_garbage()
+    processes = args.processes or multiprocessing.cpu_count()
+    pids = fork_workers(processes, server.serve_forever)
+    log.info(u'{} workers listening on {}:{}'.format(processes, args.host, args.port))
+    signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(0))
+    try:
+        for _ in pids:
+            os.wait()
+    finally:
+        stop_workers(pids)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Simulate a survey by chunks of households, and write the requested variables in a CSV file per entity.
+
+The survey has a row per person, with the ids and legacy roles of their entities (see `survey_streaming`). The
+tax-benefit system is loaded once, and the memory used is bounded by the size of the chunks.
+
+Example:
+    python openfisca_france/scripts/simulate_survey.py erfs_2014.csv 2014 results -v revenu_disponible niveau_de_vie
+"""
+
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+from openfisca_france import survey_streaming
+from openfisca_france.decompositions import get_decomposition_plan
+
+
+app_name = os.path.splitext(os.path.basename(__file__))[0]
+log = logging.getLogger(app_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('survey', help = "path of the survey file (.csv, .h5 or .parquet)")
+    parser.add_argument('period', help = "period to simulate, e.g. 2014")
+    parser.add_argument('output_directory', help = "directory of the CSV files of the results")
+    parser.add_argument('-c', '--chunk_size', default = 100000, help = "number of persons simulated together",
+        type = int)
+    parser.add_argument('-d', '--decomposition', action = 'store_true', default = False,
+        help = "also write the variables of the decomposition of the tax-benefit system")
+    parser.add_argument('-k', '--key', default = None, help = "key of the table in a HDF5 file")
+    parser.add_argument('-v', '--variables', default = ['revenu_disponible', 'niveau_de_vie'], nargs = '+',
+        help = "variables to write")
+    parser.add_argument('--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.INFO, stream = sys.stdout)
+
+    from openfisca_france import FranceTaxBenefitSystem
+    tax_benefit_system = FranceTaxBenefitSystem()
+
+    variable_names = list(args.variables)
+    if args.decomposition:
+        variable_names.extend(
+            code
+            for code in get_decomposition_plan(tax_benefit_system).codes
+            if code not in variable_names
+            )
+    blocks = survey_streaming.iter_blocks(args.survey, block_size = args.chunk_size, key = args.key)
+    writer = survey_streaming.CsvResultsWriter(tax_benefit_system, args.output_directory, variable_names)
+    start_time = time.time()
+    persons_count = 0
+    try:
+        for chunk_index, result in enumerate(survey_streaming.iter_results(tax_benefit_system, blocks, args.period,
+                variable_names, chunk_size = args.chunk_size)):
+            writer.write(result)
+            persons_count += result['persons_count']
+            log.info(u'Chunk {}: {} persons simulated in {:.1f}s ({:.0f} persons/s)'.format(chunk_index,
+                result['persons_count'], result['duration'], result['persons_count'] / result['duration']))
+    finally:
+        writer.close()
+    log.info(u'{} persons simulated in {:.1f}s'.format(persons_count, time.time() - start_time))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
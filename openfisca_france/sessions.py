@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""Simulations of a situation edited input by input, recalculating only what each edit changes.
+
+Front-ends such as mes-aides resubmit the whole situation after every change of a field. A `SimulationSession` keeps
+the simulation of the situation instead, run with `trace = True`, which records for each calculated variable and
+period the variables and periods its formula read. When an input is changed for some periods (e.g. `loyer` for a
+month), the cached results depending on it, directly or not, are removed, following the trace; the next calculations
+evaluate again these formulas only, and read every other result from the cache.
+
+Two periods of a variable are linked when they overlap (e.g. a month and its year, read with `calculate_add`). The
+values of year-invariant variables (see `year_invariance`) for any month of a year are those of January. When an
+input is changed, the values of this input previously calculated by its formula or base function (e.g. extrapolated
+from the last known value) are removed too.
+"""
+
+import collections
+
+import numpy as np
+
+from openfisca_core import periods
+
+from .year_invariance import get_year_invariant_variables
+
+
+def periods_overlap(period, other_period):
+    """Return True when two periods overlap. `None` (for ETERNITY variables) overlaps every period."""
+    if period is None or other_period is None:
+        return True
+    return period.start <= other_period.stop and other_period.start <= period.stop
+
+
+class SimulationSession(object):
+    def __init__(self, scenario, debug = False):
+        """Create the simulation of `scenario`, the situation to edit."""
+        self.simulation = scenario.new_simulation(debug = debug, trace = True)
+        self.year_invariant_variables = get_year_invariant_variables(self.simulation.tax_benefit_system)
+
+    def calculate(self, variable_name, period = None):
+        return self.simulation.calculate(variable_name, period)
+
+    def calculate_add(self, variable_name, period = None):
+        return self.simulation.calculate_add(variable_name, period)
+
+    def get_holder(self, variable_name):
+        return self.simulation.get_variable_entity(variable_name).get_holder(variable_name)
+
+    def set_input(self, variable_name, period, value):
+        """Change the input `variable_name` for `period`, and remove the cached results depending on it.
+
+        `value` is an array of the values of the entities, or a single value given to all of them. Periods longer
+        than the definition period of the variable are handled by its `set_input` (e.g. a yearly `loyer` is divided
+        between the months of the year). Return the set of the `(variable_name, period)` removed from the cache.
+        """
+        if period is not None and not isinstance(period, periods.Period):
+            period = periods.period(period)
+        holder = self.get_holder(variable_name)
+        array = np.asarray(value, dtype = holder.column.dtype)
+        if array.ndim == 0:
+            array = holder.entity.filled_array(array, dtype = holder.column.dtype)
+        # The values of the input calculated by its formula, and its values given for periods overlapping `period`,
+        # are replaced.
+        changed_periods = set(
+            traced_period
+            for (traced_variable_name, traced_period), step in self.simulation.traceback.iteritems()
+            if traced_variable_name == variable_name and step.get('is_computed')
+            )
+        changed_periods.add(period)
+        if holder._array_by_period is not None:
+            changed_periods.update(
+                cached_period
+                for cached_period in holder._array_by_period
+                if periods_overlap(cached_period, period)
+                )
+        invalidated = self.invalidate([(variable_name, changed_period) for changed_period in changed_periods])
+        holder.set_input(period, array)
+        return invalidated
+
+    def invalidate(self, changed_variables_infos):
+        """Remove from the cache the results of `changed_variables_infos` and of the variables depending on them.
+
+        Return the set of the `(variable_name, period)` removed from the cache, or to be calculated again.
+        """
+        dependents_by_input_by_variable = collections.defaultdict(lambda: collections.defaultdict(set))
+        for variable_infos, step in self.simulation.traceback.iteritems():
+            for input_variable_name, input_period in step.get('input_variables_infos', ()):
+                dependents_by_input_by_variable[input_variable_name][input_period].add(variable_infos)
+
+        invalidated = set()
+        pending_variables_infos = list(changed_variables_infos)
+        while pending_variables_infos:
+            variable_infos = pending_variables_infos.pop()
+            if variable_infos in invalidated:
+                continue
+            invalidated.add(variable_infos)
+            variable_name, period = variable_infos
+            self.remove_from_cache(variable_name, period)
+            if variable_name in self.year_invariant_variables and period is not None:
+                period = period.this_year
+                # The other months of the year are cached with the same array as January: they are removed too.
+                holder = self.get_holder(variable_name)
+                if holder._array_by_period is not None:
+                    pending_variables_infos.extend(
+                        (variable_name, cached_period)
+                        for cached_period in holder._array_by_period
+                        if periods_overlap(cached_period, period)
+                        )
+            for input_period, dependents in dependents_by_input_by_variable.get(variable_name, {}).iteritems():
+                if periods_overlap(input_period, period):
+                    pending_variables_infos.extend(dependents)
+        return invalidated
+
+    def remove_from_cache(self, variable_name, period):
+        holder = self.get_holder(variable_name)
+        if period is None:
+            holder._array = None
+        elif holder._array_by_period is not None:
+            holder._array_by_period.pop(period, None)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""Simulation of large populations split into shards computed by a pool of processes.
+
+A population is described by arrays, as in surveys: the input variables, and for each group entity (famille, foyer
+fiscal, ménage) the index of the entity of each person and their legacy role (quifam, quifoy, quimen). Households
+linked by a common entity (e.g. a student living alone but declared in the foyer fiscal of their parents) are kept in
+the same shard, so that each shard can be simulated independently. The shards are computed by forked processes,
+which share the tax-benefit system and the population of the parent process instead of loading them again, and the
+requested variables are merged back in the order of the population.
+
+Forking is required: this runner works on Linux and macOS, not on Windows.
+"""
+
+import multiprocessing
+
+import numpy as np
+
+from openfisca_core import periods
+
+from .cache_policies import Simulation
+
+
+class Population(object):
+    def __init__(self, members_entity_id_by_entity, members_legacy_role_by_entity, input_variables):
+        """Describe a population.
+
+        `members_entity_id_by_entity` and `members_legacy_role_by_entity` map the key of each group entity to an array
+        with a cell per person. `input_variables` maps the name of each input variable to a dict of arrays by period,
+        with a cell per person or per entity of the variable.
+        """
+        self.members_entity_id_by_entity = members_entity_id_by_entity
+        self.members_legacy_role_by_entity = members_legacy_role_by_entity
+        self.input_variables = dict(
+            (variable_name, dict((periods.period(period), array) for period, array in array_by_period.iteritems()))
+            for variable_name, array_by_period in input_variables.iteritems()
+            )
+        self.persons_count = len(next(members_entity_id_by_entity.itervalues()))
+
+    def get_households(self):
+        """Return, for each person, the index of the first person of the set of persons linked to them by entities."""
+        household_by_person = np.arange(self.persons_count)
+        while True:
+            previous_household_by_person = household_by_person.copy()
+            for members_entity_id in self.members_entity_id_by_entity.itervalues():
+                household_by_entity = np.full(members_entity_id.max() + 1, self.persons_count, dtype = np.int64)
+                np.minimum.at(household_by_entity, members_entity_id, household_by_person)
+                household_by_person = household_by_entity[members_entity_id]
+            if (household_by_person == previous_household_by_person).all():
+                return household_by_person
+
+    def split(self, shards_count):
+        """Return the sorted indexes of the persons of each shard, splitting the population at household boundaries."""
+        households = self.get_households()
+        persons = np.argsort(households, kind = 'mergesort')
+        sorted_households = households[persons]
+        household_starts = np.flatnonzero(np.concatenate(([True], sorted_households[1:] != sorted_households[:-1])))
+        targets = np.arange(1, shards_count) * self.persons_count // shards_count
+        boundaries = household_starts[np.minimum(np.searchsorted(household_starts, targets), len(household_starts) - 1)]
+        boundaries = np.unique(np.concatenate(([0], boundaries[boundaries > 0], [self.persons_count])))
+        return [np.sort(persons[start:stop]) for start, stop in zip(boundaries[:-1], boundaries[1:])]
+
+    def get_entity_indexes(self, tax_benefit_system, persons):
+        """Return, for each entity key, the sorted indexes of the entities of `persons`."""
+        entity_indexes_by_entity = {tax_benefit_system.person_entity.key: persons}
+        for entity_key, members_entity_id in self.members_entity_id_by_entity.iteritems():
+            entity_indexes_by_entity[entity_key] = np.unique(members_entity_id[persons])
+        return entity_indexes_by_entity
+
+    def new_simulation(self, tax_benefit_system, period, persons = None, **simulation_options):
+        """Return a simulation of the population, or of the subset of its `persons`."""
+        if persons is None:
+            persons = np.arange(self.persons_count)
+        entity_indexes_by_entity = self.get_entity_indexes(tax_benefit_system, persons)
+        simulation = Simulation(period = periods.period(period), tax_benefit_system = tax_benefit_system,
+            **simulation_options)
+        for entity in simulation.entities.itervalues():
+            entity.count = len(entity_indexes_by_entity[entity.key])
+            entity.ids = range(entity.count)
+            if entity.is_person:
+                continue
+            members_entity_id = self.members_entity_id_by_entity[entity.key][persons]
+            entity.members_entity_id = np.searchsorted(entity_indexes_by_entity[entity.key],
+                members_entity_id).astype(np.int32)
+            entity.members_legacy_role = self.members_legacy_role_by_entity[entity.key][persons].astype(np.int32)
+        scenario = tax_benefit_system.new_scenario()
+        scenario.period = simulation.period
+        scenario.input_variables = dict(
+            (variable_name, dict(
+                (variable_period, array[entity_indexes_by_entity[simulation.get_variable_entity(variable_name).key]])
+                for variable_period, array in array_by_period.iteritems()
+                ))
+            for variable_name, array_by_period in self.input_variables.iteritems()
+            )
+        scenario.fill_simulation(simulation)
+        return simulation
+
+
+def calculate(simulation, variable_name, period):
+    """Return the values of `variable_name` for `period`, summed over `period` when it is longer than the variable's."""
+    column = simulation.tax_benefit_system.get_column(variable_name, check_existence = True)
+    if column.definition_period == periods.MONTH and period.unit == periods.YEAR:
+        return simulation.calculate_add(variable_name, period)
+    return simulation.calculate(variable_name, period)
+
+
+# Set by the parent process before forking the workers, which inherit it.
+shared_state = None
+
+
+def calculate_shard(shard_index):
+    tax_benefit_system, population, period, variable_names, shards = shared_state
+    simulation = population.new_simulation(tax_benefit_system, period, shards[shard_index])
+    return [calculate(simulation, variable_name, period) for variable_name in variable_names]
+
+
+def calculate_variables(tax_benefit_system, population, period, variable_names, processes = None,
+        shards_count = None):
+    """Compute `variable_names` for the whole `population` during `period`, using a pool of `processes` processes.
+
+    `processes` defaults to the number of CPUs, and the population is split into `shards_count` shards (by default,
+    as many as processes). Return a dict of arrays by variable name, in the order of the persons or entities of the
+    population.
+    """
+    global shared_state
+    period = periods.period(period)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    shards = population.split(shards_count or processes)
+    shared_state = (tax_benefit_system, population, period, variable_names, shards)
+    try:
+        if processes == 1 or len(shards) == 1:
+            arrays_by_shard = [calculate_shard(shard_index) for shard_index in range(len(shards))]
+        else:
+            pool = multiprocessing.Pool(processes)
+            try:
+                arrays_by_shard = pool.map(calculate_shard, range(len(shards)), chunksize = 1)
+            finally:
+                pool.terminate()
+    finally:
+        shared_state = None
+    array_by_variable = {}
+    for variable_index, variable_name in enumerate(variable_names):
+        column = tax_benefit_system.get_column(variable_name)
+        entity_key = column.entity.key
+        entity_count = (population.persons_count if entity_key == tax_benefit_system.person_entity.key
+            else population.members_entity_id_by_entity[entity_key].max() + 1)
+        array = None
+        for persons, arrays in zip(shards, arrays_by_shard):
+            shard_array = arrays[variable_index]
+            if array is None:
+                # The entities without members, if any, keep the default value.
+                array = np.full(entity_count, column.default, dtype = shard_array.dtype)
+            array[population.get_entity_indexes(tax_benefit_system, persons)[entity_key]] = shard_array
+        array_by_variable[variable_name] = array
+    return array_by_variable
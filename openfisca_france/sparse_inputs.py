@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""Constant-aware storage for the boxes of the income tax return.
+
+The model declares several hundred input variables for the boxes of the tax return (`f7ud`, `f6de`, `b1ab`...).
+In survey-scale simulations almost all of them are zero. Instead of allocating and caching a dense default array for
+each box touched by a formula, constant columns are stored as a read-only, zero-strided view of a single value: their
+memory footprint does not depend on the number of foyers fiscaux, and `is_zero` answers in constant time.
+
+These views are shared by every reader of the holder cache: writing into them raises a `ValueError` instead of
+silently changing the box of every foyer fiscal. Code that needs to modify a box in place must copy it first.
+"""
+
+import numpy as np
+
+from openfisca_core.base_functions import requested_period_default_value
+from openfisca_core.periods import YEAR
+
+from .entities import FoyerFiscal
+
+
+def constant_array(value, count, dtype):
+    """Return a read-only array of `count` cells equal to `value`, storing a single cell."""
+    return np.broadcast_to(np.array(value, dtype = dtype), (count, ))
+
+
+def is_constant_array(array):
+    """Return True when `array` is known to hold a single value without looking at its cells."""
+    return array.ndim == 1 and (array.size <= 1 or array.strides[0] == 0)
+
+
+def is_zero(array):
+    """Return True when all the cells of `array` are zero (or False).
+
+    The answer is immediate for constant arrays, which lets formulas skip whole computations for boxes nobody filled.
+    """
+    if is_constant_array(array):
+        return array.size == 0 or not array[0]
+    return not array.any()
+
+
+def compact(array):
+    """Return a constant array when all the cells of `array` are equal, `array` itself otherwise."""
+    if not isinstance(array, np.ndarray) or array.ndim != 1 or is_constant_array(array):
+        return array
+    first_value = array[0]
+    if (array != first_value).any():
+        return array
+    return constant_array(first_value, array.size, array.dtype)
+
+
+def requested_period_constant_default_value(formula, simulation, period, *extra_params):
+    """Same as `requested_period_default_value`, but the default value is stored as a constant array."""
+    if formula.find_function(period) is not None:
+        return formula.exec_function(simulation, period, *extra_params)
+    holder = formula.holder
+    column = holder.column
+    return constant_array(column.default, holder.entity.count, column.dtype)
+
+
+def set_input_compact(formula, period, array):
+    formula.holder.put_in_cache(compact(array), period)
+
+
+def is_declaration_box(column):
+    """Return True for the yearly inputs of the foyer fiscal, i.e. the boxes of the tax return."""
+    formula_class = column.formula_class
+    return (
+        column.entity is FoyerFiscal and
+        column.definition_period == YEAR and
+        not formula_class.dated_formulas_class and
+        formula_class.base_function.im_func is requested_period_default_value
+        )
+
+
+def use_constant_declaration_boxes(tax_benefit_system):
+    """Store the default and constant values of every declaration box as constant arrays."""
+    for column in tax_benefit_system.column_by_name.itervalues():
+        if not is_declaration_box(column):
+            continue
+        formula_class = column.formula_class
+        formula_class.base_function = requested_period_constant_default_value
+        if 'set_input' not in formula_class.__dict__:  # Keep the boxes declaring their own set_input untouched.
+            formula_class.set_input = set_input_compact
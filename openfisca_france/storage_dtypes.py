@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+"""Compact storage of counts, ages and enumerations.
+
+OpenFisca-Core stores the values of a variable with the dtype of its column: float32 for `FloatCol`, bool for `BoolCol`,
+int32 for `IntCol` and int16 for `EnumCol`. The counts and ages of the model, and its enumerations, fit in one or two
+bytes: their columns are given the narrower dtype declared in `conf/storage_dtypes.py`, and enumerations with less than
+128 items are stored as int8. Formula results are cast to the dtype of their column before being cached, so the memory
+used by these variables is divided by 2 to 4 without any change in the formulas.
+"""
+
+import numpy as np
+
+from openfisca_core.columns import EnumCol
+
+
+def get_storage_dtype(column, storage_dtype_by_variable):
+    """Return the dtype in which the values of `column` are stored, or None to keep the dtype of the column class."""
+    dtype = storage_dtype_by_variable.get(column.name)
+    if dtype is not None:
+        return np.dtype(dtype).type
+    if isinstance(column, EnumCol) and len(column.enum) <= np.iinfo(np.int8).max:
+        return np.int8
+    return None
+
+
+def use_storage_dtypes(tax_benefit_system):
+    """Give the columns of `tax_benefit_system` the storage dtype of the policy of the system."""
+    for column in tax_benefit_system.column_by_name.itervalues():
+        dtype = get_storage_dtype(column, tax_benefit_system.storage_dtype_by_variable)
+        if dtype is not None:
+            column.dtype = dtype
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+"""Simulation of surveys read and written by chunks of households.
+
+A survey (e.g. ERFS) is a table with a row per person: the ids of their famille, foyer fiscal and ménage (`idfam`,
+`idfoy`, `idmen`), their legacy roles in these entities (`quifam`, `quifoy`, `quimen`), and input variables. The
+variables of the group entities are read on the first person of each entity (legacy role 0). The columns which are
+not variables of the tax-benefit system are ignored, and the inputs are given for the simulated period.
+
+The rows are read by blocks (from CSV, HDF5 or Parquet files), regrouped into chunks of whole households (persons
+linked by any entity, see `sharded_simulations.Population.get_households`), and each chunk is simulated with the same
+tax-benefit system. The results are yielded chunk by chunk, and can be written incrementally: the memory used is
+bounded by the size of the chunks. The rows of each household must be contiguous in the survey.
+
+HDF5 files are read with pandas (and PyTables), Parquet files with pyarrow.
+"""
+
+import csv
+import os
+import time
+
+import numpy as np
+
+from openfisca_core import periods
+
+from .sharded_simulations import Population, calculate
+
+
+DEFAULT_ID_COLUMN_BY_ENTITY = dict(famille = 'idfam', foyer_fiscal = 'idfoy', menage = 'idmen')
+DEFAULT_ROLE_COLUMN_BY_ENTITY = dict(famille = 'quifam', foyer_fiscal = 'quifoy', menage = 'quimen')
+
+
+def iter_csv_blocks(csv_path, block_size = 10000):
+    """Iterate on the blocks of at most `block_size` rows of a CSV file, as dicts of arrays of strings by column."""
+    with open(csv_path, 'rb') as csv_file:
+        reader = csv.reader(csv_file)
+        columns = next(reader)
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) == block_size:
+                yield dict(zip(columns, (np.array(values) for values in zip(*rows))))
+                rows = []
+        if rows:
+            yield dict(zip(columns, (np.array(values) for values in zip(*rows))))
+
+
+def iter_hdf_blocks(hdf_path, key, block_size = 10000):
+    """Iterate on the blocks of at most `block_size` rows of a HDF5 table, as dicts of arrays by column."""
+    import pandas
+    for data_frame in pandas.read_hdf(hdf_path, key, chunksize = block_size):
+        yield dict((column, data_frame[column].values) for column in data_frame.columns)
+
+
+def iter_parquet_blocks(parquet_path):
+    """Iterate on the row groups of a Parquet file, as dicts of arrays by column."""
+    import pyarrow.parquet
+    parquet_file = pyarrow.parquet.ParquetFile(parquet_path)
+    for row_group_index in range(parquet_file.num_row_groups):
+        data_frame = parquet_file.read_row_group(row_group_index).to_pandas()
+        yield dict((column, data_frame[column].values) for column in data_frame.columns)
+
+
+def iter_blocks(path, block_size = 10000, key = None):
+    """Iterate on the blocks of rows of a survey file, according to the extension of `path`."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return iter_csv_blocks(path, block_size)
+    if extension in ('.h5', '.hdf', '.hdf5'):
+        return iter_hdf_blocks(path, key, block_size)
+    if extension in ('.parq', '.parquet'):
+        return iter_parquet_blocks(path)
+    raise ValueError(u"Unknown survey file format: {}".format(path).encode('utf-8'))
+
+
+def convert_array(array, dtype):
+    """Convert an array read from a survey file (e.g. strings from a CSV file) to `dtype`."""
+    if array.dtype == dtype:
+        return array
+    if array.dtype.kind in 'SU':
+        if dtype.kind == 'b':
+            return np.in1d(np.char.lower(array), ['1', 'true'])
+        if dtype.kind in 'fiu':
+            return array.astype(np.float64).astype(dtype)
+    return array.astype(dtype)
+
+
+def get_rows_count(chunk):
+    return len(next(chunk.itervalues()))
+
+
+def get_households(chunk, id_column_by_entity):
+    """Return, for each row of `chunk`, the index of the first row of its household."""
+    population = Population(
+        members_entity_id_by_entity = dict(
+            (entity_key, np.unique(chunk[id_column], return_inverse = True)[1])
+            for entity_key, id_column in id_column_by_entity.iteritems()
+            ),
+        members_legacy_role_by_entity = {},
+        input_variables = {},
+        )
+    return population.get_households()
+
+
+def iter_chunks(blocks, chunk_size, id_column_by_entity = None):
+    """Regroup `blocks` of rows into chunks of whole households, of about `chunk_size` persons.
+
+    A chunk is only longer than `chunk_size` when a single household is.
+    """
+    if id_column_by_entity is None:
+        id_column_by_entity = DEFAULT_ID_COLUMN_BY_ENTITY
+    pending = None
+    for block in blocks:
+        pending = block if pending is None else dict(
+            (column, np.concatenate((array, block[column])))
+            for column, array in pending.iteritems()
+            )
+        while get_rows_count(pending) > chunk_size:
+            households = get_households(pending, id_column_by_entity)
+            if (np.diff(households) < 0).any():
+                raise ValueError("The rows of each household must be contiguous in the survey")
+            household_starts = np.flatnonzero(households == np.arange(len(households)))[1:]
+            # The household of the last row may continue in the next block.
+            cut_candidates = household_starts[household_starts <= chunk_size]
+            if cut_candidates.size:
+                stop = cut_candidates[-1]
+            elif household_starts.size:
+                stop = household_starts[0]
+            else:
+                break
+            yield dict((column, array[:stop]) for column, array in pending.iteritems())
+            pending = dict((column, array[stop:]) for column, array in pending.iteritems())
+    if pending is not None and get_rows_count(pending):
+        yield pending
+
+
+def get_entity_array(population, entity_key, array, default):
+    """Return the values of the entities `entity_key` of `population`, given by `array` on the row of their first person.
+
+    The entities without first person (legacy role 0) get `default`.
+    """
+    members_entity_id = population.members_entity_id_by_entity[entity_key]
+    first_persons = population.members_legacy_role_by_entity[entity_key] == 0
+    entity_array = np.full(members_entity_id.max() + 1, default, dtype = array.dtype)
+    entity_array[members_entity_id[first_persons]] = array[first_persons]
+    return entity_array
+
+
+def new_population(tax_benefit_system, chunk, period, id_column_by_entity = None, role_column_by_entity = None):
+    """Return the population of a chunk of survey rows, with inputs for `period`, and the ids of its entities.
+
+    The ids of the group entities are those of the survey, and the persons are identified by their row index in the
+    chunk.
+    """
+    if id_column_by_entity is None:
+        id_column_by_entity = DEFAULT_ID_COLUMN_BY_ENTITY
+    if role_column_by_entity is None:
+        role_column_by_entity = DEFAULT_ROLE_COLUMN_BY_ENTITY
+    ids_by_entity = {tax_benefit_system.person_entity.key: np.arange(get_rows_count(chunk))}
+    members_entity_id_by_entity = {}
+    members_legacy_role_by_entity = {}
+    for entity_key, id_column in id_column_by_entity.iteritems():
+        ids_by_entity[entity_key], members_entity_id_by_entity[entity_key] = np.unique(chunk[id_column],
+            return_inverse = True)
+        members_legacy_role_by_entity[entity_key] = convert_array(chunk[role_column_by_entity[entity_key]],
+            np.dtype(np.int32))
+    population = Population(members_entity_id_by_entity, members_legacy_role_by_entity, {})
+    reserved_columns = set(id_column_by_entity.values()).union(role_column_by_entity.values())
+    for column_name, array in chunk.iteritems():
+        column = tax_benefit_system.column_by_name.get(column_name)
+        if column is None or column_name in reserved_columns:
+            continue
+        array = convert_array(array, np.dtype(column.dtype))
+        if not column.entity.is_person:
+            array = get_entity_array(population, column.entity.key, array, column.default)
+        population.input_variables[column_name] = {period: array}
+    return population, ids_by_entity
+
+
+def iter_results(tax_benefit_system, blocks, period, variable_names, chunk_size = 100000,
+        id_column_by_entity = None, role_column_by_entity = None, weight_column = None):
+    """Simulate the survey given by `blocks` of rows chunk by chunk, and iterate on the results of each chunk.
+
+    Each result is a dict with the arrays of `variable_names` (`array_by_variable`), the ids of the entities given in
+    the survey (`ids_by_entity`, the persons being numbered from the start of the survey), the number of persons of
+    the chunk (`persons_count`) and the duration of its simulation in seconds (`duration`). With a `weight_column`
+    (e.g. `wprm`), the weights of the entities, read on the row of their first person, are given by
+    `weights_by_entity`, and the sums of the weights of their members (e.g. `wprm` times the number of persons of a
+    ménage) by `persons_weights_by_entity`.
+    """
+    period = periods.period(period)
+    persons_offset = 0
+    for chunk in iter_chunks(blocks, chunk_size, id_column_by_entity):
+        start_time = time.time()
+        population, ids_by_entity = new_population(tax_benefit_system, chunk, period, id_column_by_entity,
+            role_column_by_entity)
+        simulation = population.new_simulation(tax_benefit_system, period)
+        array_by_variable = dict(
+            (variable_name, calculate(simulation, variable_name, period))
+            for variable_name in variable_names
+            )
+        ids_by_entity[tax_benefit_system.person_entity.key] += persons_offset
+        persons_offset += population.persons_count
+        result = dict(
+            array_by_variable = array_by_variable,
+            duration = time.time() - start_time,
+            ids_by_entity = ids_by_entity,
+            persons_count = population.persons_count,
+            )
+        if weight_column is not None:
+            weights = convert_array(chunk[weight_column], np.dtype(np.float64))
+            result['weights_by_entity'] = dict(
+                (entity_key, get_entity_array(population, entity_key, weights, 0))
+                for entity_key in population.members_entity_id_by_entity
+                )
+            result['weights_by_entity'][tax_benefit_system.person_entity.key] = weights
+            result['persons_weights_by_entity'] = dict(
+                (entity_key, np.bincount(members_entity_id, weights = weights,
+                    minlength = len(result['weights_by_entity'][entity_key])))
+                for entity_key, members_entity_id in population.members_entity_id_by_entity.iteritems()
+                )
+            result['persons_weights_by_entity'][tax_benefit_system.person_entity.key] = weights
+        yield result
+
+
+class CsvResultsWriter(object):
+    def __init__(self, tax_benefit_system, directory, variable_names):
+        """Write the results of `iter_results` in a CSV file per entity of `directory`, e.g. `menage.csv`.
+
+        Each file has an `id` column, followed by the variables of the entity.
+        """
+        self.directory = directory
+        self.variable_names_by_entity = {}
+        for variable_name in variable_names:
+            entity_key = tax_benefit_system.get_column(variable_name, check_existence = True).entity.key
+            self.variable_names_by_entity.setdefault(entity_key, []).append(variable_name)
+        self.files = []
+        self.writer_by_entity = {}
+
+    def write(self, result):
+        for entity_key, variable_names in self.variable_names_by_entity.iteritems():
+            writer = self.writer_by_entity.get(entity_key)
+            if writer is None:
+                csv_file = open(os.path.join(self.directory, '{}.csv'.format(entity_key)), 'wb')
+                self.files.append(csv_file)
+                writer = self.writer_by_entity[entity_key] = csv.writer(csv_file)
+                writer.writerow(['id'] + variable_names)
+            writer.writerows(zip(
+                result['ids_by_entity'][entity_key].tolist(),
+                *(result['array_by_variable'][variable_name].tolist() for variable_name in variable_names)
+                ))
+
+    def close(self):
+        for csv_file in self.files:
+            csv_file.close()
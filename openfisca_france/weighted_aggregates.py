@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+"""Weighted aggregates of simulated variables, accumulated chunk by chunk.
+
+Surveys are mostly used for weighted totals, numbers of recipients, quantiles (e.g. the deciles of `niveau_de_vie`)
+and poverty rates. `WeightedAggregates` accumulates them over the chunks of `survey_streaming.iter_results` (or over
+the shards of a sharded simulation, by merging the aggregates of each shard), so that the values of every household
+never have to be held together.
+
+Sums and numbers of recipients are exact. Quantiles are computed from a `QuantileSketch`, which is exact until it
+holds more than `max_points` distinct values, and then keeps weighted centroids of consecutive values: the weight
+below a quantile is then known up to about `1 / max_points` of the total weight.
+
+By default, the distributions of the variables of group entities are weighted by the persons of the entities (e.g.
+`wprm` times the number of persons of a ménage), as in the definition of the median and of the poverty rate of the
+INSEE: the poverty rate based on `niveau_de_vie` is the share of persons living in a poor ménage. With
+`persons_weighted = False`, they are weighted by the entities themselves (the share of poor ménages).
+"""
+
+import numpy as np
+
+from .survey_streaming import iter_results
+
+
+class QuantileSketch(object):
+    def __init__(self, max_points = 10000):
+        """Summarize weighted values by at most `2 * max_points` weighted points, sorted by value."""
+        self.max_points = max_points
+        self.values = np.empty(0)
+        self.weights = np.empty(0)
+
+    def add(self, values, weights):
+        self.values = np.concatenate((self.values, np.asarray(values, dtype = np.float64)))
+        self.weights = np.concatenate((self.weights, np.asarray(weights, dtype = np.float64)))
+        order = np.argsort(self.values, kind = 'mergesort')
+        self.values = self.values[order]
+        self.weights = self.weights[order]
+        if len(self.values) > 2 * self.max_points:
+            self.compress()
+
+    def merge(self, other):
+        self.add(other.values, other.weights)
+
+    def compress(self):
+        """Merge equal values, then consecutive values into `max_points` centroids of about the same weight."""
+        values, indexes = np.unique(self.values, return_inverse = True)
+        weights = np.bincount(indexes, weights = self.weights)
+        if len(values) > self.max_points:
+            cumulated_weights = np.cumsum(weights)
+            groups = np.minimum(
+                (cumulated_weights - weights / 2) * self.max_points // cumulated_weights[-1],
+                self.max_points - 1,
+                ).astype(np.int64)
+            group_weights = np.bincount(groups, weights = weights)
+            filled_groups = group_weights > 0
+            values = (np.bincount(groups, weights = values * weights)[filled_groups] /
+                group_weights[filled_groups])
+            weights = group_weights[filled_groups]
+        self.values = values
+        self.weights = weights
+
+    def quantile(self, q):
+        """Return the smallest value such that the weight of the values lower or equal is at least `q` of the total."""
+        cumulated_weights = np.cumsum(self.weights)
+        index = np.searchsorted(cumulated_weights, q * cumulated_weights[-1])
+        return self.values[min(index, len(self.values) - 1)]
+
+    def weight_below(self, threshold):
+        """Return the weight of the values strictly lower than `threshold`."""
+        return self.weights[self.values < threshold].sum()
+
+
+class WeightedAggregates(object):
+    def __init__(self, tax_benefit_system, variable_names, quantile_variable_names = (), max_points = 10000,
+            persons_weighted = True):
+        """Accumulate the weighted sums and numbers of recipients of `variable_names`.
+
+        The distributions of `quantile_variable_names` are also summarized, for quantiles and poverty rates, weighted
+        by the persons of their entities when `persons_weighted` is True.
+        """
+        self.person_entity_key = tax_benefit_system.person_entity.key
+        self.persons_weighted = persons_weighted
+        self.entity_key_by_variable = dict(
+            (variable_name, tax_benefit_system.get_column(variable_name, check_existence = True).entity.key)
+            for variable_name in set(variable_names).union(quantile_variable_names)
+            )
+        self.total_weight_by_entity = dict((entity_key, 0.) for entity_key in self.entity_key_by_variable.values())
+        self.sum_by_variable = dict((variable_name, 0.) for variable_name in variable_names)
+        self.recipients_by_variable = dict((variable_name, 0.) for variable_name in variable_names)
+        self.sketch_by_variable = dict(
+            (variable_name, QuantileSketch(max_points))
+            for variable_name in quantile_variable_names
+            )
+
+    def add(self, array_by_variable, weights_by_entity, persons_weights_by_entity = None):
+        """Add the values of a chunk, weighted by the weights of their entities.
+
+        `persons_weights_by_entity`, the sums of the weights of the members of the entities, is required when the
+        distributions of variables of group entities are weighted by persons.
+        """
+        for entity_key in self.total_weight_by_entity:
+            self.total_weight_by_entity[entity_key] += weights_by_entity[entity_key].sum()
+        for variable_name in self.sum_by_variable:
+            array = array_by_variable[variable_name]
+            weights = weights_by_entity[self.entity_key_by_variable[variable_name]]
+            self.sum_by_variable[variable_name] += np.dot(array.astype(np.float64), weights)
+            self.recipients_by_variable[variable_name] += weights[array != 0].sum()
+        for variable_name, sketch in self.sketch_by_variable.iteritems():
+            entity_key = self.entity_key_by_variable[variable_name]
+            if self.persons_weighted and entity_key != self.person_entity_key:
+                assert persons_weights_by_entity is not None, \
+                    u"The weights of the persons of the entities are needed for {}".format(variable_name).encode(
+                        'utf-8')
+                sketch.add(array_by_variable[variable_name], persons_weights_by_entity[entity_key])
+            else:
+                sketch.add(array_by_variable[variable_name], weights_by_entity[entity_key])
+
+    def add_result(self, result):
+        """Add a result of `survey_streaming.iter_results`, computed with a weight column."""
+        self.add(result['array_by_variable'], result['weights_by_entity'], result['persons_weights_by_entity'])
+
+    def merge(self, other):
+        """Add the aggregates of `other`, e.g. computed for another shard of the population."""
+        assert other.persons_weighted == self.persons_weighted, u"The distributions must be weighted alike"
+        for entity_key, total_weight in other.total_weight_by_entity.iteritems():
+            self.total_weight_by_entity[entity_key] += total_weight
+        for variable_name in self.sum_by_variable:
+            self.sum_by_variable[variable_name] += other.sum_by_variable[variable_name]
+            self.recipients_by_variable[variable_name] += other.recipients_by_variable[variable_name]
+        for variable_name, sketch in self.sketch_by_variable.iteritems():
+            sketch.merge(other.sketch_by_variable[variable_name])
+
+    def get_mean(self, variable_name):
+        return self.sum_by_variable[variable_name] / self.total_weight_by_entity[self.entity_key_by_variable[
+            variable_name]]
+
+    def get_quantiles(self, variable_name, quantiles = (.1, .2, .3, .4, .5, .6, .7, .8, .9)):
+        """Return the quantiles of `variable_name`, by default its deciles."""
+        sketch = self.sketch_by_variable[variable_name]
+        return [sketch.quantile(q) for q in quantiles]
+
+    def get_poverty_rate(self, variable_name, threshold_ratio = .6):
+        """Return the share of the weight whose `variable_name` is below `threshold_ratio` times its median.
+
+        For a variable of a group entity such as `niveau_de_vie`, this is the share of persons living in an entity
+        below the threshold when the distributions are weighted by persons (the default), and the share of entities
+        otherwise.
+        """
+        sketch = self.sketch_by_variable[variable_name]
+        return sketch.weight_below(threshold_ratio * sketch.quantile(.5)) / sketch.weights.sum()
+
+
+def aggregate_survey(tax_benefit_system, blocks, period, variable_names, quantile_variable_names = (),
+        weight_column = 'wprm', persons_weighted = True, **iter_results_options):
+    """Return the `WeightedAggregates` of a survey read by blocks, simulated chunk by chunk."""
+    aggregates = WeightedAggregates(tax_benefit_system, variable_names, quantile_variable_names,
+        persons_weighted = persons_weighted)
+    for result in iter_results(tax_benefit_system, blocks, period, list(aggregates.entity_key_by_variable),
+            weight_column = weight_column, **iter_results_options):
+        aggregates.add_result(result)
+    return aggregates
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+"""Compute once a year the monthly variables whose value does not change during a calendar year.
+
+Many monthly variables only read annual data of year N-2 (e.g. `prestations_familiales_base_ressources_individu`,
+`aide_logement_assiette_abattement_chomage`): computing them for each month computes the same array 12 times. A
+monthly variable is year-invariant when all its formulas start on January 1st and only use their period through
+`period.n_2`, `period.last_year` or `period.this_year`, or to read other year-invariant variables for the same month
+(see `get_year_invariant_variables`). Variables whose year invariance cannot be inferred from their code can be
+declared in `conf/year_invariant.py`.
+
+For a year-invariant variable requested for another month than January, the value of January is computed (or
+found in cache) and the same array is cached for the requested month, without any copy.
+"""
+
+import dis
+import weakref
+
+from openfisca_core import holders
+from openfisca_core.base_functions import requested_period_default_value
+from openfisca_core.periods import ETERNITY, MONTH
+
+
+YEAR_INVARIANT_PERIOD_ATTRIBUTES = ('last_year', 'n_2', 'this_year')
+
+year_invariant_variables_by_tax_benefit_system = weakref.WeakKeyDictionary()
+
+
+def iter_instructions(code):
+    """Yield the name and the argument value of the instructions of `code`."""
+    bytecode = code.co_code
+    index = 0
+    extended_arg = 0
+    while index < len(bytecode):
+        opcode = ord(bytecode[index])
+        index += 1
+        if opcode < dis.HAVE_ARGUMENT:
+            yield dis.opname[opcode], None
+            continue
+        argument = ord(bytecode[index]) + ord(bytecode[index + 1]) * 256 + extended_arg
+        index += 2
+        extended_arg = 0
+        if opcode == dis.EXTENDED_ARG:
+            extended_arg = argument * 65536
+            continue
+        if opcode in dis.hasconst:
+            yield dis.opname[opcode], code.co_consts[argument]
+        elif opcode in dis.hasname:
+            yield dis.opname[opcode], code.co_names[argument]
+        elif opcode in dis.haslocal:
+            yield dis.opname[opcode], code.co_varnames[argument]
+        else:
+            yield dis.opname[opcode], argument
+
+
+def get_monthly_inputs(function):
+    """Return the names of the variables read by a formula function for its own period.
+
+    Return None when the function uses its period in another way than through `YEAR_INVARIANT_PERIOD_ATTRIBUTES`
+    or to read variables.
+    """
+    code = function.func_code
+    if code.co_argcount < 2 or code.co_varnames[0] == 'self':
+        return None
+    period_name = code.co_varnames[1]
+    if period_name in code.co_cellvars:
+        return None
+    monthly_inputs = set()
+    instructions = list(iter_instructions(code))
+    for index, (opname, argument) in enumerate(instructions):
+        if opname != 'LOAD_FAST' or argument != period_name:
+            continue
+        previous_opname, previous_argument = instructions[index - 1] if index > 0 else (None, None)
+        next_opname, next_argument = instructions[index + 1] if index + 1 < len(instructions) else (None, None)
+        if next_opname == 'LOAD_ATTR' and next_argument in YEAR_INVARIANT_PERIOD_ATTRIBUTES:
+            continue
+        if previous_opname == 'LOAD_CONST' and isinstance(previous_argument, basestring):
+            monthly_inputs.add(previous_argument)
+            continue
+        return None
+    return monthly_inputs
+
+
+def is_candidate(column):
+    """Tell whether the formulas of a monthly `column` can be year-invariant, whatever the variables they read."""
+    formula_class = column.formula_class
+    if column.definition_period != MONTH or not formula_class.dated_formulas_class:
+        return False
+    if getattr(formula_class.base_function, 'im_func', None) is not requested_period_default_value:
+        return False
+    if column.end is not None and not str(column.end).endswith('-12-31'):
+        return False
+    return all(
+        dated_formula_class['start_instant'].month == dated_formula_class['start_instant'].day == 1
+        for dated_formula_class in formula_class.dated_formulas_class
+        )
+
+
+def get_year_invariant_variables(tax_benefit_system):
+    """Return the names of the monthly variables of `tax_benefit_system` whose value is the same every month of a year.
+
+    The variables declared in `tax_benefit_system.declared_year_invariant_variables` are included.
+    """
+    year_invariant_variables = year_invariant_variables_by_tax_benefit_system.get(tax_benefit_system)
+    if year_invariant_variables is not None:
+        return year_invariant_variables
+    column_by_name = tax_benefit_system.column_by_name
+    declared_variables = set(tax_benefit_system.declared_year_invariant_variables or ())
+    monthly_inputs_by_variable = {}
+    for variable_name, column in column_by_name.iteritems():
+        if variable_name in declared_variables or not is_candidate(column):
+            continue
+        monthly_inputs = set()
+        for dated_formula_class in column.formula_class.dated_formulas_class:
+            # The functions called by the formula only get the period when the formula passes it explicitly.
+            function_monthly_inputs = get_monthly_inputs(dated_formula_class['formula_class'].formula.im_func)
+            if function_monthly_inputs is None:
+                break
+            monthly_inputs.update(function_monthly_inputs)
+        else:
+            monthly_inputs_by_variable[variable_name] = monthly_inputs
+    # Remove the variables reading monthly variables which are not year-invariant, until none is left.
+    year_invariant_variables = declared_variables.union(monthly_inputs_by_variable)
+    while True:
+        removed_variables = set(
+            variable_name
+            for variable_name, monthly_inputs in monthly_inputs_by_variable.iteritems()
+            if variable_name in year_invariant_variables and any(
+                input_name not in year_invariant_variables
+                and (input_name not in column_by_name or column_by_name[input_name].definition_period != ETERNITY)
+                for input_name in monthly_inputs
+                )
+            )
+        if not removed_variables:
+            break
+        year_invariant_variables -= removed_variables
+    year_invariant_variables = frozenset(year_invariant_variables)
+    year_invariant_variables_by_tax_benefit_system[tax_benefit_system] = year_invariant_variables
+    return year_invariant_variables
+
+
+def year_invariant_compute(compute, formula_class):
+    def compute_once_a_year(formula, period, **parameters):
+        holder = formula.holder
+        if type(formula) is formula_class and period is not None and period.unit == MONTH \
+                and period.start.month != 1 and not parameters.get('extra_params') \
+                and holder.column.name in get_year_invariant_variables(holder.simulation.tax_benefit_system):
+            # The value of January is computed outside of the cycle detection of the requested month.
+            january_dated_holder = holder.compute(period.this_year.first_month, **parameters)
+            return holders.DatedHolder(holder, period, january_dated_holder.array)
+        return compute(formula, period, **parameters)
+
+    return compute_once_a_year
+
+
+def use_year_invariance(tax_benefit_system):
+    """Compute once a year the year-invariant variables of `tax_benefit_system`."""
+    for variable_name in get_year_invariant_variables(tax_benefit_system):
+        formula_class = tax_benefit_system.get_column(variable_name, check_existence = True).formula_class
+        formula_class.compute = year_invariant_compute(formula_class.compute.im_func, formula_class)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""Skip the evaluation of formulas that are provably zero for the simulated population.
+
+The variables listed in `conf/zero_preserving.py` are zero whenever all their declared inputs are zero. Before
+evaluating the formula of such a variable, the declared inputs are computed (and cached, as the formula would have
+done) and, when they are all zero, a constant zero array is returned instead. As declared inputs can themselves be
+zero-preserving variables, whole subsystems (capital gains, ISF...) are skipped for a population that does not hold
+any capital.
+"""
+
+from openfisca_core.periods import MONTH, YEAR
+
+from .sparse_inputs import constant_array, is_zero
+
+
+def input_is_zero(simulation, variable_name, period):
+    """Return True when `variable_name` is zero for every entity during `period`."""
+    column = simulation.tax_benefit_system.get_column(variable_name, check_existence = True)
+    if column.definition_period == MONTH and period.unit == YEAR:
+        month = period.first_month
+        for _ in range(12):
+            if not is_zero(simulation.calculate(variable_name, month)):
+                return False
+            month = month.offset(1)
+        return True
+    if column.definition_period == YEAR and period.unit == MONTH:
+        period = period.this_year
+    return is_zero(simulation.calculate(variable_name, period))
+
+
+def zero_propagating_base_function(base_function, formula_class):
+    def zero_propagating_value(formula, simulation, period, *extra_params):
+        # A reform replacing the variable creates a new formula class: its formula may not preserve zero.
+        zero_preserving_inputs_by_variable = simulation.tax_benefit_system.zero_preserving_inputs_by_variable
+        if type(formula) is formula_class and not extra_params and zero_preserving_inputs_by_variable:
+            column = formula.holder.column
+            inputs = zero_preserving_inputs_by_variable.get(column.name)
+            if inputs and all(input_is_zero(simulation, input_name, period) for input_name in inputs):
+                return constant_array(0, formula.holder.entity.count, column.dtype)
+        return base_function(formula, simulation, period, *extra_params)
+
+    return zero_propagating_value
+
+
+def use_zero_propagation(tax_benefit_system):
+    """Install the zero shortcut on the variables of `tax_benefit_system.zero_preserving_inputs_by_variable`."""
+    for variable_name in tax_benefit_system.zero_preserving_inputs_by_variable:
+        formula_class = tax_benefit_system.get_column(variable_name, check_existence = True).formula_class
+        formula_class.base_function = zero_propagating_base_function(
+            formula_class.base_function.im_func, formula_class)
@@ -7,7 +7,7 @@ from setuptools import setup, find_packages
 
 setup(
     name = 'OpenFisca-France',
-    version = '18.9.7',
+    version = '18.34.0',
     author = 'OpenFisca Team',
     author_email = 'contact@openfisca.fr',
     classifiers = [
@@ -40,6 +40,11 @@ setup(
         'de_net_a_brut': [
             'scipy >= 0.17',
             ],
+        'survey': [
+            'pandas >= 0.13',  # Only used to read HDF5 and Parquet surveys
+            'pyarrow >= 0.8',
+            'tables >= 3.1',
+            ],
         'taxipp': [
             'pandas >= 0.13',
             ],
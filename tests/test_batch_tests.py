@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+from openfisca_core.tools.test_runner import _parse_test_file
+from openfisca_france.scripts import batch_tests, run_tests_in_parallel
+
+from cache import tax_benefit_system
+
+
+tests_directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_cases(yaml_path):
+    return [
+        (name, period_str, test)
+        for _, name, period_str, test in _parse_test_file(tax_benefit_system, yaml_path)
+        ]
+
+
+def test_input_variables_batches():
+    cases = [
+        case
+        for case in parse_cases(os.path.join(tests_directory, 'formulas', 'irpp.yaml'))
+        if case[1] == u'2010'
+        ]
+    batches = list(batch_tests.iter_batches(cases))
+    assert len(batches) < len(cases)
+    assert sorted(case[0] for batch_cases in batches for case in batch_cases) == sorted(case[0] for case in cases)
+    for batch_cases in batches:
+        assert batch_tests.run_batch(batch_cases, {}) == []
+
+
+def test_test_case_batches():
+    cases = parse_cases(os.path.join(tests_directory, 'formulas', 'ada.yaml'))
+    batches = list(batch_tests.iter_batches(cases))
+    assert len(batches) < len(cases)
+    batch_cases = max(batches, key = len)
+    merged_scenario, slices_by_scenario = batch_tests.merge_scenarios([test['scenario'] for _, _, test in batch_cases])
+    simulation = batch_tests.new_simulation(merged_scenario, slices_by_scenario)
+    assert simulation.famille.count == len(batch_cases)
+    for (_, period_str, test), slice_by_entity in zip(batch_cases, slices_by_scenario):
+        batch_tests.check_case(simulation, slice_by_entity, period_str, test)
+
+
+def test_failures():
+    directory = tempfile.mkdtemp()
+    try:
+        yaml_path = os.path.join(directory, 'failing.yaml')
+        with open(yaml_path, 'w') as yaml_file:
+            yaml_file.write(
+                '- name: "Âge juste"\n'
+                '  period: "2013-01"\n'
+                '  input_variables:\n'
+                '    age: 40\n'
+                '  output_variables:\n'
+                '    age_en_mois: 480\n'
+                '- name: "Âge faux"\n'
+                '  period: "2013-01"\n'
+                '  input_variables:\n'
+                '    age: 40\n'
+                '  output_variables:\n'
+                '    age_en_mois: 12\n'
+                )
+        cases = parse_cases(yaml_path)
+    finally:
+        shutil.rmtree(directory)
+    batches = list(batch_tests.iter_batches(cases))
+    assert len(batches) == 1
+    failures = batch_tests.run_batch(batches[0], {})
+    assert [title for title, _ in failures] == [u'Âge faux']
+
+
+def check_batch_outcomes(yaml_path):
+    for batch_cases in batch_tests.iter_batches(parse_cases(yaml_path)):
+        outcomes = batch_tests.get_batch_outcomes(batch_cases) if len(batch_cases) > 1 else None
+        if outcomes is None:
+            continue
+        for (title, period_str, test), passed in zip(batch_cases, outcomes):
+            assert passed == (batch_tests.run_case(title, period_str, test, {}) is None), title.encode('utf-8')
+
+
+def test_batch_outcomes():
+    # The tests passing or failing in a batch pass or fail alone too.
+    for yaml_path in run_tests_in_parallel.iter_test_files([os.path.join(tests_directory, 'formulas')]):
+        yield check_batch_outcomes, yaml_path
+
+
+def test_verify():
+    assert sum(batch_tests.is_verified(index, .25) for index in range(100)) == 25
+    assert all(batch_tests.is_verified(index, 1) for index in range(10))
+    assert not any(batch_tests.is_verified(index, 0) for index in range(10))
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_france.cache_policies import get_consumers_by_variable, reads_several_periods
+
+from cache import tax_benefit_system
+
+
+def new_scenario():
+    return tax_benefit_system.new_scenario().init_single_entity(
+        axes = [dict(count = 5, max = 60000, min = 0, name = 'salaire_de_base', period = 2016)],
+        menage = dict(loyer = 500, statut_occupation_logement = 4),
+        period = 2016,
+        parent1 = dict(age = 40),
+        parent2 = dict(age = 38),
+        enfants = [dict(age = 9), dict(age = 12)],
+        )
+
+
+def test_intermediate_variables():
+    consumers_by_variable = get_consumers_by_variable(tax_benefit_system)
+    cache_blacklist = tax_benefit_system.cache_blacklist
+    # The variables of the former hand-written blacklist.
+    assert set([
+        'aide_logement_loyer_retenu',
+        'aide_logement_charges',
+        'aide_logement_R0',
+        'aide_logement_taux_famille',
+        'aide_logement_taux_loyer',
+        'aide_logement_participation_personnelle',
+        'aide_logement_loyer_seuil_degressivite',
+        'aide_logement_loyer_seuil_suppression',
+        'aide_logement_montant_brut_avant_degressivite',
+        'aides_logement_primo_accedant',
+        'aides_logement_primo_accedant_k',
+        'aides_logement_primo_accedant_nb_part',
+        'aides_logement_primo_accedant_loyer_minimal',
+        'aides_logement_primo_accedant_plafond_mensualite',
+        'aides_logement_primo_accedant_ressources',
+        ]) <= cache_blacklist
+    assert 'aide_logement_montant_brut' not in cache_blacklist
+    assert 'salaire_net' not in cache_blacklist
+    for variable_name in cache_blacklist:
+        consumers = consumers_by_variable[variable_name]
+        assert len(consumers) == 1 or consumers <= cache_blacklist, variable_name
+        assert not any(
+            reads_several_periods(tax_benefit_system, consumer_name, variable_name)
+            for consumer_name in consumers
+            ), variable_name
+
+
+def test_multi_period_inputs():
+    # The resources of the RSA are read for each of the last 3 months.
+    assert reads_several_periods(tax_benefit_system, 'rsa_revenu_activite_individu', 'salaire_net')
+
+
+def test_opt_out_cache_keeps_inputs():
+    assert 'taux_accident_travail' in tax_benefit_system.cache_blacklist
+    scenario = tax_benefit_system.new_scenario().init_single_entity(
+        period = '2016-01',
+        parent1 = dict(age = 40, salaire_de_base = 2000, taux_accident_travail = 0.2),
+        )
+    for opt_out_cache in (False, True):
+        simulation = scenario.new_simulation(opt_out_cache = opt_out_cache)
+        assert_near(simulation.calculate('taux_accident_travail', '2016-01'), [0.2], absolute_error_margin = 1e-6)
+        assert_near(simulation.calculate('accident_du_travail', '2016-01'), [-400], absolute_error_margin = 1e-3)
+
+
+def test_recursive_variables():
+    assert 'rsa' in tax_benefit_system.recursive_variables
+    assert 'aide_logement' in tax_benefit_system.recursive_variables
+    assert 'salaire_net' not in tax_benefit_system.recursive_variables
+
+
+def test_opt_out_cache_results():
+    scenario = new_scenario()
+    assert_near(
+        scenario.new_simulation(opt_out_cache = True).calculate_add('revenu_disponible', 2016),
+        scenario.new_simulation().calculate_add('revenu_disponible', 2016),
+        absolute_error_margin = 0,
+        )
+
+
+def test_cache_budget():
+    scenario = new_scenario()
+    simulation = scenario.new_simulation(max_cache_bytes = 10 ** 12)
+    revenu_disponible = simulation.calculate('revenu_disponible', 2016)
+    cached_bytes = simulation.cache_budget.nbytes
+    assert cached_bytes > 0
+    budgeted_simulation = scenario.new_simulation(max_cache_bytes = cached_bytes // 2)
+    assert_near(budgeted_simulation.calculate('revenu_disponible', 2016), revenu_disponible, absolute_error_margin = 0)
+    assert budgeted_simulation.cache_budget.nbytes <= cached_bytes // 2
+    assert_near(budgeted_simulation.calculate_add('salaire_de_base', 2016)[::4], [0, 15000, 30000, 45000, 60000])
+
+
+def test_spilled_arrays():
+    scenario = new_scenario()
+    simulation = scenario.new_simulation(max_cache_bytes = 10 ** 12)
+    revenu_disponible = simulation.calculate('revenu_disponible', 2016)
+    spill_directory = tempfile.mkdtemp()
+    try:
+        spilling_simulation = scenario.new_simulation(max_cache_bytes = simulation.cache_budget.nbytes // 4,
+            spill_directory = spill_directory)
+        assert_near(spilling_simulation.calculate('revenu_disponible', 2016), revenu_disponible,
+            absolute_error_margin = 0)
+        assert os.listdir(spill_directory) == []
+    finally:
+        os.rmdir(spill_directory)
+    salaire_de_base_holder = spilling_simulation.individu.get_holder('salaire_de_base')
+    assert any(isinstance(array.base, np.memmap) for array in salaire_de_base_holder._array_by_period.itervalues())
+    assert_near(spilling_simulation.calculate_add('salaire_de_base', 2016)[::4], [0, 15000, 30000, 45000, 60000])
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_france.communes import get_departements, map_by_depcom
+
+from cache import tax_benefit_system
+
+
+depcom = np.array(['93048', '75056', '97105', '97611', '2A004', '93048', ''], dtype = 'S5')
+
+
+def test_departements():
+    assert_near(get_departements(depcom), [93, 75, 971, 976, 20, 93, 0], absolute_error_margin = 0)
+
+
+def test_map_by_depcom():
+    called_codes = []
+
+    def function(code):
+        called_codes.append(code)
+        return len(code)
+
+    assert_near(map_by_depcom(function, depcom, np.int16), [5, 5, 5, 5, 5, 5, 0], absolute_error_margin = 0)
+    assert sorted(called_codes) == sorted(set(depcom))
+
+
+def check_residence(code, departement, residence_dom):
+    simulation = tax_benefit_system.new_scenario().init_single_entity(
+        menage = dict(depcom = code),
+        parent1 = dict(age = 40),
+        period = '2017-01',
+        ).new_simulation()
+    assert simulation.calculate('departement', '2017-01')[0] == departement
+    assert simulation.calculate('residence_dom', '2017-01')[0] == residence_dom
+
+
+def test_residence():
+    for code, departement, residence_dom in (('93048', 93, False), ('97411', 974, True), ('2B033', 20, False)):
+        yield check_residence, code, departement, residence_dom
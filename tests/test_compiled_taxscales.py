@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_core.taxscales import MarginalRateTaxScale
+from openfisca_core.tools import assert_near
+from openfisca_france import compiled_taxscales
+from openfisca_france.compiled_taxscales import compile_marginal_rate_tax_scale
+
+from cache import tax_benefit_system
+
+
+def check_compiled_bareme(year):
+    bareme = tax_benefit_system.get_parameters_at_instant('{}-01-01'.format(year)).impot_revenu.bareme
+    base = np.concatenate((
+        [-10000, 0, 1, 1e9],
+        bareme.thresholds,
+        np.random.RandomState(year).uniform(-5000, 300000, 1000),
+        ))
+    assert_near(compile_marginal_rate_tax_scale(bareme).calc(base), bareme.calc(base), absolute_error_margin = 1e-6)
+
+
+def test_compiled_bareme():
+    for year in range(2002, 2017):
+        yield check_compiled_bareme, year
+
+
+def test_compiled_bareme_is_shared():
+    bareme = tax_benefit_system.get_parameters_at_instant('2015-01-01').impot_revenu.bareme
+    assert compile_marginal_rate_tax_scale(bareme) is compile_marginal_rate_tax_scale(
+        tax_benefit_system.get_parameters_at_instant('2015-01-01').impot_revenu.bareme)
+    assert compile_marginal_rate_tax_scale(bareme) is not compile_marginal_rate_tax_scale(
+        tax_benefit_system.get_parameters_at_instant('2010-01-01').impot_revenu.bareme)
+
+
+def test_compiled_scales_are_evicted():
+    bareme = tax_benefit_system.get_parameters_at_instant('2015-01-01').impot_revenu.bareme
+    compiled_bareme = compile_marginal_rate_tax_scale(bareme)
+    for threshold in range(compiled_taxscales.COMPILED_TAX_SCALES_CACHE_SIZE):
+        tax_scale = MarginalRateTaxScale()
+        tax_scale.add_bracket(0, 0)
+        tax_scale.add_bracket(threshold + 1, 0.1)
+        compile_marginal_rate_tax_scale(tax_scale)
+    assert len(compiled_taxscales.compiled_tax_scale_by_brackets) == compiled_taxscales.COMPILED_TAX_SCALES_CACHE_SIZE
+    assert compile_marginal_rate_tax_scale(bareme) is not compiled_bareme
+
+
+def test_ir_plaf_qf():
+    simulation = tax_benefit_system.new_scenario().init_single_entity(
+        axes = [dict(count = 50, name = 'salaire_imposable', max = 300000, min = 0)],
+        period = 2015,
+        parent1 = dict(age = 40),
+        parent2 = dict(age = 40),
+        enfants = [dict(age = 5), dict(age = 9), dict(age = 12)],
+        ).new_simulation()
+    ir_plaf_qf = simulation.calculate('ir_plaf_qf', 2015)
+    rni = simulation.calculate('rni', 2015)
+    nbptr = simulation.calculate('nbptr', 2015)
+    bareme = tax_benefit_system.get_parameters_at_instant('2015-01-01').impot_revenu.bareme
+    ir_brut = nbptr * bareme.calc(rni / nbptr)
+    assert_near(simulation.calculate('ir_brut', 2015), ir_brut, absolute_error_margin = 0.01)
+    assert (ir_plaf_qf >= ir_brut - 0.01).all()
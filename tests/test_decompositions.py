@@ -5,6 +5,7 @@ import os
 import xml.etree.ElementTree
 
 from openfisca_core import conv, decompositions, decompositionsxml
+import openfisca_france.decompositions
 
 from cache import tax_benefit_system
 
@@ -64,3 +65,47 @@ def test_decomposition_calculate():
         ).new_simulation()
     decomposition = decompositions.calculate([simulation], decomposition_json)
     assert isinstance(decomposition, dict)
+
+
+def check_decomposition_plan(xml_file_name, period):
+    xml_file_path = os.path.join(decompositions_directory, xml_file_name)
+    simulation = tax_benefit_system.new_scenario().init_single_entity(
+        axes = [dict(count = 3, name = 'salaire_de_base', max = 60000, min = 0, period = 2013)],
+        period = period,
+        parent1 = dict(age = 40),
+        parent2 = dict(age = 38),
+        enfants = [dict(age = 10)],
+        ).new_simulation()
+    decomposition_plan = openfisca_france.decompositions.get_decomposition_plan(tax_benefit_system, xml_file_path)
+    assert openfisca_france.decompositions.get_decomposition_plan(
+        tax_benefit_system, xml_file_path) is decomposition_plan
+    assert decomposition_plan.calculate([simulation]) == decompositions.calculate(
+        [simulation], decompositions.get_decomposition_json(tax_benefit_system, xml_file_path))
+
+
+def test_decomposition_plan():
+    yield check_decomposition_plan, 'decomp.xml', 2013
+    yield check_decomposition_plan, 'fiche_de_paie_decomposition.xml', '2013-01'
+
+
+def test_fiche_de_paie_decomposition_plan():
+    # The situation of test_decomposition_fiches_de_paie.
+    simulation = tax_benefit_system.new_scenario().init_single_entity(
+        period = "2013-01",
+        parent1 = dict(
+            effectif_entreprise = 3000,
+            exposition_accident = 3,
+            code_postal_entreprise = "75001",
+            ratio_alternants = .025,
+            salaire_de_base = {"2013": 12 * 3000},
+            taille_entreprise = 3,
+            categorie_salarie = 0,
+            ),
+        menage = dict(
+            zone_apl = 1,
+            ),
+        ).new_simulation()
+    xml_file_path = openfisca_france.decompositions.fiche_de_paie_decomposition_file_path
+    decomposition_plan = openfisca_france.decompositions.get_decomposition_plan(tax_benefit_system, xml_file_path)
+    assert decomposition_plan.calculate([simulation]) == decompositions.calculate(
+        [simulation], decompositions.get_decomposition_json(tax_benefit_system, xml_file_path))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_core.entities import GroupEntity
+from openfisca_france.entities import Famille, FoyerFiscal, Menage
+from openfisca_france.entity_aggregations import members_rank, ranked_member_value
+
+from cache import tax_benefit_system
+
+
+def new_simulation():
+    # The persons are not sorted by famille, and the last ménage has no conjoint.
+    return tax_benefit_system.new_scenario().init_from_attributes(
+        period = 2015,
+        test_case = dict(
+            individus = [
+                dict(id = 'ind0', age = 40, salaire_de_base = 30000),
+                dict(id = 'ind1', age = 70, retraite_brute = 15000),
+                dict(id = 'ind2', age = 10),
+                dict(id = 'ind3', age = 38, salaire_de_base = 12000),
+                dict(id = 'ind4', age = 25, salaire_de_base = -100),
+                dict(id = 'ind5', age = 3),
+                ],
+            familles = [
+                dict(id = 'f0', parents = ['ind0', 'ind3'], enfants = ['ind2', 'ind5']),
+                dict(id = 'f1', parents = ['ind1']),
+                dict(id = 'f2', parents = ['ind4']),
+                ],
+            foyers_fiscaux = [
+                dict(id = 'ff0', declarants = ['ind0', 'ind3'], personnes_a_charge = ['ind2', 'ind5']),
+                dict(id = 'ff1', declarants = ['ind1']),
+                dict(id = 'ff2', declarants = ['ind4']),
+                ],
+            menages = [
+                dict(id = 'm0', personne_de_reference = 'ind0', conjoint = 'ind3', enfants = ['ind2', 'ind5']),
+                dict(id = 'm1', personne_de_reference = 'ind1', autres = ['ind4']),
+                ],
+            ),
+        ).new_simulation()
+
+
+def check_aggregation(method_name, entity, *args, **kwargs):
+    expected = getattr(GroupEntity, method_name)(entity, *args, **kwargs)
+    result = getattr(entity, method_name)(*args, **kwargs)
+    assert result.dtype == expected.dtype, (method_name, entity.key, kwargs, result.dtype, expected.dtype)
+    assert np.array_equal(result, expected), (method_name, entity.key, kwargs, result, expected)
+
+
+def test_aggregations():
+    simulation = new_simulation()
+    salaire = simulation.calculate('salaire_de_base', '2015-01')
+    age = simulation.calculate('age', '2015-01')
+    for entity, roles in [
+            (simulation.famille, [None, Famille.PARENT, Famille.DEMANDEUR, Famille.CONJOINT, Famille.ENFANT]),
+            (simulation.foyer_fiscal, [None, FoyerFiscal.DECLARANT, FoyerFiscal.PERSONNE_A_CHARGE]),
+            (simulation.menage, [None, Menage.CONJOINT, Menage.ENFANT, Menage.AUTRE]),
+            ]:
+        for role in roles:
+            for array in [salaire, age, age < 18]:
+                for method_name in ['sum', 'any', 'all', 'max', 'min']:
+                    check_aggregation(method_name, entity, array, role = role)
+            check_aggregation('nb_persons', entity, role = role)
+
+
+def test_cached_aggregations_are_not_shared():
+    simulation = new_simulation()
+    nb_persons = simulation.famille.nb_persons()
+    nb_persons[:] = 0
+    assert simulation.famille.nb_persons().tolist() == [4, 1, 1]
+    assert simulation.famille.nb_persons(Famille.ENFANT).tolist() == [2, 0, 0]
+
+
+def test_ranks():
+    simulation = new_simulation()
+    age = simulation.calculate('age', '2015-01')
+    famille = simulation.famille
+    # Persons: ind0 (40), ind1 (70), ind2 (10), ind3 (38), ind4 (25), ind5 (3)
+    assert members_rank(famille, age).tolist() == [0, 0, 2, 1, 0, 3]
+    assert members_rank(famille, age, role = Famille.ENFANT).tolist() == [-1, -1, 0, -1, -1, 1]
+    assert ranked_member_value(famille, age, age, 1, role = Famille.ENFANT).tolist() == [3, 0, 0]
+    # Equal keys are ranked in the order of the persons.
+    assert members_rank(famille, np.zeros_like(age)).tolist() == [0, 0, 1, 2, 0, 3]
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_core import entities
+from openfisca_france.entity_projections import CachedProjector, get_projection
+
+from cache import tax_benefit_system
+
+
+def new_simulation():
+    # Two familles sharing a ménage, and foyers fiscaux not in the order of the familles.
+    return tax_benefit_system.new_scenario().init_from_attributes(
+        period = 2015,
+        test_case = dict(
+            individus = [
+                dict(id = 'ind0', age = 40, salaire_de_base = 30000),
+                dict(id = 'ind1', age = 38, salaire_de_base = 12000),
+                dict(id = 'ind2', age = 10),
+                dict(id = 'ind3', age = 25, salaire_de_base = 8000),
+                dict(id = 'ind4', age = 70, retraite_brute = 15000),
+                ],
+            familles = [
+                dict(id = 'f0', parents = ['ind0', 'ind1'], enfants = ['ind2']),
+                dict(id = 'f1', parents = ['ind3']),
+                dict(id = 'f2', parents = ['ind4']),
+                ],
+            foyers_fiscaux = [
+                dict(id = 'ff0', declarants = ['ind4']),
+                dict(id = 'ff1', declarants = ['ind0', 'ind1'], personnes_a_charge = ['ind2']),
+                dict(id = 'ff2', declarants = ['ind3']),
+                ],
+            menages = [
+                dict(id = 'm0', personne_de_reference = 'ind0', conjoint = 'ind1', enfants = ['ind2'],
+                    autres = ['ind3']),
+                dict(id = 'm1', personne_de_reference = 'ind4', statut_occupation_logement = 4),
+                ],
+            ),
+        ).new_simulation()
+
+
+def get_core_projector(entity, shortcuts):
+    projector = entities.get_projector_from_shortcut(entity, shortcuts[0])
+    for shortcut in shortcuts[1:]:
+        projector = entities.get_projector_from_shortcut(projector.reference_entity, shortcut, parent = projector)
+    return projector
+
+
+def check_projection(simulation, entity_key, shortcuts, variable_name, period):
+    entity = simulation.entities[entity_key]
+    projector = entity
+    for shortcut in shortcuts:
+        projector = getattr(projector, shortcut)
+    assert isinstance(projector, CachedProjector)
+    expected = get_core_projector(entity, shortcuts)(variable_name, period)
+    result = projector(variable_name, period)
+    assert result.dtype == expected.dtype, (shortcuts, variable_name, result.dtype, expected.dtype)
+    assert np.array_equal(result, expected), (shortcuts, variable_name, result, expected)
+
+
+def test_projections():
+    simulation = new_simulation()
+    for entity_key, shortcuts, variable_name, period in [
+            ('individu', ('famille',), 'af', '2015-01'),
+            ('individu', ('foyer_fiscal',), 'rfr', 2015),
+            ('individu', ('menage',), 'statut_occupation_logement', '2015-01'),
+            ('famille', ('demandeur',), 'salaire_de_base', '2015-01'),
+            ('famille', ('conjoint',), 'salaire_de_base', '2015-01'),
+            ('famille', ('demandeur', 'menage'), 'statut_occupation_logement', '2015-01'),
+            ('famille', ('demandeur', 'menage'), 'coloc', '2015-01'),
+            ('famille', ('demandeur', 'foyer_fiscal'), 'rfr', 2015),
+            ('famille', ('conjoint', 'foyer_fiscal'), 'rfr', 2015),
+            ('famille', ('first_person', 'menage'), 'depcom', '2015-01'),
+            ('foyer_fiscal', ('declarant_principal', 'menage'), 'statut_occupation_logement', '2015-01'),
+            ('menage', ('personne_de_reference', 'famille'), 'af', '2015-01'),
+            ('menage', ('conjoint',), 'salaire_de_base', '2015-01'),
+            ]:
+        check_projection(simulation, entity_key, shortcuts, variable_name, period)
+
+
+def test_cached_index():
+    simulation = new_simulation()
+    simulation.famille.demandeur.menage('statut_occupation_logement', '2015-01')
+    index, valid, _ = get_projection(simulation.famille, (('role', 'demandeur'), ('entity', 'menage')))
+    assert index.tolist() == [0, 0, 1]
+    assert valid is None
+    index, valid, _ = get_projection(simulation.famille, (('role', 'conjoint'), ('entity', 'menage')))
+    assert valid.tolist() == [True, False, False]
+    assert get_projection(simulation.famille, (('role', 'conjoint'), ('entity', 'menage')))[0] is index
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from nose.tools import assert_raises
+
+from openfisca_core.tools import assert_near
+from openfisca_france.decompositions import fiche_de_paie_decomposition_file_path, get_decomposition_plan
+from openfisca_france.fiches_de_paie import iter_fiches_de_paie, new_fiches_de_paie_simulation
+
+from cache import tax_benefit_system
+
+
+salaires_de_base = [1200., 3000., 9000.]
+categories_salarie = [0, 0, 1]
+effectifs_entreprise = [5, 3000, 30]
+
+
+def calculate_fiche_de_paie(salaire_de_base, categorie_salarie, effectif_entreprise):
+    simulation = tax_benefit_system.new_scenario().init_single_entity(
+        period = '2013-01',
+        parent1 = dict(
+            categorie_salarie = categorie_salarie,
+            code_postal_entreprise = '75001',
+            effectif_entreprise = effectif_entreprise,
+            salaire_de_base = salaire_de_base,
+            ),
+        ).new_simulation()
+    decomposition_json = get_decomposition_plan(tax_benefit_system, fiche_de_paie_decomposition_file_path).calculate(
+        [simulation])
+    values_by_code = {}
+
+    def collect(node):
+        values_by_code[node['code']] = node['values'][0]
+        for child in node.get('children') or []:
+            collect(child)
+
+    collect(decomposition_json)
+    return values_by_code
+
+
+def test_fiches_de_paie():
+    fiches_de_paie = list(iter_fiches_de_paie(tax_benefit_system, '2013-01', dict(
+        categorie_salarie = np.array(categories_salarie, dtype = np.int16),
+        code_postal_entreprise = np.array(['75001'] * 3),
+        effectif_entreprise = np.array(effectifs_entreprise, dtype = np.int32),
+        salaire_de_base = np.array(salaires_de_base, dtype = np.float32),
+        )))
+    assert len(fiches_de_paie) == 3
+    assert fiches_de_paie[0].keys()[0] == 'salaire_net_a_payer'
+    for fiche_de_paie, salaire_de_base, categorie_salarie, effectif_entreprise in zip(
+            fiches_de_paie, salaires_de_base, categories_salarie, effectifs_entreprise):
+        expected = calculate_fiche_de_paie(salaire_de_base, categorie_salarie, effectif_entreprise)
+        assert sorted(fiche_de_paie) == sorted(expected)
+        for code, value in fiche_de_paie.iteritems():
+            assert_near(value, expected[code], absolute_error_margin = 0, message = code)
+
+
+def test_fiches_de_paie_yearly_input():
+    fiches_de_paie = list(iter_fiches_de_paie(tax_benefit_system, '2013-01', dict(
+        salaire_de_base = {'2013': np.array([12 * 1500., 12 * 2500.], dtype = np.float32)},
+        )))
+    fiches_de_paie_mensuelles = list(iter_fiches_de_paie(tax_benefit_system, '2013-01', dict(
+        salaire_de_base = np.array([1500., 2500.], dtype = np.float32),
+        )))
+    assert len(fiches_de_paie) == 2
+    assert len(fiches_de_paie_mensuelles) == 2
+    for fiche_de_paie, fiche_de_paie_mensuelle in zip(fiches_de_paie, fiches_de_paie_mensuelles):
+        assert fiche_de_paie == fiche_de_paie_mensuelle
+
+
+def test_fiches_de_paie_invalid_inputs():
+    with assert_raises(ValueError):
+        new_fiches_de_paie_simulation(tax_benefit_system, '2013-01', dict(
+            salaire_de_bas = np.array([1500., 2500.], dtype = np.float32),
+            ))
+    with assert_raises(ValueError):
+        new_fiches_de_paie_simulation(tax_benefit_system, '2013-01', dict(
+            effectif_entreprise = np.array([5, 3000, 30], dtype = np.int32),
+            salaire_de_base = np.array([1500., 2500.], dtype = np.float32),
+            ))
+    with assert_raises(ValueError):
+        new_fiches_de_paie_simulation(tax_benefit_system, '2013-01', dict(
+            salaire_de_base = {
+                '2013-01': np.array([1500., 2500.], dtype = np.float32),
+                '2013-02': np.array([1500.], dtype = np.float32),
+                },
+            ))
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_france.marginal_rates import MarginalRateSimulation
+
+from cache import tax_benefit_system
+
+
+def new_scenario(salaire_increment = 0):
+    return tax_benefit_system.new_scenario().init_from_attributes(
+        period = 2015,
+        test_case = dict(
+            individus = [
+                dict(id = 'ind0', age = 40, salaire_de_base = 30000 + salaire_increment),
+                dict(id = 'ind1', age = 38, salaire_de_base = 8000 + salaire_increment),
+                dict(id = 'ind2', age = 10, salaire_de_base = salaire_increment),
+                dict(id = 'ind3', age = 30, salaire_de_base = 14000 + salaire_increment),
+                ],
+            familles = [
+                dict(id = 'f0', parents = ['ind0', 'ind1'], enfants = ['ind2']),
+                dict(id = 'f1', parents = ['ind3']),
+                ],
+            foyers_fiscaux = [
+                dict(id = 'ff0', declarants = ['ind0', 'ind1'], personnes_a_charge = ['ind2']),
+                dict(id = 'ff1', declarants = ['ind3']),
+                ],
+            menages = [
+                dict(id = 'm0', personne_de_reference = 'ind0', conjoint = 'ind1', enfants = ['ind2']),
+                dict(id = 'm1', personne_de_reference = 'ind3'),
+                ],
+            ),
+        )
+
+
+def test_marginal_rates():
+    delta = 100
+    marginal_rate_simulation = MarginalRateSimulation(new_scenario(), delta = delta)
+    rates = marginal_rate_simulation.get_marginal_rates()
+
+    baseline_simulation = new_scenario().new_simulation()
+    perturbed_simulation = new_scenario(salaire_increment = delta).new_simulation()
+    revenu_disponible_difference = (perturbed_simulation.calculate('revenu_disponible', 2015) -
+        baseline_simulation.calculate('revenu_disponible', 2015))
+    # Every person is perturbed: 3 members in the first ménage, 1 in the second one.
+    expected = 1 - revenu_disponible_difference / (delta * np.array([3, 1]))
+    assert_near(rates, expected[[0, 0, 0, 1]], absolute_error_margin = 1e-3)
+    assert (rates > 0).all() and (rates < 1).all(), rates
+
+    contribution_by_component = marginal_rate_simulation.get_rates_decomposition()
+    assert_near(1 + sum(contribution_by_component.values()), rates, absolute_error_margin = 1e-3)
+    assert (contribution_by_component['revenus_du_travail'] < -.5).all()
+
+
+def test_only_downstream_variables_are_recalculated():
+    marginal_rate_simulation = MarginalRateSimulation(new_scenario(), delta = 100, mask = [True, False, False, False])
+    marginal_rate_simulation.get_marginal_rates()
+    baseline_holder = marginal_rate_simulation.baseline_simulation.persons.get_holder('age_en_mois')
+    perturbed_holder = marginal_rate_simulation.perturbed_simulation.persons.get_holder('age_en_mois')
+    assert perturbed_holder._array_by_period
+    for period, array in perturbed_holder._array_by_period.iteritems():
+        assert array is baseline_holder._array_by_period[period]
+    affected_variables = marginal_rate_simulation.get_affected_variables()
+    assert 'salaire_net' in affected_variables
+    assert 'age_en_mois' not in affected_variables
+    # The affected variables are found again only when the baseline calculates new variables.
+    marginal_rate_simulation.get_marginal_rates()
+    assert marginal_rate_simulation.get_affected_variables() is affected_variables
+    # Only the personne de référence of the first ménage is perturbed.
+    assert np.isnan(marginal_rate_simulation.get_marginal_rates()[3])
+
+
+def test_rates_decomposition_roles():
+    # A student declared in the foyer fiscal and in the famille of their parents, living in their own ménage, comes
+    # first: the values of the foyer fiscal and of the famille are counted on the declarant principal and on the
+    # chef, in the ménage of the parents, as in revenu_disponible.
+    scenario = tax_benefit_system.new_scenario().init_from_attributes(
+        period = 2015,
+        test_case = dict(
+            individus = [
+                dict(id = 'ind2', age = 20, salaire_de_base = 3000),
+                dict(id = 'ind0', age = 50, salaire_de_base = 20000),
+                dict(id = 'ind1', age = 48, salaire_de_base = 8000),
+                dict(id = 'ind3', age = 15),
+                ],
+            familles = [
+                dict(id = 'f0', parents = ['ind0', 'ind1'], enfants = ['ind2', 'ind3']),
+                ],
+            foyers_fiscaux = [
+                dict(id = 'ff0', declarants = ['ind0', 'ind1'], personnes_a_charge = ['ind2', 'ind3']),
+                ],
+            menages = [
+                dict(id = 'm0', personne_de_reference = 'ind0', conjoint = 'ind1', enfants = ['ind3']),
+                dict(id = 'm1', personne_de_reference = 'ind2', loyer = 300, statut_occupation_logement = 4),
+                ],
+            ),
+        )
+    marginal_rate_simulation = MarginalRateSimulation(scenario, delta = 100)
+    rates = marginal_rate_simulation.get_marginal_rates()
+    contribution_by_component = marginal_rate_simulation.get_rates_decomposition()
+    assert_near(1 + sum(contribution_by_component.values()), rates, absolute_error_margin = 1e-4)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from openfisca_core import periods
+from openfisca_core.tools import assert_near
+from openfisca_france.dependencies import get_changed_variables, iter_changed_parameter_names
+from openfisca_france.paired_simulations import PairedSimulation
+from openfisca_france.reforms.plf2016 import plf2016, plf2016_counterfactual
+
+from cache import tax_benefit_system
+
+
+def new_scenario(reform):
+    return reform.new_scenario().init_single_entity(
+        axes = [dict(count = 5, max = 60000, min = 0, name = 'salaire_de_base', period = 2015)],
+        period = 2015,
+        parent1 = dict(age = 40),
+        parent2 = dict(age = 38),
+        enfants = [dict(age = 9), dict(age = 12)],
+        )
+
+
+def test_changed_variables():
+    reform = plf2016(tax_benefit_system)
+    assert list(iter_changed_parameter_names(tax_benefit_system.parameters, reform.parameters)) == ['plf2016']
+    changed_variables = get_changed_variables(reform)
+    assert 'decote' in changed_variables
+    assert 'salaire_net' not in changed_variables
+    assert 'af' not in changed_variables
+
+
+def test_parameter_changes():
+    reform = plf2016_counterfactual(tax_benefit_system)
+    changed_variables = get_changed_variables(reform)
+    assert 'decote' in changed_variables
+    assert 'cotisations_salariales' not in changed_variables
+
+
+def check_paired_simulation(reform_class, variable_name):
+    scenario = new_scenario(reform_class(tax_benefit_system))
+    paired_simulation = PairedSimulation(scenario)
+    baseline_array, reform_array = paired_simulation.calculate(variable_name, 2015)
+    assert_near(baseline_array, scenario.new_simulation(use_baseline = True).calculate(variable_name, 2015),
+        absolute_error_margin = 0)
+    assert_near(reform_array, scenario.new_simulation().calculate(variable_name, 2015), absolute_error_margin = 0)
+
+
+def test_paired_simulations():
+    for reform_class in (plf2016, plf2016_counterfactual):
+        for variable_name in ('irpp', 'revenu_disponible'):
+            yield check_paired_simulation, reform_class, variable_name
+
+
+def test_unchanged_results_are_shared():
+    paired_simulation = PairedSimulation(new_scenario(plf2016(tax_benefit_system)))
+    paired_simulation.calculate('revenu_disponible', 2015)
+    affected_variables = paired_simulation.get_affected_variables()
+    assert 'irpp' in affected_variables
+    assert 'revenu_disponible' in affected_variables
+    assert 'salaire_net' not in affected_variables
+    month = periods.period('2015-01')
+    baseline_holder = paired_simulation.baseline_simulation.entities['individu'].get_holder('salaire_net')
+    reform_holder = paired_simulation.reform_simulation.entities['individu'].get_holder('salaire_net')
+    assert reform_holder.get_array(month) is baseline_holder.get_array(month)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+from openfisca_core import periods
+from openfisca_core.reforms import Reform
+from openfisca_core.tools import assert_near
+from openfisca_france.parameter_sweeps import ParameterSweep, get_parameter
+
+from cache import tax_benefit_system
+
+
+def init_scenario(scenario):
+    return scenario.init_single_entity(
+        axes = [dict(count = 4, max = 40000, min = 0, name = 'salaire_imposable', period = 2015)],
+        period = 2015,
+        parent1 = dict(age = 40),
+        parent2 = dict(age = 38),
+        )
+
+
+def calculate_with_reform(parameter_name, value, variable_name):
+    class reform(Reform):
+        name = u"Modification de {}".format(parameter_name)
+
+        def apply(self):
+            def modify_parameters(parameters):
+                get_parameter(parameters, parameter_name).update(start = periods.instant(2015), value = value)
+                return parameters
+            self.modify_parameters(modifier_function = modify_parameters)
+
+    return init_scenario(reform(tax_benefit_system).new_scenario()).new_simulation().calculate(variable_name, 2015)
+
+
+def check_sweep(parameter_name, values, variable_name):
+    sweep = ParameterSweep(tax_benefit_system, parameter_name, values)
+    result = sweep.calculate(init_scenario(sweep.new_scenario()), variable_name, 2015)
+    assert result.shape == (4, len(values))
+    for index, value in enumerate(values):
+        assert_near(result[:, index], calculate_with_reform(parameter_name, value, variable_name),
+            absolute_error_margin = 0)
+
+
+def test_sweeps():
+    yield check_sweep, 'impot_revenu.decote.seuil_couple', [1000, 1500, 2000], 'irpp'
+    yield check_sweep, 'impot_revenu.bareme[2].rate', [.2, .3, .4], 'irpp'
+
+
+def test_sweep_restores_parameter():
+    sweep = ParameterSweep(tax_benefit_system, 'impot_revenu.decote.seuil_couple', [0, 5000])
+    scenario = init_scenario(sweep.new_scenario())
+    sweep.calculate(scenario, 'irpp', 2015)
+    assert_near(
+        scenario.new_simulation().calculate('irpp', 2015),
+        scenario.new_simulation(use_baseline = True).calculate('irpp', 2015),
+        absolute_error_margin = 0,
+        )
+    assert 'decote' in sweep.changed_variables
+    assert 'salaire_net' not in sweep.changed_variables
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import json
+import urllib2
+
+from openfisca_core.tools import assert_near
+from openfisca_france import preforked_workers
+from openfisca_france.model.prestations import aides_logement
+from openfisca_france.scripts.serve_preforked import new_server
+
+from cache import tax_benefit_system
+
+
+def calculate_revenu_disponible(tax_benefit_system, salaire_de_base):
+    simulation = tax_benefit_system.new_scenario().init_single_entity(
+        period = 2016,
+        parent1 = dict(age = 40, salaire_de_base = salaire_de_base),
+        ).new_simulation()
+    return simulation.calculate('revenu_disponible', 2016).tolist()
+
+
+def test_worker_pool():
+    worker_pool = preforked_workers.WorkerPool(tax_benefit_system, processes = 2, period = 2016)
+    try:
+        assert aides_logement.zone_apl_by_depcom is not None
+        try:
+            preforked_workers.WorkerPool(tax_benefit_system, processes = 1)
+        except ValueError:
+            pass
+        else:
+            assert False, u"Only one worker pool can be active"
+        salaires = [0, 15000, 30000]
+        values = worker_pool.map(calculate_revenu_disponible, [(salaire,) for salaire in salaires])
+    finally:
+        worker_pool.close()
+    for salaire, value in zip(salaires, values):
+        assert_near(value, calculate_revenu_disponible(tax_benefit_system, salaire), absolute_error_margin = 1e-3)
+
+
+def test_server():
+    preforked_workers.warm_up(tax_benefit_system)
+    server = new_server(tax_benefit_system, port = 0)
+    preforked_workers.collect_garbage()
+    pids = preforked_workers.fork_workers(2, server.serve_forever)
+    server.server_close()
+    try:
+        scenario = preforked_workers.new_warm_up_scenario(tax_benefit_system, 2016)
+        url = 'http://127.0.0.1:{}/calculate'.format(server.server_address[1])
+        request = urllib2.Request(
+            url,
+            json.dumps(dict(scenarios = [scenario.to_json()], variables = ['revenu_disponible'])),
+            {'Content-Type': 'application/json'},
+            )
+        response = json.load(urllib2.urlopen(request, timeout = 60))
+        request = urllib2.Request(
+            url,
+            json.dumps(dict(scenarios = [scenario.to_json()], variables = ['unknown_variable'])),
+            {'Content-Type': 'application/json'},
+            )
+        try:
+            urllib2.urlopen(request, timeout = 60)
+        except urllib2.HTTPError as error:
+            assert error.code == 400
+            assert 'unknown_variable' in json.load(error)['error']
+        else:
+            assert False, u"An unknown variable must be rejected"
+    finally:
+        preforked_workers.stop_workers(pids)
+    assert_near(response['values'][0]['revenu_disponible'],
+        scenario.new_simulation().calculate('revenu_disponible', 2016), absolute_error_margin = 1e-2)
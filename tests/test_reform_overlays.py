@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+from openfisca_core import reforms
+from openfisca_core.parameters import ParameterNode
+from openfisca_core.tools import assert_near
+from openfisca_france.dependencies import iter_changed_parameter_names
+from openfisca_france.reform_overlays import ReformCache
+from openfisca_france.reforms.plf2015 import decote, modify_parameters as plf2015_modify_parameters, plf2015
+from openfisca_france.reforms.smic_h_b_9_euros import smic_h_b_9_euros
+
+from cache import tax_benefit_system
+
+
+class plf2015_with_copied_parameters(reforms.Reform):
+    name = u"Projet de loi de finances 2015, paramètres entièrement copiés"
+
+    def apply(self):
+        self.update_variable(decote)
+        self.modify_parameters(modifier_function = plf2015_modify_parameters)
+
+
+def iter_nodes(node):
+    yield node
+    for child in node.children.itervalues():
+        if isinstance(child, ParameterNode):
+            for sub_node in iter_nodes(child):
+                yield sub_node
+
+
+def test_unmodified_parameters_are_shared():
+    reform = smic_h_b_9_euros(tax_benefit_system)
+    baseline_parameters = tax_benefit_system.parameters
+    assert reform.parameters is not baseline_parameters
+    assert reform.parameters.prestations is baseline_parameters.prestations
+    assert reform.parameters.children['prestations'] is baseline_parameters.children['prestations']
+    assert reform.parameters.cotsoc is not baseline_parameters.cotsoc
+    assert reform.parameters.cotsoc.gen.smic_h_b is not baseline_parameters.cotsoc.gen.smic_h_b
+    assert reform.parameters.cotsoc.children['cotisations_employeur'] is \
+        baseline_parameters.cotsoc.children['cotisations_employeur']
+    assert all(type(node) is ParameterNode for node in iter_nodes(reform.parameters))
+
+
+def test_baseline_parameters_are_unchanged():
+    plf2015(tax_benefit_system)
+    smic_h_b_9_euros(tax_benefit_system)
+    assert tax_benefit_system.get_parameters_at_instant('2013-01-01').cotsoc.gen.smic_h_b != 9
+    assert 'plf2015' not in tax_benefit_system.parameters.children
+    assert tax_benefit_system.get_parameters_at_instant('2013-01-01').impot_revenu.bareme.rates[1] != 0
+
+
+def test_same_parameters_as_copied_parameters():
+    reform = plf2015(tax_benefit_system)
+    copied_parameters_reform = plf2015_with_copied_parameters(tax_benefit_system)
+    assert list(iter_changed_parameter_names(copied_parameters_reform.parameters, reform.parameters)) == []
+    assert sorted(iter_changed_parameter_names(tax_benefit_system.parameters, reform.parameters)) == [
+        'impot_revenu.bareme', 'plf2015']
+    scenario_kwargs = dict(
+        axes = [dict(count = 5, max = 60000, min = 0, name = 'salaire_de_base', period = 2013)],
+        period = 2013,
+        parent1 = dict(age = 40),
+        )
+    assert_near(
+        reform.new_scenario().init_single_entity(**scenario_kwargs).new_simulation().calculate('irpp', 2013),
+        copied_parameters_reform.new_scenario().init_single_entity(**scenario_kwargs).new_simulation().calculate(
+            'irpp', 2013),
+        absolute_error_margin = 0,
+        )
+
+
+def test_reform_cache():
+    reform_cache = ReformCache(tax_benefit_system, 2)
+    plf2015_path = 'openfisca_france.reforms.plf2015.plf2015'
+    smic_path = 'openfisca_france.reforms.smic_h_b_9_euros.smic_h_b_9_euros'
+    reform = reform_cache.get_reform([plf2015_path])
+    assert reform.baseline is tax_benefit_system
+    assert reform_cache.get_reform([plf2015_path]) is reform
+    combined_reform = reform_cache.get_reform([plf2015_path, smic_path])
+    assert combined_reform.baseline is reform
+    assert reform_cache.get_reform([plf2015_path, smic_path]) is combined_reform
+    reform_cache.get_reform([smic_path])
+    assert reform_cache.reform_by_reform_paths.keys() == [(plf2015_path, smic_path), (smic_path,)]
+    assert reform_cache.get_reform([plf2015_path]) is not reform
+
+
+def test_apply_reforms():
+    reform = tax_benefit_system.apply_reform('openfisca_france.reforms.plf2015.plf2015')
+    assert tax_benefit_system.apply_reform('openfisca_france.reforms.plf2015.plf2015') is reform
+    assert tax_benefit_system.apply_reforms(['openfisca_france.reforms.plf2015.plf2015']) is reform
+
+
+def test_chained_reforms():
+    plf2015_path = 'openfisca_france.reforms.plf2015.plf2015'
+    smic_path = 'openfisca_france.reforms.smic_h_b_9_euros.smic_h_b_9_euros'
+    reform = tax_benefit_system.apply_reform(plf2015_path)
+    chained_reform = reform.apply_reform(smic_path)
+    assert chained_reform.baseline is reform
+    assert reform.apply_reforms([smic_path]) is chained_reform
+    assert chained_reform.get_parameters_at_instant('2013-01-01').cotsoc.gen.smic_h_b == 9
+    assert chained_reform.get_parameters_at_instant('2013-01-01').impot_revenu.bareme.rates[1] == 0
+    assert tax_benefit_system.apply_reform(smic_path).baseline is tax_benefit_system
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+from openfisca_core import periods
+from openfisca_core.tools import assert_near
+from openfisca_france.parameter_sweeps import ParameterSweep
+from openfisca_france.reforms.plf2016 import plf2016
+from openfisca_france.result_cache import ResultCache, check_directory, get_fingerprint, get_tax_benefit_system_key
+
+from cache import tax_benefit_system
+
+
+variable_names = ['revenu_disponible', 'irpp']
+
+
+def new_scenario(tax_benefit_system = tax_benefit_system, salaire_de_base = 30000):
+    return tax_benefit_system.new_scenario().init_single_entity(
+        period = 2016,
+        parent1 = dict(age = 40, salaire_de_base = salaire_de_base),
+        enfants = [dict(age = 9)],
+        )
+
+
+def test_fingerprint():
+    fingerprint = get_fingerprint(new_scenario(), variable_names)
+    assert get_fingerprint(new_scenario(), variable_names) == fingerprint
+    assert get_fingerprint(new_scenario(salaire_de_base = 30001), variable_names) != fingerprint
+    assert get_fingerprint(new_scenario(), variable_names, ['2015']) != fingerprint
+    assert get_fingerprint(new_scenario(), ['irpp']) != fingerprint
+    assert get_fingerprint(new_scenario(plf2016(tax_benefit_system)), variable_names) != fingerprint
+
+
+def test_baseline_key():
+    key = get_tax_benefit_system_key(tax_benefit_system)
+    assert key.startswith(u'FranceTaxBenefitSystem-')
+    assert get_tax_benefit_system_key(plf2016(tax_benefit_system)).startswith(key + u'/')
+
+
+def test_reform_parameters_key():
+    sweep = ParameterSweep(tax_benefit_system, 'impot_revenu.decote.seuil_couple', [0, 5000])
+    key = get_tax_benefit_system_key(sweep.reform)
+    values_list = sweep.values_history.values_list
+    try:
+        sweep.values_history.update(start = periods.instant('2016-01-01'), value = 5000)
+        assert get_tax_benefit_system_key(sweep.reform) != key
+    finally:
+        sweep.values_history.values_list = values_list
+    assert get_tax_benefit_system_key(sweep.reform) == key
+
+
+def test_result_cache():
+    result_cache = ResultCache(max_size = 1)
+    results = result_cache.calculate(new_scenario(), variable_names)
+    simulation = new_scenario().new_simulation()
+    for variable_name in variable_names:
+        assert_near(results[variable_name]['2016'], simulation.calculate(variable_name, 2016),
+            absolute_error_margin = 1e-3)
+        assert not results[variable_name]['2016'].flags.writeable
+    assert result_cache.calculate(new_scenario(), variable_names) is results
+    assert (result_cache.hits, result_cache.misses) == (1, 1)
+    # The least recently used request is evicted.
+    result_cache.calculate(new_scenario(salaire_de_base = 20000), variable_names)
+    assert result_cache.calculate(new_scenario(), variable_names) is not results
+    assert (result_cache.hits, result_cache.misses) == (1, 3)
+
+
+def test_ttl():
+    result_cache = ResultCache(ttl = 0)
+    result_cache.calculate(new_scenario(), ['irpp'])
+    result_cache.calculate(new_scenario(), ['irpp'])
+    assert (result_cache.hits, result_cache.misses) == (0, 2)
+
+
+def test_directory():
+    directory = tempfile.mkdtemp()
+    try:
+        results = ResultCache(directory = directory).calculate(new_scenario(), variable_names)
+        result_cache = ResultCache(directory = directory)
+        cached_results = result_cache.calculate(new_scenario(), variable_names)
+    finally:
+        shutil.rmtree(directory)
+    assert (result_cache.hits, result_cache.misses) == (1, 0)
+    for variable_name in variable_names:
+        assert (cached_results[variable_name]['2016'] == results[variable_name]['2016']).all()
+
+
+def test_directory_size():
+    directory = tempfile.mkdtemp()
+    try:
+        result_cache = ResultCache(max_size = 2, directory = directory)
+        for salaire_de_base in [10000, 20000, 30000]:
+            result_cache.calculate(new_scenario(salaire_de_base = salaire_de_base), ['irpp'])
+        assert len(os.listdir(directory)) == 2
+        ResultCache(ttl = 0, directory = directory).calculate(new_scenario(salaire_de_base = 40000), ['irpp'])
+        assert os.listdir(directory) == []
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_directory_permissions():
+    directory = tempfile.mkdtemp()
+    try:
+        check_directory(directory)
+        os.chmod(directory, 0o777)
+        try:
+            ResultCache(directory = directory)
+        except ValueError:
+            pass
+        else:
+            assert False, u"A directory writable by others must be rejected"
+    finally:
+        shutil.rmtree(directory)
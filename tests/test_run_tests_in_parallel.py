@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+from openfisca_france.scripts import run_tests_in_parallel
+
+from cache import tax_benefit_system
+
+
+formulas_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'formulas')
+
+
+def test_sort_by_duration():
+    yaml_paths = run_tests_in_parallel.sort_by_duration(['a.yaml', 'b.yaml', 'c.yaml'], {'a.yaml': 1, 'c.yaml': 5})
+    assert yaml_paths == ['b.yaml', 'c.yaml', 'a.yaml']
+
+
+def test_run_test_files():
+    directory = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(formulas_directory, 'age.yaml'), directory)
+        with open(os.path.join(directory, 'failing.yaml'), 'w') as yaml_file:
+            yaml_file.write(
+                '- name: "Âge faux"\n'
+                '  period: "2013-01"\n'
+                '  input_variables:\n'
+                '    age: 40\n'
+                '  output_variables:\n'
+                '    age_en_mois: 12\n'
+                )
+        results = list(run_tests_in_parallel.run_test_files(tax_benefit_system, [directory], processes = 2))
+    finally:
+        shutil.rmtree(directory)
+    result_by_filename = dict((os.path.basename(result[0]), result[1:]) for result in results)
+    assert sorted(result_by_filename) == ['age.yaml', 'failing.yaml']
+    duration, tests_count, failures = result_by_filename['age.yaml']
+    assert duration > 0
+    assert (tests_count, failures) == (10, [])
+    duration, tests_count, failures = result_by_filename['failing.yaml']
+    assert tests_count == 1
+    assert len(failures) == 1
+    assert u'Âge faux' in failures[0][0]
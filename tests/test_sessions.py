@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_france.sessions import SimulationSession
+
+from cache import tax_benefit_system
+
+
+variable_names = ['aide_logement', 'rsa', 'ppa', 'af']
+
+
+def new_scenario(loyer = 600, salaire_de_base_by_month = None, depcom = '69381'):
+    if salaire_de_base_by_month is None:
+        salaire_de_base_by_month = dict((month, 1000) for month in ['2016-10', '2016-11', '2016-12', '2017-01'])
+    return tax_benefit_system.new_scenario().init_from_attributes(
+        period = '2017-01',
+        test_case = dict(
+            individus = [
+                dict(id = 'ind0', age = 35, salaire_de_base = salaire_de_base_by_month),
+                dict(id = 'ind1', age = 33),
+                dict(id = 'ind2', age = 8),
+                dict(id = 'ind3', age = 5),
+                ],
+            familles = [
+                dict(id = 'f0', parents = ['ind0', 'ind1'], enfants = ['ind2', 'ind3']),
+                ],
+            foyers_fiscaux = [
+                dict(id = 'ff0', declarants = ['ind0', 'ind1'], personnes_a_charge = ['ind2', 'ind3']),
+                ],
+            menages = [
+                dict(id = 'm0', personne_de_reference = 'ind0', conjoint = 'ind1', enfants = ['ind2', 'ind3'],
+                    depcom = depcom, loyer = loyer, statut_occupation_logement = 4),
+                ],
+            ),
+        )
+
+
+def check_session(session, scenario):
+    simulation = scenario.new_simulation()
+    for variable_name in variable_names:
+        assert_near(session.calculate(variable_name, '2017-01'), simulation.calculate(variable_name, '2017-01'),
+            absolute_error_margin = 1e-3, message = variable_name)
+
+
+def test_session():
+    session = SimulationSession(new_scenario())
+    check_session(session, new_scenario())
+    traced_count = len(session.simulation.traceback)
+
+    invalidated = session.set_input('loyer', '2017-01', 800)
+    assert ('aide_logement', session.simulation.period) in invalidated
+    assert ('af', session.simulation.period) not in invalidated
+    assert len(invalidated) < traced_count / 2, (len(invalidated), traced_count)
+    check_session(session, new_scenario(loyer = 800))
+
+    # The salary of the last quarter is a resource of the RSA and of the PPA of January.
+    invalidated = session.set_input('salaire_de_base', '2016-11', np.array([1500, 0, 0, 0]))
+    assert ('rsa', session.simulation.period) in invalidated
+    check_session(session, new_scenario(loyer = 800, salaire_de_base_by_month = {
+        '2016-10': 1000, '2016-11': 1500, '2016-12': 1000, '2017-01': 1000}))
+
+    # A yearly loyer replaces the monthly values of the year.
+    session.set_input('loyer', '2017', 12 * 700)
+    session.set_input('depcom', '2017-01', '75056')
+    check_session(session, new_scenario(loyer = 700, salaire_de_base_by_month = {
+        '2016-10': 1000, '2016-11': 1500, '2016-12': 1000, '2017-01': 1000}, depcom = '75056'))
+
+
+def new_n_2_scenario(salaire_imposable):
+    return tax_benefit_system.new_scenario().init_single_entity(
+        period = '2016-03',
+        parent1 = dict(age = 40, salaire_imposable = {'2014': salaire_imposable}),
+        parent2 = dict(age = 38),
+        enfants = [dict(age = 3), dict(age = 5)],
+        )
+
+
+def test_session_year_invariant_variables():
+    # The resources of the prestations familiales are year-invariant, and cached for every month from January.
+    session = SimulationSession(new_n_2_scenario(30000))
+    session.calculate('af', '2016-01')
+    session.calculate('af', '2016-03')
+    session.set_input('salaire_imposable', '2014', np.array([80000, 0, 0, 0]))
+    simulation = new_n_2_scenario(80000).new_simulation()
+    for month in ['2016-03', '2016-01']:
+        assert_near(session.calculate('af', month), simulation.calculate('af', month), absolute_error_margin = 1e-3,
+            message = month)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_france.sharded_simulations import Population, calculate, calculate_variables
+
+from cache import tax_benefit_system
+
+
+def new_population():
+    # Six ménages: a couple with two children, a single person, a couple, a student declared in the foyer fiscal of the
+    # couple of the 4th ménage, a single parent and a retired person.
+    return Population(
+        members_entity_id_by_entity = dict(
+            famille = np.array([0, 0, 0, 0, 1, 2, 2, 3, 4, 5, 5, 6]),
+            foyer_fiscal = np.array([0, 0, 0, 0, 1, 2, 2, 3, 3, 4, 4, 5]),
+            menage = np.array([0, 0, 0, 0, 1, 2, 2, 3, 4, 5, 5, 6]),
+            ),
+        members_legacy_role_by_entity = dict(
+            famille = np.array([0, 1, 2, 3, 0, 0, 1, 0, 0, 0, 2, 0]),
+            foyer_fiscal = np.array([0, 1, 2, 3, 0, 0, 1, 0, 2, 0, 2, 0]),
+            menage = np.array([0, 1, 2, 3, 0, 0, 1, 0, 0, 0, 2, 0]),
+            ),
+        input_variables = dict(
+            age = {'2016-01': np.array([40, 38, 12, 9, 30, 55, 52, 60, 20, 35, 4, 70])},
+            salaire_de_base = {2016: np.array([40000, 20000, 0, 0, 18000, 30000, 0, 50000, 3000, 15000, 0, 0])},
+            retraite_brute = {2016: np.array([0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 15000])},
+            loyer = {'2016-01': np.array([800, 450, 0, 700, 350, 500, 0])},
+            statut_occupation_logement = {'2016-01': np.array([4, 4, 2, 4, 4, 4, 2])},
+            ),
+        )
+
+
+def test_households():
+    population = new_population()
+    assert_near(population.get_households(), [0, 0, 0, 0, 4, 5, 5, 7, 7, 9, 9, 11], absolute_error_margin = 0)
+    shards = population.split(3)
+    assert sorted(np.concatenate(shards)) == range(population.persons_count)
+    for persons in shards:
+        assert 7 not in persons or 8 in persons
+
+
+def test_sharded_results():
+    population = new_population()
+    variable_names = ['revenu_disponible', 'irpp', 'af', 'salaire_net']
+    simulation = population.new_simulation(tax_benefit_system, 2016)
+    array_by_variable = calculate_variables(tax_benefit_system, population, 2016, variable_names, processes = 2,
+        shards_count = 3)
+    for variable_name in variable_names:
+        assert_near(array_by_variable[variable_name], calculate(simulation, variable_name, simulation.period),
+            absolute_error_margin = 1e-3, message = variable_name)
+
+
+def test_entities_without_members():
+    # The ménage 1 has no member.
+    population = Population(
+        members_entity_id_by_entity = dict(
+            famille = np.array([0, 1]),
+            foyer_fiscal = np.array([0, 1]),
+            menage = np.array([0, 2]),
+            ),
+        members_legacy_role_by_entity = dict(
+            famille = np.array([0, 0]),
+            foyer_fiscal = np.array([0, 0]),
+            menage = np.array([0, 0]),
+            ),
+        input_variables = dict(
+            age = {'2016-01': np.array([40, 30])},
+            salaire_de_base = {2016: np.array([40000, 20000])},
+            ),
+        )
+    array_by_variable = calculate_variables(tax_benefit_system, population, 2016, ['revenu_disponible'],
+        processes = 1, shards_count = 2)
+    assert len(array_by_variable['revenu_disponible']) == 3
+    assert array_by_variable['revenu_disponible'][1] == 0
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from nose.tools import assert_raises
+
+from openfisca_core.tools import assert_near
+from openfisca_france.sparse_inputs import (
+    compact, is_constant_array, is_zero, requested_period_constant_default_value)
+
+from cache import tax_benefit_system
+
+
+def new_simulation(count = 3, **foyer_fiscal_inputs):
+    return tax_benefit_system.new_scenario().init_from_attributes(
+        period = 2015,
+        input_variables = dict(
+            salaire_imposable = np.zeros(count),
+            **foyer_fiscal_inputs
+            ),
+        ).new_simulation()
+
+
+def test_unset_box_is_constant():
+    simulation = new_simulation()
+    f7ud = simulation.calculate('f7ud', 2015)
+    assert f7ud.size == 3
+    assert is_constant_array(f7ud)
+    assert is_zero(f7ud)
+    assert not f7ud.flags.writeable
+
+
+def test_zero_box_input_is_compacted():
+    simulation = new_simulation(f7ud = np.zeros(3, dtype = np.int32))
+    f7ud = simulation.calculate('f7ud', 2015)
+    assert is_constant_array(f7ud)
+    assert is_zero(f7ud)
+
+
+def test_filled_box_input_is_kept():
+    simulation = new_simulation(f7ud = np.array([0, 1000, 0], dtype = np.int32))
+    f7ud = simulation.calculate('f7ud', 2015)
+    assert not is_constant_array(f7ud)
+    assert not is_zero(f7ud)
+    assert_near(f7ud, [0, 1000, 0])
+
+
+def test_compact():
+    assert is_constant_array(compact(np.array([2., 2., 2.])))
+    assert_near(compact(np.array([2., 2., 2.])), [2, 2, 2])
+    assert not is_constant_array(compact(np.array([2., 1., 2.])))
+
+
+def test_formulas_read_constant_boxes():
+    simulation = new_simulation()
+    assert_near(simulation.calculate('reductions', 2015), [0, 0, 0])
+    assert_near(simulation.calculate('isf_tot', 2015), [0, 0, 0])
+
+
+def test_income_tax_does_not_write_into_constant_boxes():
+    simulation = new_simulation()
+    assert_near(simulation.calculate('irpp', 2015), [0, 0, 0])
+    boxes = [
+        holder
+        for holder in simulation.foyer_fiscal._holders.itervalues()
+        if holder.column.formula_class.base_function.im_func is requested_period_constant_default_value and
+        holder._array_by_period
+        ]
+    assert boxes
+    for holder in boxes:
+        for array in holder._array_by_period.itervalues():
+            assert is_constant_array(array)
+            with assert_raises(ValueError):
+                array[0] = 1
+            assert is_zero(array)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_france import FranceTaxBenefitSystem
+from openfisca_france.conf.storage_dtypes import storage_dtype_by_variable
+from openfisca_france.storage_dtypes import get_storage_dtype
+
+from cache import tax_benefit_system
+
+
+def test_declared_variables_exist():
+    for variable_name, dtype in storage_dtype_by_variable.iteritems():
+        column = tax_benefit_system.get_column(variable_name, check_existence = True)
+        assert column.dtype == np.dtype(dtype).type, variable_name
+        assert np.array(column.default, dtype = dtype) == column.default, variable_name
+
+
+def test_enumerations_are_int8():
+    assert tax_benefit_system.get_column('zone_apl').dtype == np.int8
+    assert tax_benefit_system.get_column('categorie_salarie').dtype == np.int8
+
+
+def new_scenario(tax_benefit_system):
+    return tax_benefit_system.new_scenario().init_single_entity(
+        axes = [dict(count = 5, max = 40000, min = 0, name = 'salaire_de_base', period = 2016)],
+        period = 2016,
+        parent1 = dict(age = 40),
+        parent2 = dict(age = 38),
+        enfants = [dict(age = 1), dict(age = 9), dict(age = 12), dict(age = 17)],
+        )
+
+
+def test_same_results_as_default_dtypes():
+    default_dtypes_tax_benefit_system = FranceTaxBenefitSystem()
+    for column in default_dtypes_tax_benefit_system.column_by_name.itervalues():
+        if get_storage_dtype(column, storage_dtype_by_variable) is not None:
+            column.dtype = type(column).dtype
+    assert default_dtypes_tax_benefit_system.get_column('af_nbenf').dtype == np.int32
+    simulation = new_scenario(tax_benefit_system).new_simulation()
+    default_dtypes_simulation = new_scenario(default_dtypes_tax_benefit_system).new_simulation()
+    for variable_name in ('af_nbenf', 'rsa_nb_enfants', 'age', 'af', 'rsa', 'aide_logement', 'revenu_disponible'):
+        array = simulation.calculate_add(variable_name, 2016)
+        assert_near(array, default_dtypes_simulation.calculate_add(variable_name, 2016), absolute_error_margin = 0)
+    assert simulation.calculate('af_nbenf', '2016-01').dtype == np.int8
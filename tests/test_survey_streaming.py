@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_france import survey_streaming
+from openfisca_france.sharded_simulations import Population, calculate
+
+from cache import tax_benefit_system
+
+
+# Five ménages: a couple with two children, a single person, a couple, a student declared in the foyer fiscal of the
+# couple of the 3rd ménage, and a retired person.
+survey_rows = [
+    # idfam, quifam, idfoy, quifoy, idmen, quimen, date_naissance, salaire_de_base, retraite_brute
+    ('10', 0, '10', 0, '1', 0, '1976-01-01', 40000, 0),
+    ('10', 1, '10', 1, '1', 1, '1978-01-01', 20000, 0),
+    ('10', 2, '10', 2, '1', 2, '2004-01-01', 0, 0),
+    ('10', 3, '10', 3, '1', 3, '2007-01-01', 0, 0),
+    ('11', 0, '11', 0, '2', 0, '1986-01-01', 18000, 0),
+    ('12', 0, '12', 0, '3', 0, '1961-01-01', 50000, 0),
+    ('12', 1, '12', 1, '3', 1, '1964-01-01', 0, 0),
+    ('13', 0, '12', 2, '4', 0, '1996-01-01', 3000, 0),
+    ('14', 0, '14', 0, '5', 0, '1946-01-01', 0, 15000),
+    ]
+survey_columns = ['idfam', 'quifam', 'idfoy', 'quifoy', 'idmen', 'quimen', 'date_naissance', 'salaire_de_base',
+    'retraite_brute']
+
+
+def write_survey(directory):
+    csv_path = os.path.join(directory, 'survey.csv')
+    with open(csv_path, 'wb') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(survey_columns)
+        writer.writerows(survey_rows)
+    return csv_path
+
+
+def test_chunks():
+    directory = tempfile.mkdtemp()
+    try:
+        chunks = list(survey_streaming.iter_chunks(
+            survey_streaming.iter_csv_blocks(write_survey(directory), block_size = 2), chunk_size = 3))
+    finally:
+        shutil.rmtree(directory)
+    # The 3rd and 4th ménages share a foyer fiscal.
+    assert [chunk['idmen'].tolist() for chunk in chunks] == [['1', '1', '1', '1'], ['2'], ['3', '3', '4'], ['5']]
+
+
+def test_streaming_results():
+    variable_names = ['revenu_disponible', 'irpp', 'salaire_net']
+    directory = tempfile.mkdtemp()
+    try:
+        csv_path = write_survey(directory)
+        results = list(survey_streaming.iter_results(tax_benefit_system,
+            survey_streaming.iter_csv_blocks(csv_path, block_size = 2), 2016, variable_names, chunk_size = 3))
+        writer = survey_streaming.CsvResultsWriter(tax_benefit_system, directory, variable_names)
+        for result in results:
+            writer.write(result)
+        writer.close()
+        with open(os.path.join(directory, 'menage.csv'), 'rb') as csv_file:
+            menage_rows = list(csv.reader(csv_file))
+    finally:
+        shutil.rmtree(directory)
+
+    columns = zip(*survey_rows)
+    population = Population(
+        members_entity_id_by_entity = dict(
+            famille = np.unique(columns[0], return_inverse = True)[1],
+            foyer_fiscal = np.unique(columns[2], return_inverse = True)[1],
+            menage = np.unique(columns[4], return_inverse = True)[1],
+            ),
+        members_legacy_role_by_entity = dict(
+            famille = np.array(columns[1]),
+            foyer_fiscal = np.array(columns[3]),
+            menage = np.array(columns[5]),
+            ),
+        input_variables = dict(
+            date_naissance = {2016: np.array(columns[6], dtype = 'datetime64[D]')},
+            salaire_de_base = {2016: np.array(columns[7], dtype = np.float32)},
+            retraite_brute = {2016: np.array(columns[8], dtype = np.float32)},
+            ),
+        )
+    simulation = population.new_simulation(tax_benefit_system, 2016)
+    for variable_name in variable_names:
+        assert_near(
+            np.concatenate([result['array_by_variable'][variable_name] for result in results]),
+            calculate(simulation, variable_name, simulation.period),
+            absolute_error_margin = 1e-3,
+            message = variable_name,
+            )
+    assert menage_rows[0] == ['id', 'revenu_disponible']
+    assert [row[0] for row in menage_rows[1:]] == ['1', '2', '3', '4', '5']
+    assert_near([float(row[1]) for row in menage_rows[1:]],
+        calculate(simulation, 'revenu_disponible', simulation.period), absolute_error_margin = 1e-2)
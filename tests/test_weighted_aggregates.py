@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_france.survey_streaming import iter_csv_blocks
+from openfisca_france.weighted_aggregates import QuantileSketch, WeightedAggregates, aggregate_survey
+
+from cache import tax_benefit_system
+
+
+def test_quantile_sketch():
+    random_state = np.random.RandomState(0)
+    values = random_state.lognormal(10, 1, 20000)
+    weights = random_state.uniform(100, 2000, 20000)
+    order = np.argsort(values)
+    cumulated_weights = np.cumsum(weights[order]) / weights.sum()
+
+    exact_sketch = QuantileSketch(max_points = 100000)
+    compressed_sketch = QuantileSketch(max_points = 200)
+    for start in range(0, 20000, 1000):
+        exact_sketch.add(values[start:start + 1000], weights[start:start + 1000])
+        compressed_sketch.add(values[start:start + 1000], weights[start:start + 1000])
+    assert len(compressed_sketch.values) <= 400
+    for q in [.1, .5, .9]:
+        expected = values[order][np.searchsorted(cumulated_weights, q)]
+        assert exact_sketch.quantile(q) == expected
+        # The weight below the approximate quantile is close to q.
+        assert abs(weights[values <= compressed_sketch.quantile(q)].sum() / weights.sum() - q) < .01
+
+
+def test_merge():
+    variable_names = ['salaire_de_base']
+    arrays = [np.array([0., 1000, 2000]), np.array([3000., 0])]
+    weights = [np.array([1., 2, 3]), np.array([4., 5])]
+    merged = WeightedAggregates(tax_benefit_system, variable_names, variable_names)
+    for array, array_weights in zip(arrays, weights):
+        aggregates = WeightedAggregates(tax_benefit_system, variable_names, variable_names)
+        aggregates.add({'salaire_de_base': array}, {'individu': array_weights})
+        merged.merge(aggregates)
+    assert merged.sum_by_variable['salaire_de_base'] == 1000 * 2 + 2000 * 3 + 3000 * 4
+    assert merged.recipients_by_variable['salaire_de_base'] == 9
+    assert merged.get_quantiles('salaire_de_base', [.5]) == [1000]
+    assert merged.get_poverty_rate('salaire_de_base') == 6. / 15
+
+
+def test_persons_weighted_poverty_rate():
+    niveau_de_vie = np.array([1000., 2500, 3000])
+    weights = np.array([1., 1, 1])
+    # The richest ménage has 3 persons.
+    persons_weights = np.array([1., 1, 3])
+    persons_weighted = WeightedAggregates(tax_benefit_system, [], ['niveau_de_vie'])
+    persons_weighted.add({'niveau_de_vie': niveau_de_vie}, {'menage': weights}, {'menage': persons_weights})
+    assert persons_weighted.get_quantiles('niveau_de_vie', [.5]) == [3000]
+    assert persons_weighted.get_poverty_rate('niveau_de_vie') == 1. / 5
+    households_weighted = WeightedAggregates(tax_benefit_system, [], ['niveau_de_vie'], persons_weighted = False)
+    households_weighted.add({'niveau_de_vie': niveau_de_vie}, {'menage': weights})
+    assert households_weighted.get_quantiles('niveau_de_vie', [.5]) == [2500]
+    assert households_weighted.get_poverty_rate('niveau_de_vie') == 1. / 3
+
+
+def test_aggregate_survey():
+    directory = tempfile.mkdtemp()
+    try:
+        csv_path = os.path.join(directory, 'survey.csv')
+        with open(csv_path, 'wb') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['idfam', 'quifam', 'idfoy', 'quifoy', 'idmen', 'quimen', 'wprm', 'date_naissance',
+                'salaire_de_base'])
+            writer.writerows([
+                (0, 0, 0, 0, 0, 0, 1000, '1976-01-01', 40000),
+                (0, 1, 0, 1, 0, 1, 1000, '1978-01-01', 20000),
+                (1, 0, 1, 0, 1, 0, 3000, '1986-01-01', 0),
+                (2, 0, 2, 0, 2, 0, 2000, '1956-01-01', 15000),
+                ])
+        aggregates = aggregate_survey(tax_benefit_system, iter_csv_blocks(csv_path, block_size = 1), 2016,
+            ['salaire_de_base', 'revenu_disponible'], ['niveau_de_vie'], chunk_size = 1)
+    finally:
+        shutil.rmtree(directory)
+    assert_near(aggregates.sum_by_variable['salaire_de_base'], 1000 * 60000 + 2000 * 15000, absolute_error_margin = 1)
+    assert aggregates.recipients_by_variable['salaire_de_base'] == 4000
+    assert aggregates.total_weight_by_entity['menage'] == 6000
+    assert aggregates.recipients_by_variable['revenu_disponible'] > 0
+    assert len(aggregates.get_quantiles('niveau_de_vie')) == 9
+    # The ménages of 2, 1 and 1 persons weigh 1000, 3000 and 2000.
+    assert aggregates.sketch_by_variable['niveau_de_vie'].weights.sum() == 2 * 1000 + 3000 + 2000
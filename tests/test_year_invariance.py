@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+from openfisca_core import periods
+from openfisca_core.tools import assert_near
+from openfisca_france.year_invariance import get_year_invariant_variables
+
+from cache import tax_benefit_system
+
+
+def test_year_invariant_variables():
+    year_invariant_variables = get_year_invariant_variables(tax_benefit_system)
+    assert 'prestations_familiales_base_ressources_individu' in year_invariant_variables
+    # Read monthly variables for the requested month, or months before it.
+    assert 'prestations_familiales_base_ressources' not in year_invariant_variables
+    assert 'aide_logement_abattement_chomage_indemnise' not in year_invariant_variables
+    # Rolling year
+    assert 'cmu_base_ressources_individu' not in year_invariant_variables
+
+
+def test_shared_array():
+    simulation = tax_benefit_system.new_scenario().init_single_entity(
+        period = 2016,
+        parent1 = dict(age = 40, salaire_imposable = {'2014': 30000}),
+        parent2 = dict(age = 38),
+        enfants = [dict(age = 3), dict(age = 5)],
+        ).new_simulation()
+    simulation.calculate_add('af', 2016)
+    holder = simulation.individu.get_holder('prestations_familiales_base_ressources_individu')
+    months = [periods.period('2016-01').offset(index) for index in range(12)]
+    arrays = [holder.get_array(month) for month in months]
+    assert all(array is arrays[0] for array in arrays)
+    for month in months:
+        assert_near(holder.formula.base_function(simulation, month), arrays[0], absolute_error_margin = 0)
+    assert_near(arrays[0], [30000 * 0.9, 0, 0, 0], absolute_error_margin = 1)
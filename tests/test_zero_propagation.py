@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from openfisca_core import reforms
+from openfisca_core.tools import assert_near
+from openfisca_france.conf.zero_preserving import zero_preserving_inputs_by_variable
+from openfisca_france.sparse_inputs import is_constant_array
+
+from cache import tax_benefit_system
+
+
+class without_zero_propagation(reforms.Reform):
+    name = u"Évaluation de toutes les formules"
+
+    def apply(self):
+        self.zero_preserving_inputs_by_variable = None
+
+
+tax_benefit_system_without_zero_propagation = without_zero_propagation(tax_benefit_system)
+
+
+def new_simulation(year, tax_benefit_system = tax_benefit_system):
+    return tax_benefit_system.new_scenario().init_single_entity(
+        axes = [[
+            dict(count = 3, index = 0, name = 'salaire_imposable', max = 200000, min = 0, period = year),
+            dict(count = 3, index = 1, name = 'salaire_imposable', max = 100000, min = 0, period = year),
+            ]],
+        period = year,
+        parent1 = dict(age = 40),
+        parent2 = dict(age = 38),
+        enfants = [dict(age = 8), dict(age = 15)],
+        foyer_fiscal = dict(f4ba = 12000, f2tr = 0),
+        ).new_simulation()
+
+
+def check_formula_preserves_zero(variable_name, year):
+    simulation = new_simulation(year, tax_benefit_system_without_zero_propagation)
+    assert_near(simulation.calculate(variable_name, year), 0, absolute_error_margin = 0)
+
+
+def test_formulas_preserve_zero():
+    for variable_name in sorted(zero_preserving_inputs_by_variable):
+        for year in range(2006, 2017):
+            yield check_formula_preserves_zero, variable_name, year
+
+
+def test_zero_is_propagated():
+    simulation = new_simulation(2015)
+    isf_tot = simulation.calculate('isf_tot', 2015)
+    assert is_constant_array(isf_tot)
+    assert_near(isf_tot, [0, 0, 0])
+    # ISF does not reduce to income tax when the foyer has no wealth.
+    foyer_fiscal = simulation.entities['foyer_fiscal']
+    assert foyer_fiscal.get_holder('irpp').get_array(2015) is None
+    assert foyer_fiscal.get_holder('isf_iai').get_array(2015) is None
+
+
+def new_wealthy_simulation(tax_benefit_system):
+    return tax_benefit_system.new_scenario().init_single_entity(
+        period = 2015,
+        parent1 = dict(age = 40, salaire_imposable = 30000),
+        foyer_fiscal = dict(b1ab = 2500000),
+        ).new_simulation()
+
+
+def test_non_zero_inputs_are_evaluated():
+    isf_tot = new_wealthy_simulation(tax_benefit_system).calculate('isf_tot', 2015)
+    assert isf_tot[0] < 0
+    assert_near(
+        isf_tot,
+        new_wealthy_simulation(tax_benefit_system_without_zero_propagation).calculate('isf_tot', 2015),
+        absolute_error_margin = 0.01,
+        )
+
+
+def test_reform_disables_zero_propagation():
+    simulation = new_simulation(2015, tax_benefit_system_without_zero_propagation)
+    isf_tot = simulation.calculate('isf_tot', 2015)
+    assert not is_constant_array(isf_tot)
+    assert_near(isf_tot, [0, 0, 0])